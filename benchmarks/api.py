@@ -0,0 +1,175 @@
+"""
+Load test of hot API endpoints. App runs in-process against SQLite and in-memory Redis.
+
+Usage::
+
+    python -m benchmarks.api --users 20 --contacts 1000 --requests 500 --concurrency 20 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.app import PASSWORD, app, build_app, seed
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    """
+    Send requests with concurrency workers, measure latency of every request.
+    
+    :param make_request: Coroutine function taking request number and returning response.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for number in counter:
+            started = time.perf_counter()
+            response = await make_request(client, number)
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post('/api/auth/login', data={'username': email, 'password': PASSWORD})
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        session_factory = build_app(str(Path(tmp_dir) / 'benchmark.db'))
+        emails = seed(session_factory, args.users, args.contacts)
+        rnd = random.Random(7)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            tokens = []
+            for email in emails:
+                response = await login(client, email)
+                tokens.append(response.json()['access_token'])
+            ids = {}
+            for token in tokens:
+                response = await client.get('/api/contacts/?skip=0&limit=1000',
+                                            headers={'Authorization': f'Bearer {token}'})
+                ids[token] = [contact['id'] for contact in response.json()]
+
+            def auth(number: int) -> tuple[dict, str]:
+                token = tokens[number % len(tokens)]
+                return {'Authorization': f'Bearer {token}'}, token
+
+            async def contacts_get(client, number):
+                headers, token = auth(number)
+                return await client.get(f'/api/contacts/{rnd.choice(ids[token])}', headers=headers)
+
+            async def contacts_create(client, number):
+                headers, _ = auth(number)
+                body = {'first_name': 'Bench', 'last_name': f'Mark{number}', 'email': f'bench{number}@example.com',
+                        'phone': '+380991234567', 'birthday': '1990-05-17'}
+                return await client.post('/api/contacts/', json=body, headers=headers)
+
+            scenarios = {
+                'login': lambda client, number: login(client, emails[number % len(emails)]),
+                'users_me': lambda client, number: client.get('/api/users/me', headers=auth(number)[0]),
+                'contacts_list': lambda client, number: client.get(f'/api/contacts/?skip=0&limit={args.page_size}',
+                                                                   headers=auth(number)[0]),
+                'contacts_get': contacts_get,
+                'contacts_create': contacts_create,
+                'birthdays': lambda client, number: client.get('/api/contacts/bithday_on_next_week',
+                                                               headers=auth(number)[0]),
+            }
+            selected = args.scenario or list(scenarios)
+            results = {}
+            for name in selected:
+                requests = args.login_requests if name == 'login' else args.requests
+                try:
+                    results[name] = await run_scenario(client, scenarios[name], requests, args.concurrency)
+                except Exception as err:  # failed scenario is reported, others still run
+                    results[name] = {'error': f'{type(err).__name__}: {err}'}
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'users': args.users,
+            'contacts_per_user': args.contacts,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'page_size': args.page_size,
+        },
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help='users to seed')
+    parser.add_argument('--contacts', type=int, default=500, help='contacts per user to seed')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--login-requests', type=int, default=50, help='requests for login scenario (bcrypt is slow)')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent clients')
+    parser.add_argument('--page-size', type=int, default=100, help='limit for contacts list')
+    parser.add_argument('--scenario', action='append', help='run only this scenario, can be repeated')
+    parser.add_argument('--output', help='write JSON report to file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
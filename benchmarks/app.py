@@ -0,0 +1,119 @@
+"""
+App under benchmark: real routes, SQLite database file and in-memory Redis, all in one process.
+"""
+from datetime import date, datetime, timedelta
+import os
+import random
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import sessionmaker
+
+BENCH_ENV = {
+    'SQLALCHEMY_DATABASE_URL': 'sqlite://',
+    'SECRET_KEY': 'benchmark-secret',
+    'ALGORITHM': 'HS256',
+    'MAIL_USERNAME': 'bench',
+    'MAIL_PASSWORD': 'bench',
+    'MAIL_FROM': 'bench@example.com',
+    'MAIL_PORT': '465',
+    'MAIL_SERVER': 'localhost',
+    'CLOUD_NAME': 'bench',
+    'CLOUD_API_KEY': 'bench',
+    'CLOUD_API_SECRET': 'bench',
+}
+for name, value in BENCH_ENV.items():
+    os.environ.setdefault(name, value)
+
+from main import app  # noqa: E402
+from benchmarks.stand_ins import InMemoryRedis, sqlite_engine  # noqa: E402
+from src.database.cache import redis_cache  # noqa: E402
+from src.database.db import get_db, get_read_db  # noqa: E402
+from src.database.models import Contact, ContactChange, User  # noqa: E402
+from src.services.auth import auth_service  # noqa: E402
+
+
+PASSWORD = 'benchmark'
+
+
+def build_app(db_path: str):
+    """
+    Point app at SQLite file and in-memory Redis.
+    
+    :param db_path: SQLite database file.
+    :type db_path: str
+    :return: Session factory bound to benchmark database.
+    """
+    engine = sqlite_engine(db_path)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    redis_cache.start(InMemoryRedis())
+    return session_factory
+
+
+def seed(session_factory, users: int, contacts_per_user: int, batch_size: int = 5000) -> list[str]:
+    """
+    Insert confirmed users with contacts. Birthdays are spread over the year.
+    Every contact gets its change log revision, like contacts created by API.
+    
+    :param session_factory: Session factory.
+    :param users: Number of users.
+    :type users: int
+    :param contacts_per_user: Number of contacts of every user.
+    :type contacts_per_user: int
+    :param batch_size: Rows per insert statement.
+    :type batch_size: int
+    :return: Emails of created users.
+    :rtype: list[str]
+    """
+    rnd = random.Random(42)
+    password = auth_service.get_password_hash(PASSWORD)
+    emails = [f'user{i}@example.com' for i in range(users)]
+    with session_factory() as db:
+        db.execute(insert(User), [{'email': email, 'password': password, 'confirmed': True} for email in emails])
+        user_ids = [user_id for user_id, in db.query(User.id).order_by(User.id)]
+        rows = []
+        for user_id in user_ids:
+            for i in range(contacts_per_user):
+                rows.append({
+                    'first_name': f'First{i}',
+                    'last_name': f'Last{rnd.randrange(1000)}',
+                    'email': f'contact{i}@example.com',
+                    'phone': f'+380{rnd.randrange(10 ** 9):09d}',
+                    'birthday': date(1990, 1, 1) + timedelta(days=rnd.randrange(365 * 30)),
+                    'user_id': user_id,
+                })
+                if len(rows) >= batch_size:
+                    insert_contacts(db, rows)
+                    rows = []
+        if rows:
+            insert_contacts(db, rows)
+        db.commit()
+    return emails
+
+
+def insert_contacts(db, rows: list[dict]) -> None:
+    """
+    Bulk insert contacts with revisions: ids are taken after the last contact, so change log rows are written first.
+
+    :param db: Database session.
+    :param rows: Contact values without id and revision.
+    :type rows: list[dict]
+    """
+    last_id = db.query(func.max(Contact.id)).scalar() or 0
+    changed_at = datetime.utcnow()
+    revisions = db.execute(
+        insert(ContactChange).returning(ContactChange.id, sort_by_parameter_order=True),
+        [{'user_id': row['user_id'], 'contact_id': last_id + i, 'deleted': False, 'changed_at': changed_at}
+         for i, row in enumerate(rows, 1)],
+    ).scalars().all()
+    db.execute(insert(Contact), [{**row, 'id': last_id + i, 'revision': revision, 'updated_at': changed_at}
+                                 for i, (row, revision) in enumerate(zip(rows, revisions), 1)])
@@ -0,0 +1,40 @@
+"""
+Compare two benchmark JSON reports.
+
+Usage::
+
+    python -m benchmarks.compare before.json after.json
+"""
+import json
+import sys
+
+METRICS = ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(before: dict, after: dict) -> list[str]:
+    lines = [f"{'scenario':<18}" + ''.join(f'{metric:>24}' for metric in METRICS)]
+    for name, new in after['results'].items():
+        old = before['results'].get(name)
+        if old is None:
+            continue
+        if 'error' in old or 'error' in new:
+            lines.append(f"{name:<18}failed: {new.get('error') or old['error']}")
+            continue
+        cells = []
+        for metric in METRICS:
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            cells.append(f'{old[metric]:>9} -> {new[metric]:<9}{change:+.1f}%')
+        lines.append(f'{name:<18}' + ''.join(f'{cell:>24}' for cell in cells))
+    return lines
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.exit(__doc__)
+    with open(argv[0]) as before, open(argv[1]) as after:
+        print('\n'.join(compare(json.load(before), json.load(after))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+CPU cost of serializing one page of contacts: response_model path vs column rows + orjson.
+
+Inputs of both variants are built before timing: ORM instances for response_model path, ContactRow
+dataclasses, as returned by read queries, for orjson path. Only serialization is timed.
+
+Usage::
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+from datetime import date, timedelta
+import json
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+import benchmarks.app  # noqa: F401  sets settings env
+from src.database.models import Contact
+from src.repository.contacts import ContactRow
+from src.schemas import ContactResponce
+
+
+def make_rows(count: int) -> list[dict]:
+    return [{
+        'id': i,
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'email': f'contact{i}@example.com',
+        'phone': f'+380{i:09d}',
+        'birthday': date(1990, 1, 1) + timedelta(days=i),
+    } for i in range(count)]
+
+
+def orm_page(contacts: list[Contact]) -> bytes:
+    # what FastAPI does for response_model=List[ContactResponce] with ORM instances
+    validated = TypeAdapter(List[ContactResponce]).validate_python(contacts)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def orjson_page(contacts: list[ContactRow]) -> bytes:
+    return ORJSONResponse(contacts).body
+
+
+def cpu_per_call(func, page: list, repeat: int) -> float:
+    func(page)
+    started = time.process_time()
+    for _ in range(repeat):
+        func(page)
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000, help='rows per page')
+    parser.add_argument('--repeat', type=int, default=50, help='pages to serialize per variant')
+    args = parser.parse_args(argv)
+    rows = make_rows(args.rows)
+    entities = [Contact(**row) for row in rows]
+    column_rows = [ContactRow(**row) for row in rows]
+    report = {
+        'rows': args.rows,
+        'response_model_json_cpu_ms': round(cpu_per_call(orm_page, entities, args.repeat), 3),
+        'column_rows_orjson_cpu_ms': round(cpu_per_call(orjson_page, column_rows, args.repeat), 3),
+    }
+    report['speedup'] = round(report['response_model_json_cpu_ms'] / report['column_rows_orjson_cpu_ms'], 1)
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+In-process stand-ins for Postgres and Redis. Used by benchmarks and tests, not shipped with the app.
+"""
+import asyncio
+import fnmatch
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base
+
+
+def sqlite_engine(path: str | None = None) -> Engine:
+    """
+    Create SQLite engine with app schema.
+    
+    Connections may be used from any thread, because FastAPI creates sessions in threadpool and uses them in event loop.
+    
+    In-memory database is for rollback fixtures: pysqlite transaction handling is replaced with explicit BEGIN,
+    so SAVEPOINT works. Database file, used by benchmarks with concurrent clients, keeps pysqlite handling:
+    reads run outside of transactions and transaction begins right before first write, so concurrent writers
+    wait for lock instead of deadlocking on upgrade of read lock held since BEGIN.
+    
+    :param path: Database file. If None, in-memory database shared by all sessions.
+    :type path: str | None
+    :return: Engine.
+    :rtype: Engine
+    """
+    if path is not None:
+        engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False})
+    else:
+        engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+
+        @event.listens_for(engine, 'connect')
+        def disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, 'begin')
+        def begin_transaction(connection):
+            connection.exec_driver_sql('BEGIN')
+
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+class InMemoryPubSub:
+    """
+    Pattern subscription of InMemoryRedis.
+    """
+
+    def __init__(self, redis: 'InMemoryRedis'):
+        self.redis = redis
+        self.patterns: list[str] = []
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def psubscribe(self, *patterns: str) -> None:
+        self.patterns.extend(patterns)
+        self.redis.pubsubs.add(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float | None = 0.0) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        self.redis.pubsubs.discard(self)
+
+
+class InMemoryRedis:
+    """
+    Minimal asyncio Redis stand-in with commands the app uses. Values are stored as bytes, like Redis does.
+    """
+
+    def __init__(self):
+        self.data: dict[str, bytes | bytearray | dict[bytes, bytes]] = {}
+        self.expires: dict[str, float] = {}
+        self.pubsubs: set[InMemoryPubSub] = set()
+        self.connection_pool = self
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key) if self._alive(key) else None
+
+    async def set(self, key: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._alive(key):
+            return None
+        self.data[key] = self._encode(value)
+        self.expires.pop(key, None)
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+        return True
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self.data[key] = self._encode(value)
+        return value
+
+    async def hget(self, name: str, key: str) -> bytes | None:
+        return self.data[name].get(self._encode(key)) if self._alive(name) else None
+
+    async def hset(self, name: str, key: str, value) -> int:
+        fields = self.data[name] if self._alive(name) else self.data.setdefault(name, {})
+        added = self._encode(key) not in fields
+        fields[self._encode(key)] = self._encode(value)
+        return int(added)
+
+    async def hlen(self, name: str) -> int:
+        return len(self.data[name]) if self._alive(name) else 0
+
+    async def execute_command(self, command: str, *args):
+        if command.upper() != 'BITFIELD':
+            raise NotImplementedError(command)
+        key, args = args[0], list(args[1:])
+        bits = self.data[key] if self._alive(key) else bytearray()
+        results = []
+        while args:
+            operation, _, offset = args[:3]
+            byte, mask = int(offset) // 8, 0x80 >> int(offset) % 8
+            if len(bits) <= byte:
+                bits.extend(bytes(byte + 1 - len(bits)))
+            results.append(int(bool(bits[byte] & mask)))
+            if operation.upper() == 'SET':
+                bits[byte] = bits[byte] | mask if int(args[3]) else bits[byte] & ~mask
+                self.data[key] = bits
+                args = args[4:]
+            else:
+                args = args[3:]
+        return results
+
+    async def rename(self, source: str, target: str) -> bool:
+        if not self._alive(source):
+            raise KeyError(source)
+        self.data[target] = self.data.pop(source)
+        self.expires.pop(target, None)
+        if source in self.expires:
+            self.expires[target] = self.expires.pop(source)
+        return True
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self.expires[key] = time.monotonic() + seconds
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                deleted += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return deleted
+
+    async def keys(self, pattern: str = '*') -> list[bytes]:
+        return [key.encode('utf-8') for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    async def flushdb(self) -> bool:
+        self.data.clear()
+        self.expires.clear()
+        return True
+
+    async def publish(self, channel: str, message) -> int:
+        receivers = 0
+        for pubsub in list(self.pubsubs):
+            for pattern in pubsub.patterns:
+                if fnmatch.fnmatchcase(channel, pattern):
+                    pubsub.queue.put_nowait({'type': 'pmessage', 'pattern': pattern.encode('utf-8'),
+                                             'channel': channel.encode('utf-8'), 'data': self._encode(message)})
+                    receivers += 1
+                    break
+        return receivers
+
+    def pubsub(self) -> InMemoryPubSub:
+        return InMemoryPubSub(self)
+
+    async def close(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
@@ -0,0 +1,81 @@
+"""
+Cold start cost of app: time to import main, measured with python -X importtime in fresh interpreters.
+
+Usage::
+
+    python -m benchmarks.startup --repeat 5 --top 15
+
+Exits with status 1 if import takes longer than budget or a lazily loaded module was imported.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.app import BENCH_ENV
+
+BUDGET_MS = 2000
+# import time of main on reference machine, tests fail at 3 times of it to catch regressions without flaking
+BASELINE_MS = 1600
+# heavy clients, loaded on first use, not on import
+LAZY_MODULES = ('fastapi_mail', 'cloudinary', 'passlib', 'psycopg2', 'boto3', 'PIL')
+
+
+def import_times(module: str = 'main') -> dict[str, tuple[int, int]]:
+    """
+    Import module in fresh interpreter.
+
+    :param module: Module to import.
+    :type module: str
+    :return: Imported module to its self and cumulative import time in microseconds.
+    :rtype: dict[str, tuple[int, int]]
+    """
+    env = {**BENCH_ENV, **os.environ}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=env, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure(repeat: int = 3, module: str = 'main') -> tuple[float, dict[str, tuple[int, int]]]:
+    """
+    Import module repeat times, first run also warms bytecode cache.
+
+    :param repeat: Number of runs.
+    :type repeat: int
+    :return: Fastest import time in milliseconds and import times of that run.
+    :rtype: tuple[float, dict[str, tuple[int, int]]]
+    """
+    runs = [import_times(module) for _ in range(repeat)]
+    best = min(runs, key=lambda times: times[module][1])
+    return best[module][1] / 1000, best
+
+
+def lazy_imported(times: dict) -> list[str]:
+    return [name for name in LAZY_MODULES if name in times]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to show')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    total_ms, times = measure(args.repeat)
+    sys.stdout.write(f'import main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)\n')
+    for name, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][0])[:args.top]:
+        sys.stdout.write(f'{own / 1000:>9.1f} ms self {cumulative / 1000:>9.1f} ms total  {name}\n')
+    eager = lazy_imported(times)
+    if eager:
+        sys.stdout.write(f'imported on startup: {", ".join(eager)}\n')
+    return 1 if total_ms > args.budget_ms or eager else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
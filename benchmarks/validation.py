@@ -0,0 +1,59 @@
+"""
+Validation throughput of ContactModel: single payloads and bulk lists, from dicts and from JSON.
+
+Usage::
+
+    python -m benchmarks.validation --count 20000 --bulk-size 1000
+"""
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+import benchmarks.app  # noqa: F401  sets settings env
+from src.schemas import ContactModel
+
+
+def make_payloads(count: int) -> list[dict]:
+    return [{
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'email': f'contact{i}@example.com',
+        'phone': f'+380{i % 10 ** 9:09d}',
+        'birthday': f'19{50 + i % 50}-0{1 + i % 9}-1{i % 10}',
+    } for i in range(count)]
+
+
+def per_second(count: int, func) -> float:
+    started = time.perf_counter()
+    func()
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=20000, help='payloads to validate per variant')
+    parser.add_argument('--bulk-size', type=int, default=1000, help='payloads per bulk list')
+    args = parser.parse_args(argv)
+    payloads = make_payloads(args.count)
+    raw = [json.dumps(payload) for payload in payloads]
+    bulks = [payloads[i:i + args.bulk_size] for i in range(0, args.count, args.bulk_size)]
+    raw_bulks = [json.dumps(bulk).encode() for bulk in bulks]
+    adapter = TypeAdapter(List[ContactModel])
+
+    report = {
+        'count': args.count,
+        'bulk_size': args.bulk_size,
+        'single_python_per_sec': per_second(args.count, lambda: [ContactModel.model_validate(p) for p in payloads]),
+        'single_json_per_sec': per_second(args.count, lambda: [ContactModel.model_validate_json(r) for r in raw]),
+        'bulk_python_per_sec': per_second(args.count, lambda: [adapter.validate_python(b) for b in bulks]),
+        'bulk_json_per_sec': per_second(args.count, lambda: [adapter.validate_json(b) for b in raw_bulks]),
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
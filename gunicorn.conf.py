@@ -0,0 +1,15 @@
+# poetry install -E gunicorn
+# gunicorn -c gunicorn.conf.py main:app
+from src.conf.server import server_options
+
+
+_options = server_options()
+
+bind = f"{_options['host']}:{_options['port']}"
+workers = _options['workers']
+worker_class = 'uvicorn.workers.UvicornWorker'
+keepalive = _options['timeout_keep_alive']
+backlog = _options['backlog']
+graceful_timeout = _options['timeout_graceful_shutdown']
+max_requests = _options['limit_max_requests'] or 0
+max_requests_jitter = max_requests // 10
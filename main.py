@@ -1,21 +1,66 @@
+from contextlib import asynccontextmanager
 import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi_limiter import FastAPILimiter
-import uvicorn
 
-from src.database.db import redis_session
+from src.conf.config import get_settings
+from src.conf.logs import start_logging, stop_logging
+from src.conf.server import run
+from src.database.cache import redis_cache
+from src.database.db import open_db, close_db
 from src.routes import contacts
 from src.routes import auth
 from src.routes import users
+from src.routes import tags
+from src.services.access_log import AccessLogMiddleware
+from src.services.email import close_mail
+from src.services.events import contact_events
+from src.services.storage import ImmutableStaticFiles
 
 
 origins = [
     'http://localhost:3000'
 ]
 
-app = FastAPI()
+
+def mount_avatars(app: FastAPI) -> None:
+    """
+    Serve avatars from local directory, if avatar_storage setting is 'local'. Settings are read here, not on import.
+    """
+    settings = get_settings()
+    if settings.avatar_storage != 'local' or any(route.name == 'avatars' for route in app.routes):
+        return
+    os.makedirs(settings.avatar_local_dir, exist_ok=True)
+    app.mount(settings.avatar_base_url, ImmutableStaticFiles(directory=settings.avatar_local_dir), name='avatars')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown of every worker. Start JSON logging, mount local avatars, open database pool and Redis
+    pool, close them and mail client on shutdown. Mail client is created on first letter.
+    
+    App starts even if Redis is down, cache calls are skipped by circuit breaker until it comes back.
+    """
+    start_logging()
+    mount_avatars(app)
+    open_db()
+    redis_cache.start()
+    await redis_cache.ping()
+    try:
+        yield
+    finally:
+        close_mail()
+        await contact_events.close()
+        await redis_cache.close()
+        close_db()
+        stop_logging()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 app.add_middleware(
@@ -25,10 +70,12 @@ app.add_middleware(
     allow_methods=['*'],
     allow_headers=['*']
 )
+app.add_middleware(AccessLogMiddleware)
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(contacts.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
+app.include_router(tags.router, prefix='/api')
 
 
 #@app.on_event('startup')
@@ -36,7 +83,7 @@ app.include_router(users.router, prefix='/api')
   #  """
   # Start with app. Test redis connection. Init Fastapi limiter.
   #  """
- #   await FastAPILimiter.init(redis_session)
+ #   await FastAPILimiter.init(redis_cache.client)
 
 @app.get('/')
 def main():
@@ -49,4 +96,4 @@ def main():
 
 
 if __name__ == '__main__':
-    uvicorn.run(app, host='0.0.0.0', port=8000)
\ No newline at end of file
+    run()
\ No newline at end of file
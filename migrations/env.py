@@ -5,7 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from src.database.db import SQLALCHEMY_DATABASE_URL
+from src.conf.config import get_settings
 from src.database.models import Base
 
 # this is the Alembic Config object, which provides
@@ -22,7 +22,10 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
-config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL)
+# shard databases of contacts are migrated one by one: alembic -x shard=0 upgrade head
+shard = context.get_x_argument(as_dictionary=True).get('shard')
+config.set_main_option('sqlalchemy.url', get_settings().sqlalchemy_database_url if shard is None
+                       else get_settings().contacts_shard_urls[int(shard)])
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -0,0 +1,39 @@
+"""add contact change feed
+
+Revision ID: 20babb400a89
+Revises: c57b02d9f33a
+Create Date: 2026-10-19 10:02:17.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20babb400a89'
+down_revision = 'c57b02d9f33a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_changes_user_id_id', 'contact_changes', ['user_id', 'id'], unique=False)
+    op.add_column('contacts', sa.Column('revision', sa.Integer(), nullable=True))
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_contacts_user_id_revision', 'contacts', ['user_id', 'revision'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_revision', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
+    op.drop_column('contacts', 'revision')
+    op.drop_index('ix_contact_changes_user_id_id', table_name='contact_changes')
+    op.drop_table('contact_changes')
@@ -0,0 +1,74 @@
+"""add contact counters
+
+Revision ID: 3b9d7f2c6e14
+Revises: e7b25c90a1f8
+Create Date: 2026-10-19 13:31:52.407619
+
+Counters of existing contacts are filled by online backfill, see src.database.backfill: contacts are read
+in user_id order, chunk by chunk, and counters of users of every chunk are recomputed by GROUP BY queries
+limited to these users, each chunk committed and checkpointed on its own.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.backfill import Backfill, run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d7f2c6e14'
+down_revision = 'e7b25c90a1f8'
+branch_labels = None
+depends_on = None
+
+
+contacts = sa.table('contacts',
+    sa.column('user_id', sa.Integer), sa.column('birthday', sa.Date), sa.column('email_normalized', sa.String),
+)
+counters = sa.table('contact_counters',
+    sa.column('user_id', sa.Integer), sa.column('kind', sa.String), sa.column('key', sa.String),
+    sa.column('count', sa.Integer),
+)
+
+
+def email_domain(bind) -> sa.ColumnElement:
+    email = contacts.c.email_normalized
+    if bind.dialect.name == 'postgresql':
+        return sa.func.split_part(email, '@', 2)
+    return sa.func.substr(email, sa.func.instr(email, '@') + 1)
+
+
+def fill_counters(connection, rows) -> None:
+    # user with more contacts than chunk spans several chunks, counting all of them makes repeats idempotent
+    user_ids = sorted({row.user_id for row in rows})
+    connection.execute(counters.delete().where(counters.c.user_id.in_(user_ids)))
+    month = sa.cast(sa.cast(sa.extract('month', contacts.c.birthday), sa.Integer), sa.String)
+    domain = email_domain(connection)
+    groups = [
+        ('total', None, sa.true()),
+        ('birthday_month', month, contacts.c.birthday.is_not(None)),
+        ('email_domain', domain, contacts.c.email_normalized.like('%@%')),
+    ]
+    for kind, key, where in groups:
+        query = sa.select(contacts.c.user_id, sa.literal(kind), key if key is not None else sa.literal(''),
+                          sa.func.count()).where(contacts.c.user_id.in_(user_ids), where)
+        query = query.group_by(contacts.c.user_id, *([key] if key is not None else []))
+        connection.execute(counters.insert().from_select(['user_id', 'kind', 'key', 'count'], query))
+
+
+backfill = Backfill('contact_counters', contacts, ('user_id',), fill_counters, key='user_id')
+
+
+def upgrade() -> None:
+    op.create_table('contact_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'kind', 'key')
+    )
+    run_in_migration(backfill)
+
+
+def downgrade() -> None:
+    backfill.reset(op.get_bind())
+    op.drop_table('contact_counters')
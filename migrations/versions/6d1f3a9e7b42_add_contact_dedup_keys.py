@@ -0,0 +1,109 @@
+"""add contact dedup keys
+
+Revision ID: 6d1f3a9e7b42
+Revises: b81e4d7a9c05
+Create Date: 2026-10-19 11:20:45.318204
+
+Derived columns of existing contacts are filled by online backfill, see src.database.backfill: id-ordered
+chunks, each one executemany UPDATE committed and checkpointed on its own. Normalization is frozen here as of
+this revision, so later changes of src.services.dedup do not change what this migration writes; contacts
+written later get keys from the application.
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.backfill import Backfill, run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision = '6d1f3a9e7b42'
+down_revision = 'b81e4d7a9c05'
+branch_labels = None
+depends_on = None
+
+
+contacts = sa.table('contacts',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('first_name', sa.String), sa.column('last_name', sa.String),
+    sa.column('email', sa.String), sa.column('phone', sa.String),
+    sa.column('email_normalized', sa.String), sa.column('phone_e164', sa.String), sa.column('name_key', sa.String),
+)
+
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ('aeiouy', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return None
+    if phone.strip().startswith('+'):
+        return f'+{digits}'
+    if digits.startswith('00'):
+        return f'+{digits[2:]}'
+    if len(digits) == 10 and digits.startswith('0'):
+        return f'+38{digits}'
+    return f'+{digits}'
+
+
+def soundex(word):
+    letters = [letter for letter in word.lower() if letter.isalpha()]
+    if not letters or letters[0] not in SOUNDEX_CODES and letters[0] not in 'hw':
+        return ''.join(letters)
+    code, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit is None:
+            continue
+        if digit != previous and digit != '0':
+            code += digit
+        previous = digit
+    return (code + '000')[:4]
+
+
+def name_key(first_name, last_name):
+    if not (first_name or last_name):
+        return None
+    return f'{soundex(last_name or "")}:{soundex(first_name or "")}'[:20]
+
+
+def fill_keys(connection, rows) -> None:
+    connection.execute(
+        contacts.update().where(contacts.c.id == sa.bindparam('contact_id'),
+                                contacts.c.user_id == sa.bindparam('owner_id')),
+        [{'contact_id': row.id, 'owner_id': row.user_id,
+          'email_normalized': normalize_email(row.email), 'phone_e164': normalize_phone(row.phone),
+          'name_key': name_key(row.first_name, row.last_name)} for row in rows],
+    )
+
+
+backfill = Backfill('contact_dedup_keys', contacts,
+                    ('id', 'user_id', 'first_name', 'last_name', 'email', 'phone'), fill_keys)
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('email_normalized', sa.String(length=100), nullable=True))
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=20), nullable=True))
+    op.add_column('contacts', sa.Column('name_key', sa.String(length=20), nullable=True))
+    run_in_migration(backfill)
+    op.create_index('ix_contacts_user_id_email_normalized', 'contacts', ['user_id', 'email_normalized'], unique=False)
+    op.create_index('ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False)
+    op.create_index('ix_contacts_user_id_name_key', 'contacts', ['user_id', 'name_key'], unique=False)
+
+
+def downgrade() -> None:
+    backfill.reset(op.get_bind())
+    op.drop_index('ix_contacts_user_id_name_key', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_email_normalized', table_name='contacts')
+    op.drop_column('contacts', 'name_key')
+    op.drop_column('contacts', 'phone_e164')
+    op.drop_column('contacts', 'email_normalized')
@@ -0,0 +1,38 @@
+"""add users email lower index
+
+Revision ID: 9f4a6b1d3c27
+Revises: 3b9d7f2c6e14
+Create Date: 2026-10-19 14:22:16.530874
+
+Accounts with emails differing only in case must be merged first:
+
+    python -m src.jobs.dedupe_user_emails
+
+Index is built concurrently, outside of migration transaction, so users stay writable while it is built.
+If build fails, Postgres leaves invalid index, which must be dropped before running migration again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f4a6b1d3c27'
+down_revision = '3b9d7f2c6e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT count(*) FROM (SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1) AS emails'
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(f'{duplicates} emails belong to several users, run python -m src.jobs.dedupe_user_emails')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_lower', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""add contact tags
+
+Revision ID: a4c8e1f05d36
+Revises: 6d1f3a9e7b42
+Create Date: 2026-10-19 12:05:33.870142
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e1f05d36'
+down_revision = '6d1f3a9e7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'name', name='uq_tags_user_id_name')
+    )
+    op.create_table('contact_tags',
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('contact_id', 'tag_id')
+    )
+    op.create_index('ix_contact_tags_tag_id_contact_id', 'contact_tags', ['tag_id', 'contact_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_tags_tag_id_contact_id', table_name='contact_tags')
+    op.drop_table('contact_tags')
+    op.drop_table('tags')
@@ -0,0 +1,31 @@
+"""add backfill checkpoints
+
+Revision ID: b81e4d7a9c05
+Revises: 20babb400a89
+Create Date: 2026-10-19 15:04:48.226391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81e4d7a9c05'
+down_revision = '20babb400a89'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('backfill_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_key', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('backfill_checkpoints')
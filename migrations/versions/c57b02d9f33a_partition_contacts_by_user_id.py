@@ -0,0 +1,90 @@
+"""partition contacts by user_id
+
+Revision ID: c57b02d9f33a
+Revises: 2559a9f718ce
+Create Date: 2026-10-19 09:12:41.204518
+
+Contacts without owner are deleted and user_id becomes NOT NULL. It is not indexed alone: composite indexes
+starting with user_id come with listing sort keys, see e7b25c90a1f8.
+
+Hash partitioning is optional and Postgres only:
+
+    alembic -x contacts_partitions=8 upgrade head
+
+Partitioned table has primary key (id, user_id), so every query filtered by user_id touches one partition.
+Rows are copied to it in id-ordered batches, each committed on its own, so copy holds no long transaction;
+until copy ends, listings miss contacts not copied yet. New contacts are written to partitioned table.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c57b02d9f33a'
+down_revision = '2559a9f718ce'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 10000
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('contacts_id_seq'),
+    first_name varchar(100) NOT NULL,
+    last_name varchar(100) NOT NULL,
+    email varchar(100),
+    phone varchar(20),
+    birthday date,
+    user_id integer NOT NULL REFERENCES users (id) ON DELETE CASCADE
+"""
+
+
+def partitions() -> int:
+    return int(context.get_x_argument(as_dictionary=True).get('contacts_partitions', 0))
+
+
+def copy_contacts() -> None:
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM contacts_unpartitioned')).scalar() or 0
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id, BATCH_SIZE):
+            bind.execute(sa.text(
+                'INSERT INTO contacts (id, first_name, last_name, email, phone, birthday, user_id) '
+                'SELECT id, first_name, last_name, email, phone, birthday, user_id FROM contacts_unpartitioned '
+                'WHERE id > :start AND id <= :end'
+            ), {'start': start, 'end': start + BATCH_SIZE})
+
+
+def upgrade() -> None:
+    op.execute('DELETE FROM contacts WHERE user_id IS NULL')
+    count = partitions()
+    if count and op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY NONE')
+        op.execute('ALTER TABLE contacts RENAME TO contacts_unpartitioned')
+        op.execute(f'CREATE TABLE contacts ({COLUMNS}, PRIMARY KEY (id, user_id)) PARTITION BY HASH (user_id)')
+        for remainder in range(count):
+            op.execute(f'CREATE TABLE contacts_p{remainder} PARTITION OF contacts '
+                       f'FOR VALUES WITH (MODULUS {count}, REMAINDER {remainder})')
+        copy_contacts()
+        op.execute('DROP TABLE contacts_unpartitioned')
+        op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id')
+    else:
+        with op.batch_alter_table('contacts') as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    partitioned = bind.dialect.name == 'postgresql' and bind.execute(
+        sa.text("SELECT count(*) FROM pg_partitioned_table WHERE partrelid = 'contacts'::regclass")
+    ).scalar()
+    if partitioned:
+        op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY NONE')
+        op.execute('ALTER TABLE contacts RENAME TO contacts_partitioned')
+        op.execute(f'CREATE TABLE contacts ({COLUMNS}, PRIMARY KEY (id))')
+        op.execute('INSERT INTO contacts SELECT id, first_name, last_name, email, phone, birthday, user_id '
+                   'FROM contacts_partitioned')
+        op.execute('DROP TABLE contacts_partitioned')
+        op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,66 @@
+"""backfill contact revisions
+
+Revision ID: d5e2a8c4f913
+Revises: 9f4a6b1d3c27
+Create Date: 2026-10-19 16:40:12.904417
+
+Contacts created before change feed have no revision and are never sent by it. Every such contact gets
+a change log row, which id becomes its revision, by online backfill, see src.database.backfill: id-ordered
+chunks committed and checkpointed one by one. Then revision and updated_at become not nullable.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.backfill import Backfill, run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e2a8c4f913'
+down_revision = '9f4a6b1d3c27'
+branch_labels = None
+depends_on = None
+
+
+contacts = sa.table('contacts',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('revision', sa.Integer), sa.column('updated_at', sa.DateTime),
+)
+# Table, not table(): ordered RETURNING of multi-row insert needs its primary key
+contact_changes = sa.Table('contact_changes', sa.MetaData(),
+    sa.Column('id', sa.Integer, primary_key=True), sa.Column('user_id', sa.Integer),
+    sa.Column('contact_id', sa.Integer), sa.Column('deleted', sa.Boolean), sa.Column('changed_at', sa.DateTime),
+)
+
+
+def assign_revisions(connection, rows) -> None:
+    changed_at = datetime.utcnow()
+    revisions = connection.execute(
+        contact_changes.insert().returning(contact_changes.c.id, sort_by_parameter_order=True),
+        [{'user_id': row.user_id, 'contact_id': row.id, 'deleted': False, 'changed_at': changed_at} for row in rows],
+    ).scalars().all()
+    connection.execute(
+        contacts.update().where(contacts.c.id == sa.bindparam('contact_id'),
+                                contacts.c.user_id == sa.bindparam('owner_id')),
+        [{'contact_id': row.id, 'owner_id': row.user_id, 'revision': revision, 'updated_at': changed_at}
+         for row, revision in zip(rows, revisions)],
+    )
+
+
+backfill = Backfill('contact_revisions', contacts, ('id', 'user_id'), assign_revisions,
+                    where=contacts.c.revision.is_(None))
+
+
+def upgrade() -> None:
+    run_in_migration(backfill)
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('revision', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    backfill.reset(op.get_bind())
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=True)
+        batch_op.alter_column('revision', existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,33 @@
+"""add contact sort indexes
+
+Revision ID: e7b25c90a1f8
+Revises: a4c8e1f05d36
+Create Date: 2026-10-19 12:48:09.112760
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b25c90a1f8'
+down_revision = 'a4c8e1f05d36'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_contacts_user_id_id': ['user_id', 'id'],
+    'ix_contacts_user_id_first_name_id': ['user_id', 'first_name', 'id'],
+    'ix_contacts_user_id_last_name_id': ['user_id', 'last_name', 'id'],
+    'ix_contacts_user_id_birthday_id': ['user_id', 'birthday', 'id'],
+}
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'contacts', columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in reversed(INDEXES):
+        op.drop_index(name, table_name='contacts')
@@ -0,0 +1,30 @@
+"""drop contacts users foreign key
+
+Revision ID: f3c8a1d6b2e7
+Revises: d5e2a8c4f913
+Create Date: 2026-10-19 17:25:31.660218
+
+Contacts may live in shard database, where users are not, so contacts.user_id references no table.
+Contacts of deleted user are deleted by application, see src.jobs.dedupe_user_emails.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a1d6b2e7'
+down_revision = 'd5e2a8c4f913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite foreign keys are unnamed and not enforced by default, they are left as is
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys('contacts'):
+        if foreign_key['referred_table'] == 'users' and foreign_key['name']:
+            op.drop_constraint(foreign_key['name'], 'contacts', type_='foreignkey')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key('contacts_user_id_fkey', 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
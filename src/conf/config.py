@@ -1,8 +1,20 @@
-from pydantic import BaseSettings
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
+    
     sqlalchemy_database_url: str
+    sqlalchemy_replica_urls: list[str] = []
+    read_your_writes_seconds: int = 5
+    contacts_shard_urls: list[str] = []
+    changes_settle_seconds: int = 2
+    lookup_cache_seconds: int = 3600
+    lookup_cache_max_entries: int = 1000
+    signup_filter_capacity: int = 1_000_000
+    signup_filter_error_rate: float = 1e-6
     secret_key: str
     algorithm: str
     mail_username: str
@@ -12,13 +24,52 @@ class Settings(BaseSettings):
     mail_server: str
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    redis_db: int = 0
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 0.5
+    redis_connect_timeout: float = 0.5
+    redis_health_check_interval: int = 30
+    redis_breaker_threshold: int = 5
+    redis_breaker_reset_timeout: float = 30
     cloud_name: str
     cloud_api_key: str
     cloud_api_secret: str
-    
-    class Config:
-        env_file = '.env'
-        env_file_encoding = 'utf-8'
+    avatar_storage: str = 'cloudinary'
+    avatar_local_dir: str = 'static/avatars'
+    avatar_base_url: str = '/static/avatars'
+    avatar_max_size: int = 5 * 1024 * 1024
+    s3_bucket: str = 'avatars'
+    s3_endpoint_url: str | None = None
+    s3_access_key: str | None = None
+    s3_secret_key: str | None = None
+    s3_region: str | None = None
+    s3_public_url: str | None = None
+    web_host: str = '0.0.0.0'
+    web_port: int = 8000
+    web_concurrency: int | None = None
+    web_keep_alive: int = 5
+    web_backlog: int = 2048
+    web_graceful_timeout: int = 30
+    web_max_requests: int | None = None
+    log_level: str = 'INFO'
+    access_log_sample_rate: float = 1.0
+    access_log_sample_rates: dict[str, float] = {}
+    access_log_slow_ms: float = 1000
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Get app settings. They are read from environment and .env file on first call, not on import.
+
+    :return: Settings of process.
+    :rtype: Settings
+    """
+    return Settings()
 
 
-settings = Settings()
+def __getattr__(name: str):
+    # settings stays importable as module attribute, it is read on first access
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,97 @@
+"""
+Structured JSON logs.
+
+Records are formatted to JSON by the thread which logs them and put to in-memory queue. Writing to stdout
+is done by listener thread, so event loop never waits for log I/O.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+from typing import TextIO
+
+import orjson
+
+from src.conf.config import get_settings
+
+
+request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+
+# attributes of every LogRecord, others come from extra and are logged as fields
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format record as one-line JSON: time, level, logger, message, request id, extra fields and traceback.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None) is not None:
+            entry['request_id'] = record.request_id
+        entry.update((key, value) for key, value in record.__dict__.items()
+                     if key not in RECORD_ATTRIBUTES and key != 'request_id')
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class JsonQueueHandler(QueueHandler):
+    """
+    Queue handler, which puts records formatted to JSON, stamped with request id of current request.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        return super().prepare(record)
+
+
+_listener: QueueListener | None = None
+
+
+def start_logging(stream: TextIO = sys.stdout, level: str | None = None) -> QueueListener:
+    """
+    Send records of all loggers to stream through queue and listener thread.
+
+    :param stream: Output stream.
+    :type stream: TextIO
+    :param level: Root logger level, log_level setting by default.
+    :type level: str | None
+    :return: Started listener.
+    :rtype: QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    records = queue.SimpleQueue()
+    handler = JsonQueueHandler(records)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level or get_settings().log_level)
+    _listener = QueueListener(records, logging.StreamHandler(stream))
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Write queued records and stop listener thread.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, JsonQueueHandler):
+            root.removeHandler(handler)
@@ -0,0 +1,39 @@
+from importlib.util import find_spec
+import os
+
+from src.conf.config import get_settings
+
+
+def server_options() -> dict:
+    """
+    Production uvicorn options from settings.
+    
+    Worker count defaults to number of CPU cores. uvloop and httptools are used when installed.
+    
+    :return: Keyword arguments for uvicorn.run.
+    :rtype: dict
+    """
+    settings = get_settings()
+    return {
+        'host': settings.web_host,
+        'port': settings.web_port,
+        'workers': settings.web_concurrency or os.cpu_count() or 1,
+        'loop': 'uvloop' if find_spec('uvloop') else 'asyncio',
+        'http': 'httptools' if find_spec('httptools') else 'h11',
+        'lifespan': 'on',
+        'proxy_headers': True,
+        'access_log': False,
+        'timeout_keep_alive': settings.web_keep_alive,
+        'backlog': settings.web_backlog,
+        'timeout_graceful_shutdown': settings.web_graceful_timeout,
+        'limit_max_requests': settings.web_max_requests,
+    }
+
+
+def run() -> None:
+    """
+    Run app with production settings. Every worker runs app lifespan on its own.
+    """
+    import uvicorn
+
+    uvicorn.run('main:app', **server_options())
@@ -0,0 +1,225 @@
+"""
+Online backfills of big tables.
+
+Rows are read in primary key order, chunk by chunk, each chunk is written in its own short transaction
+and checkpointed, so backfill never holds long locks, can be throttled and resumes after interruption.
+Backfill functions must be idempotent: chunk may be applied again after crash.
+
+From command line:
+
+    python -m src.database.backfill --list
+    python -m src.database.backfill contact_dedup_keys --batch-size 1000 --pause 0.05
+
+From Alembic migration, outside of migration transaction. Migration defines its own backfill over tables
+and functions frozen in migration, so later changes of models do not change what it writes:
+
+    from src.database.backfill import Backfill, run_in_migration
+
+    contacts = sa.table('contacts', ...)
+    backfill = Backfill('contact_dedup_keys', contacts, ('id', 'user_id', ...), fill_keys)
+
+    def upgrade() -> None:
+        op.add_column(...)
+        run_in_migration(backfill)
+
+    def downgrade() -> None:
+        backfill.reset(op.get_bind())
+        op.drop_column(...)
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import time
+from typing import Callable, Sequence
+
+from sqlalchemy import Connection, ColumnElement, Engine, Row, TableClause, bindparam, func, select
+
+from src.database.models import BackfillCheckpoint, Contact, User
+from src.services.dedup import derived_keys
+
+
+logger = logging.getLogger(__name__)
+
+checkpoints = BackfillCheckpoint.__table__
+
+
+@dataclass
+class Backfill:
+    """
+    Chunked update of table.
+
+    :param name: Checkpoint name.
+    :param table: Table to read.
+    :param columns: Columns to read, apply gets rows with them.
+    :param apply: Writes chunk of rows with given connection.
+    :param key: Integer primary key column to order chunks by.
+    :param where: Filter of rows to read.
+    """
+    name: str
+    table: TableClause
+    columns: Sequence[str]
+    apply: Callable[[Connection, Sequence[Row]], None]
+    key: str = 'id'
+    where: ColumnElement[bool] | None = None
+
+    def checkpoint(self, connection: Connection) -> Row | None:
+        return connection.execute(select(checkpoints).where(checkpoints.c.name == self.name)).first()
+
+    def save(self, connection: Connection, last_key: int, rows_done: int, finished: bool = False) -> None:
+        values = {'last_key': last_key, 'rows_done': rows_done, 'updated_at': datetime.utcnow(),
+                  'finished_at': datetime.utcnow() if finished else None}
+        updated = connection.execute(checkpoints.update().where(checkpoints.c.name == self.name).values(**values))
+        if not updated.rowcount:
+            connection.execute(checkpoints.insert().values(name=self.name, **values))
+
+    def reset(self, connection: Connection) -> None:
+        """
+        Forget checkpoint, so next run starts from the beginning, e.g. on downgrade of migration which ran it.
+
+        :param connection: Connection.
+        :type connection: Connection
+        """
+        connection.execute(checkpoints.delete().where(checkpoints.c.name == self.name))
+
+    def chunk(self, connection: Connection, after: int, batch_size: int) -> Sequence[Row]:
+        key = self.table.c[self.key]
+        query = select(*(self.table.c[column] for column in self.columns)).where(key > after)
+        if self.where is not None:
+            query = query.where(self.where)
+        return connection.execute(query.order_by(key).limit(batch_size)).all()
+
+    def run(self,
+            bind: Engine | Connection,
+            batch_size: int = 1000,
+            pause: float = 0.0,
+            restart: bool = False) -> int:
+        """
+        Run backfill from last checkpoint to the end of table, logging progress after each chunk.
+
+        With Engine every chunk is committed in its own transaction. With Connection statements are run on it
+        and caller owns transactions, e.g. Alembic autocommit block.
+
+        :param bind: Engine or connection.
+        :type bind: Engine | Connection
+        :param batch_size: Rows per chunk.
+        :type batch_size: int
+        :param pause: Seconds to sleep after each chunk, to leave database capacity to live traffic.
+        :type pause: float
+        :param restart: Start from the beginning, ignoring checkpoint.
+        :type restart: bool
+        :return: Rows processed by this run.
+        :rtype: int
+        """
+        def transaction():
+            return bind.begin() if isinstance(bind, Engine) else _Nested(bind)
+
+        with transaction() as connection:
+            saved = None if restart else self.checkpoint(connection)
+            if saved is not None and saved.finished_at is not None:
+                logger.info('%s: finished at %s, use restart to run again', self.name, saved.finished_at)
+                return 0
+            last_key, rows_done = (saved.last_key, saved.rows_done) if saved is not None else (0, 0)
+            max_key = connection.execute(select(func.max(self.table.c[self.key]))).scalar() or 0
+
+        processed, started = 0, time.monotonic()
+        while True:
+            with transaction() as connection:
+                rows = self.chunk(connection, last_key, batch_size)
+                if rows:
+                    self.apply(connection, rows)
+                    last_key = getattr(rows[-1], self.key)
+                    rows_done += len(rows)
+                    processed += len(rows)
+                self.save(connection, last_key, rows_done, finished=len(rows) < batch_size)
+            rate = processed / max(time.monotonic() - started, 1e-6)
+            logger.info('%s: %d rows, key %d of %d (%.1f%%), %.0f rows/s', self.name, rows_done, last_key, max_key,
+                        100 * min(last_key / max_key, 1) if max_key else 100, rate)
+            if len(rows) < batch_size:
+                return processed
+            if pause:
+                time.sleep(pause)
+
+
+class _Nested:
+    """
+    Context manager giving caller's connection as is.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def __enter__(self) -> Connection:
+        return self.connection
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+def fill_contact_dedup_keys(connection: Connection, rows: Sequence[Row]) -> None:
+    contacts = Contact.__table__
+    connection.execute(
+        contacts.update().where(contacts.c.id == bindparam('contact_id'), contacts.c.user_id == bindparam('owner_id')),
+        [{'contact_id': row.id, 'owner_id': row.user_id,
+          **derived_keys(row.first_name, row.last_name, row.email, row.phone)} for row in rows],
+    )
+
+
+def lowercase_user_emails(connection: Connection, rows: Sequence[Row]) -> None:
+    users = User.__table__
+    connection.execute(users.update()
+                       .where(users.c.id.in_([row.id for row in rows]), users.c.email != func.lower(users.c.email))
+                       .values(email=func.lower(users.c.email)))
+
+
+BACKFILLS = {backfill.name: backfill for backfill in (
+    Backfill('contact_dedup_keys', Contact.__table__,
+             ('id', 'user_id', 'first_name', 'last_name', 'email', 'phone'), fill_contact_dedup_keys),
+    Backfill('user_emails_lower', User.__table__, ('id',), lowercase_user_emails),
+)}
+
+
+def run_in_migration(backfill: Backfill, **options) -> int:
+    """
+    Run backfill from Alembic migration. Statements are committed one by one outside of migration
+    transaction, so migration does not lock table until backfill ends.
+
+    :param backfill: Backfill, defined in migration.
+    :type backfill: Backfill
+    :return: Rows processed.
+    :rtype: int
+    """
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        return backfill.run(op.get_bind(), **options)
+
+
+if __name__ == '__main__':
+    from src.conf.logs import start_logging, stop_logging
+    from src.database.db import get_engine
+
+    engine = get_engine()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name', nargs='?', choices=sorted(BACKFILLS))
+    parser.add_argument('--list', action='store_true', help='show backfills and their checkpoints')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds between chunks')
+    parser.add_argument('--restart', action='store_true', help='ignore checkpoint')
+    args = parser.parse_args()
+    start_logging()
+    try:
+        if args.list or not args.name:
+            with engine.connect() as connection:
+                for backfill in BACKFILLS.values():
+                    saved = backfill.checkpoint(connection)
+                    if saved is None:
+                        logger.info('%s: not started', backfill.name)
+                    else:
+                        logger.info('%s: %d rows, key %d, %s', backfill.name, saved.rows_done, saved.last_key,
+                                    'finished' if saved.finished_at else 'paused')
+        else:
+            BACKFILLS[args.name].run(engine, args.batch_size, args.pause, args.restart)
+    finally:
+        stop_logging()
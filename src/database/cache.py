@@ -0,0 +1,176 @@
+import asyncio
+import time
+from functools import cached_property
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import get_settings
+
+
+class CacheUnavailable(Exception):
+    """
+    Redis is down or circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling failing service for reset_timeout seconds after failure_threshold failures in a row.
+    
+    After reset_timeout one trial call is allowed (half-open state). Success closes the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        """
+        Check if call is allowed.
+        
+        :return: False while breaker is open.
+        :rtype: bool
+        """
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.opened_at = time.monotonic()  # half-open: let one call through
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class RedisCache:
+    """
+    Redis client managed by app lifespan.
+    
+    Pool size and timeouts come from settings. Every command goes through circuit breaker, so when Redis
+    is down callers get fallback value immediately instead of waiting for timeouts.
+    """
+
+    def __init__(self):
+        self._client: Redis | None = None
+
+    @cached_property
+    def breaker(self) -> CircuitBreaker:
+        settings = get_settings()
+        return CircuitBreaker(settings.redis_breaker_threshold, settings.redis_breaker_reset_timeout)
+
+    def start(self, client: Redis | None = None) -> Redis:
+        """
+        Create connection pool and client. Connections are opened on demand.
+        
+        :param client: Ready client to use instead, e.g. in-memory stand-in for tests.
+        :type client: Redis | None
+        :return: Redis client.
+        :rtype: Redis
+        """
+        if client is not None:
+            self._client = client
+            self.breaker.success()
+        if self._client is None:
+            settings = get_settings()
+            pool = BlockingConnectionPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                max_connections=settings.redis_max_connections,
+                timeout=settings.redis_socket_timeout,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=settings.redis_connect_timeout,
+                health_check_interval=settings.redis_health_check_interval,
+            )
+            self._client = Redis(connection_pool=pool)
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Close client and disconnect pool.
+        """
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.close()
+            await client.connection_pool.disconnect()
+
+    @property
+    def client(self) -> Redis:
+        return self.start()
+
+    async def call(self, command: str, *args, **kwargs) -> Any:
+        """
+        Run Redis command through circuit breaker.
+        
+        :param command: Name of Redis client method.
+        :type command: str
+        :return: Command result.
+        :raises CacheUnavailable: If Redis failed or breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CacheUnavailable(command)
+        settings = get_settings()
+        try:
+            result = await asyncio.wait_for(getattr(self.client, command)(*args, **kwargs),
+                                            settings.redis_socket_timeout + settings.redis_connect_timeout)
+        except (RedisError, OSError, asyncio.TimeoutError) as err:
+            self.breaker.failure()
+            raise CacheUnavailable(command) from err
+        self.breaker.success()
+        return result
+
+    async def ping(self) -> bool:
+        """
+        Health check.
+        
+        :return: True if Redis answered.
+        :rtype: bool
+        """
+        try:
+            return bool(await self.call('ping'))
+        except CacheUnavailable:
+            return False
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Get value. Return None if key is missing or Redis is unavailable.
+        """
+        try:
+            return await self.call('get', key)
+        except CacheUnavailable:
+            return None
+
+    async def set(self, key: str, value: bytes | str, ex: int | None = None) -> None:
+        """
+        Set value with optional expire in seconds. Ignored if Redis is unavailable.
+        """
+        try:
+            await self.call('set', key, value, ex=ex)
+        except CacheUnavailable:
+            pass
+
+    async def delete(self, *keys: str) -> None:
+        """
+        Delete keys. Ignored if Redis is unavailable.
+        """
+        try:
+            await self.call('delete', *keys)
+        except CacheUnavailable:
+            pass
+
+
+redis_cache = RedisCache()
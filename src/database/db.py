@@ -1,12 +1,181 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from redis.asyncio import Redis
-from src.conf.config import settings
+from functools import partial
+from hashlib import sha1
+import itertools
+import time
+from typing import Awaitable, Callable
 
-SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-Sessionlocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+from src.conf.config import get_settings
+from src.database.cache import RedisCache, redis_cache
+
+
+class LazySessionmaker(sessionmaker):
+    """
+    Session factory, which creates its engine on first session, not on import. Engine creation loads
+    database driver.
+    """
+
+    def __init__(self, create: Callable[[], Engine], **kw):
+        super().__init__(**kw)
+        self.create = create
+
+    @property
+    def engine(self) -> Engine:
+        if self.kw['bind'] is None:
+            self.configure(bind=self.create())
+        return self.kw['bind']
+
+    def __call__(self, **local_kw) -> Session:
+        local_kw.setdefault('bind', self.engine)
+        return super().__call__(**local_kw)
+
+    def dispose(self) -> None:
+        """
+        Close pooled connections of engine, if it was created.
+        """
+        if self.kw['bind'] is not None:
+            self.kw['bind'].dispose()
+
+
+def lazy_sessionmaker(url: str) -> LazySessionmaker:
+    """
+    Session factory of database, connected on first session.
+
+    :param url: Database url.
+    :type url: str
+    :return: Session factory.
+    :rtype: LazySessionmaker
+    """
+    return LazySessionmaker(partial(create_engine, url), autocommit=False, autoflush=False)
+
+
+Sessionlocal = LazySessionmaker(lambda: create_engine(get_settings().sqlalchemy_database_url),
+                                autocommit=False, autoflush=False)
+
+
+def get_engine() -> Engine:
+    """
+    Get engine of primary database. Created on first use.
+
+    :return: Engine.
+    :rtype: Engine
+    """
+    return Sessionlocal.engine
+
+
+class ReplicaRouter:
+    """
+    Route read sessions to read replicas in round robin.
+    
+    After client's write, its reads go to primary for sticky_seconds (read-your-writes). Recent writes are
+    tracked in Redis, so stickiness works across workers, and in worker memory if Redis is down.
+    """
+
+    def __init__(self, primary: sessionmaker, replicas: list[sessionmaker], sticky_seconds: int,
+                 cache: RedisCache = redis_cache):
+        self.primary = primary
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.cache = cache
+        self._next_replica = itertools.cycle(replicas)
+        self._recent_writes: dict[str, float] = {}
+
+    async def mark_write(self, key: str | None) -> None:
+        """
+        Remember that client with key has just written.
+        
+        :param key: Client key.
+        :type key: str | None
+        :rtype: None
+        """
+        if not self.replicas or key is None:
+            return
+        now = time.monotonic()
+        self._recent_writes = {k: v for k, v in self._recent_writes.items() if v > now}
+        self._recent_writes[key] = now + self.sticky_seconds
+        await self.cache.set(f'rw:{key}', 1, ex=self.sticky_seconds)
+
+    async def is_sticky(self, key: str | None) -> bool:
+        """
+        Check if client with key wrote within sticky_seconds.
+        
+        :param key: Client key.
+        :type key: str | None
+        :return: True if reads must go to primary.
+        :rtype: bool
+        """
+        if key is None:
+            return False
+        if self._recent_writes.get(key, 0) > time.monotonic():
+            return True
+        return await self.cache.get(f'rw:{key}') is not None
+
+    async def session(self, key: str | None = None) -> Session:
+        """
+        Open session for reads of client with key.
+        
+        :param key: Client key.
+        :type key: str | None
+        :return: Replica session, or primary session if there are no replicas or client wrote recently.
+        :rtype: Session
+        """
+        if not self.replicas or await self.is_sticky(key):
+            return self.primary()
+        return next(self._next_replica)()
+
+
+_read_router: ReplicaRouter | None = None
+
+
+def get_read_router() -> ReplicaRouter:
+    """
+    Get router of read sessions. Replicas are configured by sqlalchemy_replica_urls setting.
+
+    :return: Replica router of worker.
+    :rtype: ReplicaRouter
+    """
+    global _read_router
+    if _read_router is None:
+        settings = get_settings()
+        _read_router = ReplicaRouter(Sessionlocal, [lazy_sessionmaker(url) for url in settings.sqlalchemy_replica_urls],
+                                     settings.read_your_writes_seconds)
+    return _read_router
+
+
+def client_key(request: Request) -> str | None:
+    """
+    Key of client for read-your-writes: hash of Authorization header.
+    
+    :param request: Request object.
+    :type request: Request
+    :return: Client key or None for anonymous requests.
+    :rtype: str | None
+    """
+    authorization = request.headers.get('authorization')
+    if not authorization:
+        return None
+    return sha1(authorization.encode('utf-8')).hexdigest()
+
+
+def open_db():
+    """
+    Open first pooled connection, so worker fails fast if database is unreachable.
+    """
+    with get_engine().connect():
+        pass
+
+
+def close_db():
+    """
+    Close all pooled connections of worker.
+    """
+    Sessionlocal.dispose()
+    for replica in get_read_router().replicas:
+        replica.dispose()
 
 
 def get_db():
@@ -17,4 +186,34 @@ def get_db():
         db.close()
 
 
-redis_session = Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding='utf-8', decode_responses=True)
\ No newline at end of file
+async def get_read_db(request: Request):
+    """
+    Session for GET routes. Reads go to replica unless client wrote within read_your_writes_seconds.
+    """
+    db = await get_read_router().session(client_key(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class TrackWriteRoute(APIRoute):
+    """
+    Route, which makes client's next reads go to primary after successful write: request with other than
+    GET, HEAD or OPTIONS method answered with 2xx status. Client is marked before response is sent,
+    so its next request already reads own write. Failed and not found writes are not marked.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def track_write_handler(request: Request) -> Response:
+            response = await handler(request)
+            if request.method not in SAFE_METHODS and 200 <= response.status_code < 300:
+                await get_read_router().mark_write(client_key(request))
+            return response
+
+        return track_write_handler
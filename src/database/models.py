@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Boolean, Index, UniqueConstraint, func, event
 from sqlalchemy.orm import relationship, declarative_base
 #from sqlalchemy.ext.declarative import declarative_base
 
@@ -13,13 +15,122 @@ class Contact(Base):
     email = Column(String(100))
     phone = Column(String(20))
     birthday = Column(Date)
-    user_id = Column(ForeignKey('users.id', ondelete='CASCADE'), default=None)
-    user = relationship('User', backref='contacts')
+    # no foreign key: contacts may live in shard database without users, see repository.shards
+    user_id = Column(Integer, nullable=False)
+    user = relationship('User', primaryjoin='foreign(Contact.user_id) == User.id', backref='contacts')
+    # id and time of last ContactChange, assigned on insert by assign_revision
+    revision = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    # derived keys for duplicate detection, see src.services.dedup
+    email_normalized = Column(String(100), nullable=True)
+    phone_e164 = Column(String(20), nullable=True)
+    name_key = Column(String(20), nullable=True)
+    
+    # user_id is partition/shard key: ORM updates and deletes filter by it too, so they hit one partition
+    __mapper_args__ = {'primary_key': [id, user_id]}
+    __table_args__ = (
+        Index('ix_contacts_user_id_revision', 'user_id', 'revision'),
+        Index('ix_contacts_user_id_email_normalized', 'user_id', 'email_normalized'),
+        Index('ix_contacts_user_id_phone_e164', 'user_id', 'phone_e164'),
+        Index('ix_contacts_user_id_name_key', 'user_id', 'name_key'),
+        # keyset pagination of sorted listing, see repository.contacts.SORT_COLUMNS
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_first_name_id', 'user_id', 'first_name', 'id'),
+        Index('ix_contacts_user_id_last_name_id', 'user_id', 'last_name', 'id'),
+        Index('ix_contacts_user_id_birthday_id', 'user_id', 'birthday', 'id'),
+    )
     
     def __repr__(self):
         return f'{self.first_name}'
 
 
+class ContactChange(Base):
+    """
+    Change log of contacts. Row id is monotonic revision, rows with deleted=True are tombstones.
+    """
+    __tablename__ = 'contact_changes'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    contact_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (Index('ix_contact_changes_user_id_id', 'user_id', 'id'),)
+
+
+@event.listens_for(Contact, 'before_insert')
+def assign_revision(mapper, connection, target: Contact) -> None:
+    """
+    Give every new contact a revision, whatever code path inserts it, so it is seen by change feed.
+    Contact id is not known yet: change is logged with contact_id 0 and completed by after_insert.
+    """
+    if target.revision is not None:
+        return
+    changes = ContactChange.__table__
+    user_id = target.user_id if target.user_id is not None else target.user.id
+    changed_at = datetime.utcnow()
+    change_id = connection.execute(changes.insert().values(user_id=user_id, contact_id=0, deleted=False,
+                                                           changed_at=changed_at)).inserted_primary_key[0]
+    target.revision, target.updated_at = change_id, changed_at
+
+
+@event.listens_for(Contact, 'after_insert')
+def complete_revision(mapper, connection, target: Contact) -> None:
+    changes = ContactChange.__table__
+    connection.execute(changes.update()
+                       .where(changes.c.id == target.revision, changes.c.contact_id == 0)
+                       .values(contact_id=target.id))
+
+
+class ContactCounter(Base):
+    """
+    Materialized count of contacts of user by kind and key, e.g. ('birthday_month', '5') or ('email_domain', 'gmail.com').
+    Kept in step with contacts by repository in the same transaction.
+    """
+    __tablename__ = 'contact_counters'
+    user_id = Column(Integer, primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class Tag(Base):
+    """
+    Tag of contacts. Lives in database of user contacts, so like change log it has no foreign key to users.
+    """
+    __tablename__ = 'tags'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    name = Column(String(50), nullable=False)
+    
+    __table_args__ = (UniqueConstraint('user_id', 'name', name='uq_tags_user_id_name'),)
+
+
+class ContactTag(Base):
+    """
+    Contact to tag association. No foreign key to contacts, which primary key is (id, user_id) when partitioned:
+    rows are deleted with their contact by repository.
+    """
+    __tablename__ = 'contact_tags'
+    contact_id = Column(Integer, primary_key=True)
+    tag_id = Column(ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    
+    __table_args__ = (Index('ix_contact_tags_tag_id_contact_id', 'tag_id', 'contact_id'),)
+
+
+class BackfillCheckpoint(Base):
+    """
+    Progress of online backfill, see src.database.backfill. Backfill resumes after last_key.
+    """
+    __tablename__ = 'backfill_checkpoints'
+    name = Column(String(100), primary_key=True)
+    last_key = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
 class User(Base):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True)
@@ -28,3 +139,6 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
+    
+    # emails are compared case-insensitive, see repository.auth.get_user_by_email
+    __table_args__ = (Index('ix_users_email_lower', func.lower(email), unique=True),)
@@ -0,0 +1,122 @@
+"""
+Daily birthday digest job. Run it once a day after midnight:
+
+    python -m src.jobs.birthday_digest [--email]
+
+Birthdays on next week are computed for batches of users, one query per batch and contacts database, and
+cached until midnight for every user, empty lists too, so birthday endpoint is a cache read for users
+who had no contact writes since. With --email, users with upcoming birthdays get digest letter.
+"""
+import argparse
+import asyncio
+from datetime import date
+import logging
+from typing import Callable, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.conf.logs import start_logging, stop_logging
+from src.database.cache import redis_cache
+from src.database.db import Sessionlocal
+from src.database.models import User
+from src.repository import contacts as repo_contacts
+from src.repository.shards import contacts_database_of
+from src.services.birthdays import cache_birthdays
+from src.services.contacts_version import get_versions
+from src.services.email import send_birthday_digest
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+async def send_digests(batch: dict[int, list], db: Session) -> int:
+    """
+    Send digest letters to confirmed users of batch.
+
+    :param batch: User id to contacts with birthday on next week.
+    :type batch: dict[int, list]
+    :param db: Primary database session with users.
+    :type db: Session
+    :return: Number of letters.
+    :rtype: int
+    """
+    recipients = db.execute(select(User.id, User.email).where(User.id.in_(batch), User.confirmed.is_(True))).all()
+    await asyncio.gather(*(send_birthday_digest(email, batch[user_id]) for user_id, email in recipients))
+    return len(recipients)
+
+
+def user_batches(db: Session, size: int) -> Iterable[list[int]]:
+    """
+    Ids of all users, in id order, batch by batch.
+
+    :param db: Primary database session with users.
+    :type db: Session
+    :param size: Users per batch.
+    :type size: int
+    :return: Batches of user ids.
+    :rtype: Iterable[list[int]]
+    """
+    last_id = 0
+    while batch := db.execute(select(User.id).where(User.id > last_id).order_by(User.id).limit(size)).scalars().all():
+        yield batch
+        last_id = batch[-1]
+
+
+async def run(today: date,
+              email: bool = False,
+              database_of: Callable[[int], sessionmaker] = contacts_database_of,
+              users_db: sessionmaker = Sessionlocal) -> tuple[int, int]:
+    """
+    Cache birthdays on next week of all users and optionally send digest letters.
+
+    Contacts versions of batch are read before its contacts, so result of user who writes contact meanwhile
+    is cached under stale version and never read.
+
+    :param today: Current date.
+    :type today: date
+    :param email: Send digest letters.
+    :type email: bool
+    :param database_of: Database with contacts of user, shard of user by default.
+    :type database_of: Callable[[int], sessionmaker]
+    :param users_db: Database with users.
+    :type users_db: sessionmaker
+    :return: Number of users with upcoming birthdays and number of letters.
+    :rtype: tuple[int, int]
+    """
+    users = letters = 0
+    with users_db() as primary:
+        for user_ids in user_batches(primary, BATCH_SIZE):
+            versions = await get_versions(user_ids)
+            databases = {}
+            for user_id in user_ids:
+                databases.setdefault(database_of(user_id), []).append(user_id)
+            upcoming = {}
+            for database, database_user_ids in databases.items():
+                with database() as db:
+                    upcoming.update(repo_contacts.upcoming_birthdays(db, today, database_user_ids))
+            await asyncio.gather(*(cache_birthdays(user_id, upcoming.get(user_id, []), today, version)
+                                   for user_id, version in zip(user_ids, versions)))
+            users += len(upcoming)
+            if email and upcoming:
+                letters += await send_digests(upcoming, primary)
+    logger.info('birthdays cached for %d users, %d digest letters sent', users, letters)
+    return users, letters
+
+
+async def main(email: bool) -> None:
+    start_logging()
+    redis_cache.start()
+    try:
+        await run(date.today(), email)
+    finally:
+        await redis_cache.close()
+        stop_logging()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--email', action='store_true', help='send digest letters')
+    asyncio.run(main(parser.parse_args().email))
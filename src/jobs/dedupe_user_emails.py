@@ -0,0 +1,118 @@
+"""
+One-time cleanup of user emails before case-insensitive unique index on users:
+
+    python -m src.jobs.dedupe_user_emails [--batch-size 100] [--pause 0.1]
+
+Accounts whos emails differ only in case are merged into one: confirmed or oldest account is kept, it gets
+contacts, tags and counters of the others, which are deleted. Contacts on another shard are copied to shard
+of kept account and deleted from their own. Then all emails are lowercased. Work is done and committed
+in batches with pause between them, so it can run on live database and be restarted.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.conf.logs import start_logging, stop_logging
+from src.database.backfill import BACKFILLS
+from src.database.cache import redis_cache
+from src.database.db import Sessionlocal
+from src.database.models import User
+from src.repository import users as repo_users
+from src.repository.auth import normalize_email
+from src.repository.contacts import invalidate_caches
+from src.repository.shards import contacts_database_of
+
+
+logger = logging.getLogger(__name__)
+
+
+def merge_group(users: list[User], db: Session, database_of: Callable[[int], sessionmaker]) -> list[str]:
+    """
+    Merge accounts of one email into first of them. Contacts are moved first, so restart after failure
+    finds the same group with nothing left to move. Contacts copied from another shard are deleted there
+    right after copy is committed.
+
+    :param users: Users with one email, user to keep first.
+    :type users: list[User]
+    :param db: Primary database session with users.
+    :type db: Session
+    :param database_of: Database with contacts of user.
+    :type database_of: Callable[[int], sessionmaker]
+    :return: Emails of merged users, as cached by auth service.
+    :rtype: list[str]
+    """
+    keep, duplicate_ids = users[0], [user.id for user in users[1:]]
+    keep_database = database_of(keep.id)
+    with keep_database() as contacts_db:
+        repo_users.move_contacts(keep.id, [user_id for user_id in duplicate_ids
+                                           if database_of(user_id) is keep_database], contacts_db)
+        contacts_db.commit()
+        for user_id in duplicate_ids:
+            if database_of(user_id) is keep_database:
+                continue
+            with database_of(user_id)() as source_db:
+                repo_users.copy_contacts(user_id, keep.id, source_db, contacts_db)
+                contacts_db.commit()
+                repo_users.delete_contacts_of(user_id, source_db)
+                source_db.commit()
+    emails = [user.email for user in users]
+    db.query(User).filter(User.id.in_(duplicate_ids)).delete(synchronize_session=False)
+    keep.email = normalize_email(keep.email)
+    return emails
+
+
+async def run(batch_size: int = 100,
+              pause: float = 0.0,
+              database_of: Callable[[int], sessionmaker] = contacts_database_of,
+              users_db: sessionmaker = Sessionlocal) -> int:
+    """
+    Merge accounts with same email and lowercase all emails.
+
+    :param batch_size: Groups or users per commit.
+    :type batch_size: int
+    :param pause: Seconds to sleep between batches.
+    :type pause: float
+    :param database_of: Database with contacts of user, shard of user by default.
+    :type database_of: Callable[[int], sessionmaker]
+    :param users_db: Database with users.
+    :type users_db: sessionmaker
+    :return: Number of deleted accounts.
+    :rtype: int
+    """
+    merged = 0
+    with users_db() as db:
+        while groups := repo_users.get_duplicate_emails(db, batch_size):
+            user_ids = [user.id for group in groups for user in group]
+            emails = [email for group in groups for email in merge_group(group, db, database_of)]
+            db.commit()
+            await redis_cache.delete(*emails)
+            for user_id in user_ids:
+                await invalidate_caches(user_id)
+            merged += len(emails) - len(groups)
+            logger.info('merged %d accounts', merged)
+            await asyncio.sleep(pause)
+
+        BACKFILLS['user_emails_lower'].run(db.get_bind(), batch_size, pause, restart=True)
+    logger.info('%d duplicate accounts merged, all emails normalized', merged)
+    return merged
+
+
+async def main(batch_size: int, pause: float) -> None:
+    start_logging()
+    redis_cache.start()
+    try:
+        await run(batch_size, pause)
+    finally:
+        await redis_cache.close()
+        stop_logging()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds between batches')
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.pause))
@@ -0,0 +1,66 @@
+"""
+Retention of contact change log, run periodically, e.g. daily by cron:
+
+    python -m src.jobs.prune_contact_changes [--older-than-hours 24] [--batch-size 1000] [--pause 0.1]
+
+Every contact write appends a row to change log, but change feed reads revisions of changed contacts from
+contacts table and needs only tombstones of deleted ones. Other rows are deleted in batches, each committed
+with pause between them, so job can run on live database.
+"""
+import argparse
+from datetime import datetime, timedelta
+import logging
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from src.conf.logs import start_logging, stop_logging
+from src.repository.contacts import prune_changes
+from src.repository.shards import contact_databases
+
+
+logger = logging.getLogger(__name__)
+
+
+def run(older_than_hours: float = 24,
+        batch_size: int = 1000,
+        pause: float = 0.0,
+        databases: list[sessionmaker] | None = None) -> int:
+    """
+    Delete change log rows of created and updated contacts, older than older_than_hours.
+
+    :param older_than_hours: Age of rows to delete.
+    :type older_than_hours: float
+    :param batch_size: Rows per commit.
+    :type batch_size: int
+    :param pause: Seconds to sleep between batches.
+    :type pause: float
+    :param databases: Databases with contacts, all contact databases by default.
+    :type databases: list[sessionmaker] | None
+    :return: Number of deleted rows.
+    :rtype: int
+    """
+    before = datetime.utcnow() - timedelta(hours=older_than_hours)
+    pruned = 0
+    for database in databases or contact_databases():
+        with database() as db:
+            while deleted := prune_changes(before, batch_size, db):
+                db.commit()
+                pruned += deleted
+                logger.info('pruned %d changes', pruned)
+                time.sleep(pause)
+    logger.info('%d changes pruned', pruned)
+    return pruned
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--older-than-hours', type=float, default=24)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds between batches')
+    args = parser.parse_args()
+    start_logging()
+    try:
+        run(args.older_than_hours, args.batch_size, args.pause)
+    finally:
+        stop_logging()
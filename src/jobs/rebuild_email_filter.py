@@ -0,0 +1,35 @@
+"""
+Rebuild Bloom filter of registered emails from database:
+
+    python -m src.jobs.rebuild_email_filter
+
+Run it after Redis data loss, or when users count approaches signup_filter_capacity (raise it first).
+Signups keep working during rebuild: new filter replaces old one at once.
+"""
+import asyncio
+import logging
+
+from src.conf.logs import start_logging, stop_logging
+from src.database.cache import redis_cache
+from src.database.db import Sessionlocal
+from src.repository.auth import iter_emails
+from src.services.signup_filter import get_email_filter
+
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    start_logging()
+    redis_cache.start()
+    try:
+        with Sessionlocal() as db:
+            count = await get_email_filter().rebuild(iter_emails(db))
+        logger.info('email filter rebuilt with %d emails', count)
+    finally:
+        await redis_cache.close()
+        stop_logging()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
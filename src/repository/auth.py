@@ -1,13 +1,25 @@
-from libgravatar import Gravatar
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from src.database.models import User
 from src.schemas import UserModel
 
 
+def normalize_email(email: str) -> str:
+    """
+    Stored form of user email: lowercase, without surrounding spaces.
+    
+    :param email: Email as entered.
+    :type email: str
+    :return: Normalized email.
+    :rtype: str
+    """
+    return email.strip().lower()
+
 async def get_user_by_email(email: str, db: Session) -> User:
     """
-    Get first User object by email.
+    Get User object by email, case-insensitive. One probe of unique index on lower(email).
     
     :param email: User email.
     :type email: str
@@ -16,33 +28,45 @@ async def get_user_by_email(email: str, db: Session) -> User:
     :return: User object.
     :rtype: User
     """
-    return db.query(User).filter(User.email == email).first()
+    return db.query(User).filter(func.lower(User.email) == normalize_email(email)).first()
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: Session) -> User | None:
     """
-    Create new user in database.
+    Create new user in database with one INSERT ... ON CONFLICT DO NOTHING RETURNING. Email is stored normalized.
+    
+    If user with this email in any case exists, return None: concurrent signups with one email never raise
+    IntegrityError.
     
-    Generate default avatar.
+    Default avatar is not resolved here, see repository.users.fill_default_avatar.
     
     :param body: User info.
     :type body: UserModel
     :param db: Database session.
     :type db: Session
-    :return: New user object.
-    :rtype: User
+    :return: New user object or None.
+    :rtype: User | None
     """
-    try:
-        gravatar = Gravatar(body.email)
-        avatar = gravatar.get_image()
-    except Exception:
-        avatar = None
-
-    new_user = User(**body.dict(), avatar=avatar)
-    db.add(new_user)
+    dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+    values = body.model_dump()
+    values['email'] = normalize_email(values['email'])
+    statement = dialect.insert(User).values(**values).on_conflict_do_nothing().returning(User)
+    new_user = db.scalars(statement).first()
     db.commit()
-    db.refresh(new_user)
     return new_user
 
+def iter_emails(db: Session, batch_size: int = 1000):
+    """
+    Stream normalized emails of all users.
+    
+    :param db: Database session.
+    :type db: Session
+    :param batch_size: Rows per fetch.
+    :type batch_size: int
+    :return: Iterator of emails.
+    :rtype: Iterator[str]
+    """
+    yield from db.scalars(select(func.lower(User.email)).execution_options(yield_per=batch_size))
+
 async def update_token(user: User, token: str | None, db: Session) -> None:
     """
     Update refresh token in User object.
@@ -1,11 +1,223 @@
-from typing import List, Optional
+import base64
+from dataclasses import dataclass
+import calendar
+from itertools import groupby
+from typing import Collection, Iterator, List, Optional
 
-from datetime import datetime, timedelta
-from sqlalchemy import and_
+from datetime import date, datetime, timedelta
+import orjson
+from sqlalchemy import ColumnElement, and_, delete, extract, func, insert, or_, select, tuple_, update
 from sqlalchemy.orm import Session
 
-from src.database.models import Contact, User
+from src.conf.config import get_settings
+from src.database.models import Contact, ContactChange, User
+from src.repository.counters import counter_keys, update_counters
+from src.repository.tags import delete_contact_tags, move_contact_tags, tagged_with
 from src.schemas import ContactModel
+from src.services.dedup import BLOCKING_KEYS, derived_keys, find_duplicates, normalize_email, normalize_phone
+from src.services.contacts_version import bump_version
+from src.services.events import contact_events
+
+
+# columns of ContactResponce, read queries select only them
+CONTACT_COLUMNS = (Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone, Contact.birthday)
+# sort keys of listing, each has (user_id, column, id) index; created is id order
+SORT_COLUMNS = {'first_name': Contact.first_name, 'last_name': Contact.last_name,
+                'birthday': Contact.birthday, 'created': Contact.id}
+# Python type of cursor value of sort key, birthday is ISO date string or None
+SORT_VALUE_TYPES = {'first_name': str, 'last_name': str, 'birthday': str, 'created': int}
+
+
+@dataclass(slots=True)
+class ContactRow:
+    """
+    Read-only contact row. Lighter than Contact entity: no identity map, no relationships, no instance state.
+    
+    Serialized by orjson as dict and accepted by ContactResponce.model_validate.
+    """
+    id: int
+    first_name: str
+    last_name: str
+    email: Optional[str]
+    phone: Optional[str]
+    birthday: Optional[date]
+
+
+@dataclass(slots=True)
+class ContactChanges:
+    """
+    Page of change feed: changed contacts, ids of deleted contacts and token for next sync.
+    """
+    changed: List[ContactRow]
+    deleted: List[int]
+    token: int
+    has_more: bool
+
+
+def record_change(user_id: int, contact_id: int, db: Session, deleted: bool = False) -> ContactChange:
+    """
+    Append contact change to change log. Id of change is new revision of contact.
+    
+    Change is flushed, not committed: it is committed together with contact write.
+    
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param contact_id: Contact id.
+    :type contact_id: int
+    :param db: Database session.
+    :type db: Session
+    :param deleted: True for tombstone.
+    :type deleted: bool
+    :return: Change log row.
+    :rtype: ContactChange
+    """
+    change = ContactChange(user_id=user_id, contact_id=contact_id, deleted=deleted, changed_at=datetime.utcnow())
+    db.add(change)
+    db.flush()
+    return change
+
+
+def bump_revisions(user_id: int, contact_ids: List[int], db: Session) -> None:
+    """
+    Give contacts new revisions, so change feed sends them again, e.g. after they were moved to another user.
+    Not committed.
+    
+    :param user_id: Contacts owner id.
+    :type user_id: int
+    :param contact_ids: Contact ids.
+    :type contact_ids: List[int]
+    :param db: Database session.
+    :type db: Session
+    """
+    if not contact_ids:
+        return
+    changed_at = datetime.utcnow()
+    revisions = db.execute(
+        insert(ContactChange).returning(ContactChange.id, sort_by_parameter_order=True),
+        [{'user_id': user_id, 'contact_id': contact_id, 'deleted': False, 'changed_at': changed_at}
+         for contact_id in contact_ids],
+    ).scalars().all()
+    db.execute(update(Contact), [{'id': contact_id, 'user_id': user_id, 'revision': revision, 'updated_at': changed_at}
+                                 for contact_id, revision in zip(contact_ids, revisions)])
+
+
+def prune_changes(before: datetime, batch_size: int, db: Session) -> int:
+    """
+    Delete oldest change log rows of created and updated contacts. Feed reads their revisions from contacts,
+    so only tombstones are needed to sync. The newest row is kept, so its id is never reused.
+    
+    :param before: Rows changed before it are deleted.
+    :type before: datetime
+    :param batch_size: Rows to delete.
+    :type batch_size: int
+    :param db: Database session.
+    :type db: Session
+    :return: Number of deleted rows.
+    :rtype: int
+    """
+    newest = select(func.max(ContactChange.id)).scalar_subquery()
+    ids = select(ContactChange.id).where(ContactChange.deleted.is_(False), ContactChange.changed_at < before,
+                                         ContactChange.id < newest).order_by(ContactChange.id).limit(batch_size)
+    return db.execute(delete(ContactChange).where(ContactChange.id.in_(ids))).rowcount
+
+
+def encode_cursor(row: ContactRow, sort: str, descending: bool = False) -> str:
+    """
+    Keyset cursor after row: sort key value and id of row.
+    
+    :param row: Last row of page.
+    :type row: ContactRow
+    :param sort: Sort key.
+    :type sort: str
+    :param descending: Descending order.
+    :type descending: bool
+    :return: Opaque cursor.
+    :rtype: str
+    """
+    payload = [sort, descending, getattr(row, SORT_COLUMNS[sort].key), row.id]
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode('ascii')
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool = False) -> tuple:
+    """
+    Sort key value and id from cursor.
+    
+    :param cursor: Cursor from previous page.
+    :type cursor: str
+    :param sort: Sort key of current request.
+    :type sort: str
+    :param descending: Descending order of current request.
+    :type descending: bool
+    :return: Sort key value and id.
+    :rtype: tuple
+    :raises ValueError: If cursor is malformed or was made for other sort.
+    """
+    try:
+        cursor_sort, cursor_descending, value, contact_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+    except (TypeError, ValueError, orjson.JSONDecodeError) as err:
+        raise ValueError('Invalid cursor') from err
+    if (cursor_sort, cursor_descending) != (sort, descending):
+        raise ValueError('Cursor does not match sort')
+    nullable = SORT_COLUMNS[sort].nullable
+    if type(contact_id) is not int or not (type(value) is SORT_VALUE_TYPES[sort] or value is None and nullable):
+        raise ValueError('Invalid cursor')
+    if sort == 'birthday' and value is not None:
+        try:
+            value = date.fromisoformat(value)
+        except ValueError as err:
+            raise ValueError('Invalid cursor') from err
+    return value, contact_id
+
+
+def after_cursor(sort: str, descending: bool, value, contact_id: int) -> ColumnElement[bool]:
+    """
+    Keyset filter of rows after cursor. NULL sort values of nullable column go last in ascending and first
+    in descending order, like in Postgres index, so one index scans both directions.
+    """
+    column = SORT_COLUMNS[sort]
+    if sort == 'created':
+        return Contact.id < contact_id if descending else Contact.id > contact_id
+    if not column.nullable:
+        after = tuple_(column, Contact.id)
+        return after < tuple_(value, contact_id) if descending else after > tuple_(value, contact_id)
+    if descending:
+        if value is None:
+            return or_(and_(column.is_(None), Contact.id < contact_id), column.is_not(None))
+        return tuple_(column, Contact.id) < tuple_(value, contact_id)
+    if value is None:
+        return and_(column.is_(None), Contact.id > contact_id)
+    return or_(tuple_(column, Contact.id) > tuple_(value, contact_id), column.is_(None))
+
+
+def sort_order(sort: str, descending: bool) -> tuple:
+    column = SORT_COLUMNS[sort]
+    if sort == 'created':
+        return (Contact.id.desc(),) if descending else (Contact.id,)
+    if descending:
+        return column.desc().nulls_first(), Contact.id.desc()
+    return column.asc().nulls_last(), Contact.id
+
+
+async def invalidate_caches(user_id: int) -> None:
+    """
+    Make cached reads derived from contacts of user stale: birthdays and reverse lookups share contacts version.
+    
+    :param user_id: Contact owner id.
+    :type user_id: int
+    """
+    await bump_version(user_id)
+
+
+def contact_data(contact: Contact) -> dict:
+    """
+    ContactResponce fields of contact, for events.
+    
+    :param contact: Contact object.
+    :type contact: Contact
+    :return: Contact fields.
+    :rtype: dict
+    """
+    return {column.key: getattr(contact, column.key) for column in CONTACT_COLUMNS}
 
 
 # GET
@@ -15,13 +227,20 @@ async def get_contacts(skip: int,
                        db: Session,
                        first_name: Optional[str] = None,
                        last_name:Optional[str] = None,
-                       email: Optional[str] = None) -> List[Contact]:
+                       email: Optional[str] = None,
+                       tags: Optional[List[str]] = None,
+                       match_all_tags: bool = False,
+                       sort: str = 'created',
+                       descending: bool = False,
+                       cursor: Optional[str] = None) -> List[ContactRow]:
     """
     Get all contacts created by current user.
     
     Can be restricted by offset and limit arguments.
     
-    Can be filtred by first and last name and email.
+    Can be filtred by first and last name, email and tags: contacts with any of tags or with all of them.
+    
+    Rows are ordered by sort key and id. Next page starts after cursor made by encode_cursor from last row.
     
     :param skip: Rows to skip.
     :type skip: int
@@ -37,8 +256,18 @@ async def get_contacts(skip: int,
     :type last_name: Optional[str]
     :param email:
     :type email: Optional[str]
+    :param tags: Tag names.
+    :type tags: Optional[List[str]]
+    :param match_all_tags: Contacts must have all tags.
+    :type match_all_tags: bool
+    :param sort: Sort key: first_name, last_name, birthday or created.
+    :type sort: str
+    :param descending: Descending order.
+    :type descending: bool
+    :param cursor: Cursor of previous page.
+    :type cursor: Optional[str]
     :return: List of Contacts created by current user, restricted by skip and limit arguments and matched with filters.
-    :rtype: List[Contact]
+    :rtype: List[ContactRow]
     """
     filters = []
     if first_name:
@@ -47,11 +276,63 @@ async def get_contacts(skip: int,
         filters.append(Contact.last_name == last_name)
     if email:
         filters.append(Contact.email == email)
+    if tags:
+        filters.append(tagged_with(tags, user.id, match_all_tags))
+    if cursor:
+        filters.append(after_cursor(sort, descending, *decode_cursor(cursor, sort, descending)))
     filters.append(Contact.user_id == user.id)
-    contacts = db.query(Contact).filter(and_(*filters)).offset(skip).limit(limit).all()
-    return contacts
+    rows = db.execute(select(*CONTACT_COLUMNS).where(and_(*filters))
+                      .order_by(*sort_order(sort, descending)).offset(skip).limit(limit))
+    return [ContactRow(*row) for row in rows]
 
-async def get_contacts_with_bithday_on_next_week(user: User, db: Session) -> List[Contact]:
+def birthday_window(today: date, days: int = 7) -> dict[tuple[int, int], date]:
+    """
+    (month, day) pairs of days after today, mapped to their dates. In non-leap year Feb 29 birthday is on Mar 1.
+    
+    :param today: First day before window.
+    :type today: date
+    :param days: Window length.
+    :type days: int
+    :return: Birthday (month, day) to date of celebration.
+    :rtype: dict[tuple[int, int], date]
+    """
+    window = {}
+    for offset in range(1, days + 1):
+        day = today + timedelta(days=offset)
+        window[(day.month, day.day)] = day
+        if (day.month, day.day) == (3, 1) and not calendar.isleap(day.year):
+            window[(2, 29)] = day
+    return window
+
+def upcoming_birthdays(db: Session,
+                       today: date,
+                       user_ids: Collection[int] | None = None) -> Iterator[tuple[int, List[ContactRow]]]:
+    """
+    Contacts with birthday on next week, grouped by owner, in one query over contacts.
+    
+    Birthdays are matched by month and day in SQL, so rows of other days are never loaded.
+    
+    :param db: Database session.
+    :type db: Session
+    :param today: Current date.
+    :type today: date
+    :param user_ids: Only contacts of these users, if set.
+    :type user_ids: Collection[int] | None
+    :return: Pairs of user id and contacts ordered by upcoming birthday, for users with upcoming birthdays.
+    :rtype: Iterator[tuple[int, List[ContactRow]]]
+    """
+    window = birthday_window(today)
+    month, day = extract('month', Contact.birthday), extract('day', Contact.birthday)
+    query = select(Contact.user_id, *CONTACT_COLUMNS).where(or_(*(and_(month == m, day == d) for m, d in window)))
+    if user_ids is not None:
+        query = query.where(Contact.user_id.in_(user_ids))
+    rows = db.execute(query.order_by(Contact.user_id).execution_options(yield_per=1000))
+    for owner, group in groupby(rows, key=lambda row: row.user_id):
+        contacts = [ContactRow(*row[1:]) for row in group]
+        contacts.sort(key=lambda contact: window[(contact.birthday.month, contact.birthday.day)])
+        yield owner, contacts
+
+async def get_contacts_with_bithday_on_next_week(user: User, db: Session) -> List[ContactRow]:
     """
     Get list of Contacts created by current user and whos birthday in on next week.
     
@@ -59,20 +340,14 @@ async def get_contacts_with_bithday_on_next_week(user: User, db: Session) -> Lis
     :type user: User
     :param db: Database session.
     :type db: Session
-    :return: List of Contacts created by current user and whos birthday is on next week.
-    :rtype: List[Contact]
+    :return: List of Contacts created by current user and whos birthday is on next week, by upcoming birthday.
+    :rtype: List[ContactRow]
     """
-    today = datetime.today().date()
-    day_after_one_week = today + timedelta(days=7)
-    contacts = db.query(Contact).filter(Contact.user_id == user.id).all()
-    filtered_contacts = []
-    for contact in contacts:
-        birthday_date = contact.birthday.replace(year=today.year)
-        if birthday_date > today and birthday_date <= day_after_one_week:
-            filtered_contacts.append(contact)
-    return filtered_contacts
+    for _, contacts in upcoming_birthdays(db, date.today(), [user.id]):
+        return contacts
+    return []
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Contact | None:
+async def get_contact(contact_id: int, user: User, db: Session) -> ContactRow | None:
     """
     Get Contact with contact_id.
     
@@ -84,19 +359,121 @@ async def get_contact(contact_id: int, user: User, db: Session) -> Contact | Non
     :type user: User
     :param db: Database session.
     :type db: Session
-    :return: Contact object with such contact_id or None.
-    :rtype: Contact | None
+    :return: Contact row with such contact_id or None.
+    :rtype: ContactRow | None
     """
-    contact = db.query(Contact).filter(and_(
+    row = db.execute(select(*CONTACT_COLUMNS).where(and_(
         Contact.id == contact_id,
         Contact.user_id == user.id
-        )).first()
+        ))).first()
 
-    return contact
+    return ContactRow(*row) if row else None
+
+async def lookup_contacts(user: User, db: Session, phone: str | None = None, email: str | None = None) -> List[ContactRow]:
+    """
+    Find contacts of current user by phone or email in any format. Uses (user_id, phone_e164) and
+    (user_id, email_normalized) indexes.
+    
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :param phone: Phone to find.
+    :type phone: str | None
+    :param email: Email to find.
+    :type email: str | None
+    :return: Matched contacts.
+    :rtype: List[ContactRow]
+    """
+    matches = []
+    if normalize_phone(phone):
+        matches.append(Contact.phone_e164 == normalize_phone(phone))
+    if normalize_email(email):
+        matches.append(Contact.email_normalized == normalize_email(email))
+    if not matches:
+        return []
+    rows = db.execute(select(*CONTACT_COLUMNS).where(Contact.user_id == user.id, or_(*matches)).order_by(Contact.id))
+    return [ContactRow(*row) for row in rows]
+
+async def get_changes(since: int, limit: int, user: User, db: Session) -> ContactChanges:
+    """
+    Get contacts changed and deleted after revision since, in revision order.
+    
+    Token is the last revision of settled prefix of the page: changes younger than changes_settle_seconds
+    may still have concurrent transactions with lower revisions in flight, so they are sent again on next sync.
+    If page is cut short by them, has_more is false even if more changes exist: the next page would start from
+    the same token, so client waits for its regular sync instead.
+    
+    :param since: Token of previous sync, 0 for first sync.
+    :type since: int
+    :param limit: Max changes in page.
+    :type limit: int
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Page of changes.
+    :rtype: ContactChanges
+    """
+    upserts = db.execute(
+        select(*CONTACT_COLUMNS, Contact.revision, Contact.updated_at)
+        .where(Contact.user_id == user.id, Contact.revision > since)
+        .order_by(Contact.revision).limit(limit + 1)
+    )
+    tombstones = db.execute(
+        select(ContactChange.contact_id, ContactChange.id, ContactChange.changed_at)
+        .where(ContactChange.user_id == user.id, ContactChange.deleted.is_(True), ContactChange.id > since)
+        .order_by(ContactChange.id).limit(limit + 1)
+    )
+    changes = [(row.revision, row.updated_at, ContactRow(*row[:len(CONTACT_COLUMNS)])) for row in upserts]
+    changes += [(row.id, row.changed_at, row.contact_id) for row in tombstones]
+    changes.sort(key=lambda change: change[0])
+    page = changes[:limit]
+
+    settled_before = datetime.utcnow() - timedelta(seconds=get_settings().changes_settle_seconds)
+    token, settled = since, True
+    for revision, changed_at, _ in page:
+        if changed_at > settled_before:
+            settled = False
+            break
+        token = revision
+    return ContactChanges(
+        changed=[item for _, _, item in page if isinstance(item, ContactRow)],
+        deleted=[item for _, _, item in page if isinstance(item, int)],
+        token=token,
+        has_more=settled and len(changes) > limit
+    )
+
+
+async def get_duplicates(user: User, db: Session) -> List[List[ContactRow]]:
+    """
+    Get groups of duplicate contacts of current user.
+    
+    Only contacts sharing normalized email, phone or name key with another contact are loaded: keys shared
+    by several contacts are found by GROUP BY over (user_id, key) indexes.
+    
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Groups of duplicates, ordered by id.
+    :rtype: List[List[ContactRow]]
+    """
+    shared = []
+    for key in BLOCKING_KEYS:
+        column = getattr(Contact, key)
+        shared.append(column.in_(
+            select(column).where(Contact.user_id == user.id, column.is_not(None))
+            .group_by(column).having(func.count() > 1)
+        ))
+    keys = [getattr(Contact, key) for key in BLOCKING_KEYS]
+    rows = db.execute(select(*CONTACT_COLUMNS, *keys).where(Contact.user_id == user.id, or_(*shared)))
+    groups = find_duplicates(rows)
+    return [[ContactRow(*row[:len(CONTACT_COLUMNS)]) for row in group] for group in groups]
 # POST
 async def create_contact(body: ContactModel, user: User, db: Session) -> Contact:
     """
-    Create new Contact by ContactModel.
+    Create new Contact by ContactModel. Publish 'created' event.
     
     :param body: Contact info.
     :type body: ContactModel
@@ -112,15 +489,21 @@ async def create_contact(body: ContactModel, user: User, db: Session) -> Contact
                       email=body.email,
                       phone=body.phone,
                       birthday=body.birthday,
-                      user=user)
+                      user_id=user.id,
+                      **derived_keys(body.first_name, body.last_name, body.email, body.phone))
+    # revision is assigned on insert, see models.assign_revision
     db.add(contact)
+    db.flush()
+    update_counters(user.id, [], counter_keys(contact), db)
     db.commit()
     db.refresh(contact)
+    await invalidate_caches(user.id)
+    await contact_events.publish(user.id, 'created', contact_data(contact))
     return contact
 # PUT
 async def update_contact(contact_id: int, body: ContactModel, user: User, db: Session) -> Contact | None:
     """
-    Update Contact with new Contact info.
+    Update Contact with new Contact info. Publish 'updated' event.
     
     :param contact_id:
     :type contact_id: int
@@ -139,13 +522,70 @@ async def update_contact(contact_id: int, body: ContactModel, user: User, db: Se
         )).first()
 
     if contact:
+        removed = counter_keys(contact)
+        change = record_change(user.id, contact.id, db)
+        contact.revision, contact.updated_at = change.id, change.changed_at
         contact.first_name = body.first_name
         contact.last_name = body.last_name
         contact.email = body.email
         contact.phone = body.phone
         contact.birthday = body.birthday
+        for key, value in derived_keys(body.first_name, body.last_name, body.email, body.phone).items():
+            setattr(contact, key, value)
+        update_counters(user.id, removed, counter_keys(contact), db)
         db.commit()
         db.refresh(contact)
+        await invalidate_caches(user.id)
+        await contact_events.publish(user.id, 'updated', contact_data(contact))
+    return contact
+async def merge_contacts(contact_id: int, duplicate_ids: List[int], user: User, db: Session) -> Contact | None:
+    """
+    Merge duplicates into contact with contact_id. Empty email, phone and birthday of contact are taken
+    from duplicates in given order, tags of duplicates are added, then duplicates are deleted with tombstones
+    in change log.
+    
+    If contact or any duplicate is not found, return None and change nothing.
+    
+    :param contact_id: Contact ID to keep.
+    :type contact_id: int
+    :param duplicate_ids: Contact IDs to merge and delete.
+    :type duplicate_ids: List[int]
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Merged Contact object or None.
+    :rtype: Contact | None
+    """
+    duplicate_ids = [duplicate_id for duplicate_id in dict.fromkeys(duplicate_ids) if duplicate_id != contact_id]
+    contacts = {contact.id: contact for contact in db.query(Contact).filter(and_(
+        Contact.id.in_([contact_id, *duplicate_ids]),
+        Contact.user_id == user.id
+        ))}
+    if len(contacts) != len(duplicate_ids) + 1:
+        return None
+    
+    contact = contacts[contact_id]
+    removed = [key for merged in contacts.values() for key in counter_keys(merged)]
+    for duplicate_id in duplicate_ids:
+        duplicate = contacts[duplicate_id]
+        for field in ('email', 'phone', 'birthday'):
+            if getattr(contact, field) is None:
+                setattr(contact, field, getattr(duplicate, field))
+        record_change(user.id, duplicate_id, db, deleted=True)
+        db.delete(duplicate)
+    move_contact_tags(duplicate_ids, contact.id, user.id, db)
+    for key, value in derived_keys(contact.first_name, contact.last_name, contact.email, contact.phone).items():
+        setattr(contact, key, value)
+    update_counters(user.id, removed, counter_keys(contact), db)
+    change = record_change(user.id, contact.id, db)
+    contact.revision, contact.updated_at = change.id, change.changed_at
+    db.commit()
+    db.refresh(contact)
+    await invalidate_caches(user.id)
+    for duplicate_id in duplicate_ids:
+        await contact_events.publish(user.id, 'deleted', {'id': duplicate_id})
+    await contact_events.publish(user.id, 'updated', contact_data(contact))
     return contact
 # DELETE
 async def delete_contact(contact_id: int, user: User, db: Session) -> Contact | None:
@@ -153,6 +593,8 @@ async def delete_contact(contact_id: int, user: User, db: Session) -> Contact |
     Delete Contact with contact_id.
     
     If not Contact with such id, return None
+    
+    Tombstone is written to change log, 'deleted' event is published.
      
     :param contact_id: Contact ID to delete.
     :type contact_id: int
@@ -169,7 +611,12 @@ async def delete_contact(contact_id: int, user: User, db: Session) -> Contact |
         )).first()
 
     if contact:
+        record_change(user.id, contact.id, db, deleted=True)
+        delete_contact_tags([contact.id], user.id, db)
+        update_counters(user.id, counter_keys(contact), [], db)
         db.delete(contact)
         db.commit()
+        await invalidate_caches(user.id)
+        await contact_events.publish(user.id, 'deleted', {'id': contact_id})
     return contact
 
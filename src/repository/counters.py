@@ -0,0 +1,109 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.database.models import ContactCounter, User
+
+
+TOTAL = 'total'
+BIRTHDAY_MONTH = 'birthday_month'
+EMAIL_DOMAIN = 'email_domain'
+
+
+@dataclass(slots=True)
+class ContactStats:
+    """
+    Contacts count of user: total, by birthday month and by email domain.
+    """
+    total: int = 0
+    birthday_months: Dict[int, int] = field(default_factory=dict)
+    email_domains: Dict[str, int] = field(default_factory=dict)
+
+
+def counter_keys(contact) -> list[tuple[str, str]]:
+    """
+    Counters of contact.
+
+    :param contact: Contact or row with birthday and email_normalized.
+    :return: (kind, key) pairs, contact adds 1 to each of them.
+    :rtype: list[tuple[str, str]]
+    """
+    keys = [(TOTAL, '')]
+    if contact.birthday is not None:
+        keys.append((BIRTHDAY_MONTH, str(contact.birthday.month)))
+    if contact.email_normalized and '@' in contact.email_normalized:
+        keys.append((EMAIL_DOMAIN, contact.email_normalized.rsplit('@', 1)[1][:100]))
+    return keys
+
+
+def update_counters(user_id: int, removed: Iterable[tuple[str, str]], added: Iterable[tuple[str, str]],
+                    db: Session) -> None:
+    """
+    Apply contact write to counters of user with one upsert. Not committed: it is committed together
+    with contact write.
+
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param removed: Counter keys of contacts before write.
+    :type removed: Iterable[tuple[str, str]]
+    :param added: Counter keys of contacts after write.
+    :type added: Iterable[tuple[str, str]]
+    :param db: Database session.
+    :type db: Session
+    """
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    add_to_counters(user_id, deltas, db)
+
+
+def add_to_counters(user_id: int, deltas: Mapping[tuple[str, str], int], db: Session) -> None:
+    """
+    Add deltas to counters of user with one upsert. Not committed.
+
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param deltas: (kind, key) to number to add, may be negative.
+    :type deltas: Mapping[tuple[str, str], int]
+    :param db: Database session.
+    :type db: Session
+    """
+    values = [{'user_id': user_id, 'kind': kind, 'key': key, 'count': delta}
+              for (kind, key), delta in sorted(deltas.items()) if delta]
+    if not values:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(ContactCounter).values(values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[ContactCounter.user_id, ContactCounter.kind, ContactCounter.key],
+        set_={'count': ContactCounter.count + statement.excluded.count},
+    ))
+
+
+async def get_stats(user: User, db: Session) -> ContactStats:
+    """
+    Get contact stats of current user from counters, without reading contacts.
+
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Contact stats.
+    :rtype: ContactStats
+    """
+    stats = ContactStats()
+    rows = db.execute(select(ContactCounter.kind, ContactCounter.key, ContactCounter.count)
+                      .where(ContactCounter.user_id == user.id, ContactCounter.count > 0))
+    for kind, key, count in rows:
+        if kind == TOTAL:
+            stats.total = count
+        elif kind == BIRTHDAY_MONTH:
+            stats.birthday_months[int(key)] = count
+        elif kind == EMAIL_DOMAIN:
+            stats.email_domains[key] = count
+    stats.birthday_months = dict(sorted(stats.birthday_months.items()))
+    stats.email_domains = dict(sorted(stats.email_domains.items(), key=lambda item: (-item[1], item[0])))
+    return stats
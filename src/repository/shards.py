@@ -0,0 +1,119 @@
+import zlib
+
+from fastapi import Depends
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.conf.config import get_settings
+from src.database.db import Sessionlocal, get_db, get_read_db, lazy_sessionmaker
+from src.database.models import User
+from src.services.auth import auth_service
+
+
+class ShardRouter:
+    """
+    Route contacts of user to one of shard databases by hash of user_id.
+    
+    Shard databases hold contacts of their users only. Users stay in primary database, so shard schema
+    has no foreign key to users. Schema of every shard is created and upgraded by the same migrations,
+    for each index of contacts_shard_urls::
+    
+        alembic -x shard=0 upgrade head
+    
+    Users table is created in shards too and stays empty.
+    
+    Shard of user is crc32(user_id) modulo number of shards, so number of shards is fixed once contacts
+    are written: with one more shard most users map to another shard. Resharding means copying contacts
+    of every moved user to the new shard (see repository.users.copy_contacts) and deleting them from the old
+    one while their writes are stopped, then switching contacts_shard_urls. To grow shards online, shard
+    of user has to be stored in a directory table instead.
+    """
+
+    def __init__(self, shards: list[sessionmaker]):
+        self.shards = shards
+
+    def shard_id(self, user_id: int) -> int:
+        """
+        Stable shard number of user.
+        
+        :param user_id: User id.
+        :type user_id: int
+        :return: Shard number.
+        :rtype: int
+        """
+        return zlib.crc32(user_id.to_bytes(8, 'big', signed=True)) % len(self.shards)
+
+    def session(self, user_id: int) -> Session:
+        """
+        Open session to shard of user.
+        
+        :param user_id: User id.
+        :type user_id: int
+        :return: Shard session.
+        :rtype: Session
+        """
+        return self.shards[self.shard_id(user_id)]()
+
+
+_shard_router: ShardRouter | None = None
+
+
+def get_shard_router() -> ShardRouter | None:
+    """
+    Get router of contacts shards configured by contacts_shard_urls setting.
+
+    :return: Shard router, or None if sharding is off.
+    :rtype: ShardRouter | None
+    """
+    global _shard_router
+    urls = get_settings().contacts_shard_urls
+    if _shard_router is None and urls:
+        _shard_router = ShardRouter([lazy_sessionmaker(url) for url in urls])
+    return _shard_router
+
+
+def contact_databases() -> list[sessionmaker]:
+    """
+    Databases with contacts, for batch jobs: shards, or primary database if sharding is off.
+    """
+    shard_router = get_shard_router()
+    return shard_router.shards if shard_router is not None else [Sessionlocal]
+
+
+def contacts_database_of(user_id: int) -> sessionmaker:
+    """
+    Database with contacts of user, for batch jobs: shard of user, or primary database if sharding is off.
+    """
+    shard_router = get_shard_router()
+    return shard_router.shards[shard_router.shard_id(user_id)] if shard_router is not None else Sessionlocal
+
+
+def get_contacts_db(current_user: User = Depends(auth_service.get_current_user),
+                    db: Session = Depends(get_db)):
+    """
+    Session for contacts writes: shard of current user, or primary database if sharding is off.
+    """
+    shard_router = get_shard_router()
+    if shard_router is None:
+        yield db
+        return
+    shard = shard_router.session(current_user.id)
+    try:
+        yield shard
+    finally:
+        shard.close()
+
+
+def get_contacts_read_db(current_user: User = Depends(auth_service.get_current_user),
+                         db: Session = Depends(get_read_db)):
+    """
+    Session for contacts reads: shard of current user, or read replica if sharding is off.
+    """
+    shard_router = get_shard_router()
+    if shard_router is None:
+        yield db
+        return
+    shard = shard_router.session(current_user.id)
+    try:
+        yield shard
+    finally:
+        shard.close()
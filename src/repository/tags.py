@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy import ColumnElement, and_, func, select
+from sqlalchemy.orm import Session
+
+from src.database.models import Contact, ContactTag, Tag, User
+
+
+@dataclass(slots=True)
+class TagCount:
+    """
+    Tag with number of tagged contacts.
+    """
+    name: str
+    count: int
+
+
+def tagged_with(names: List[str], user_id: int, match_all: bool = False) -> ColumnElement[bool]:
+    """
+    Filter of contacts tagged with any or all of names. Subquery goes through (tag_id, contact_id) index.
+
+    :param names: Tag names.
+    :type names: List[str]
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param match_all: Contact must have all tags, not any of them.
+    :type match_all: bool
+    :return: Filter for contacts query.
+    :rtype: ColumnElement[bool]
+    """
+    names = set(names)
+    contact_ids = (
+        select(ContactTag.contact_id)
+        .join(Tag, Tag.id == ContactTag.tag_id)
+        .where(Tag.user_id == user_id, Tag.name.in_(names))
+    )
+    if match_all:
+        contact_ids = contact_ids.group_by(ContactTag.contact_id).having(func.count() == len(names))
+    return Contact.id.in_(contact_ids)
+
+
+def delete_contact_tags(contact_ids: List[int], user_id: int, db: Session) -> None:
+    """
+    Untag deleted contacts. Not committed: it is committed together with contact delete.
+
+    :param contact_ids: Contact ids.
+    :type contact_ids: List[int]
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param db: Database session.
+    :type db: Session
+    """
+    db.query(ContactTag).filter(ContactTag.user_id == user_id, ContactTag.contact_id.in_(contact_ids)) \
+        .delete(synchronize_session=False)
+
+
+def move_contact_tags(source_ids: List[int], contact_id: int, user_id: int, db: Session) -> None:
+    """
+    Add tags of source contacts to contact and untag source contacts. Not committed.
+
+    :param source_ids: Contact ids to take tags from.
+    :type source_ids: List[int]
+    :param contact_id: Contact id to add tags to.
+    :type contact_id: int
+    :param user_id: Contact owner id.
+    :type user_id: int
+    :param db: Database session.
+    :type db: Session
+    """
+    tag_ids = set(db.scalars(select(ContactTag.tag_id).where(
+        ContactTag.user_id == user_id, ContactTag.contact_id.in_(source_ids))))
+    tag_ids -= set(db.scalars(select(ContactTag.tag_id).where(
+        ContactTag.user_id == user_id, ContactTag.contact_id == contact_id)))
+    delete_contact_tags(source_ids, user_id, db)
+    db.add_all(ContactTag(contact_id=contact_id, tag_id=tag_id, user_id=user_id) for tag_id in tag_ids)
+
+
+async def get_tags(user: User, db: Session) -> List[TagCount]:
+    """
+    Get tags of current user with number of tagged contacts, in one aggregate query.
+
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Tags ordered by name.
+    :rtype: List[TagCount]
+    """
+    rows = db.execute(
+        select(Tag.name, func.count(ContactTag.contact_id))
+        .outerjoin(ContactTag, ContactTag.tag_id == Tag.id)
+        .where(Tag.user_id == user.id)
+        .group_by(Tag.id, Tag.name)
+        .order_by(Tag.name)
+    )
+    return [TagCount(*row) for row in rows]
+
+
+async def set_contact_tags(contact_id: int, names: List[str], user: User, db: Session) -> List[str] | None:
+    """
+    Replace tags of contact. Missing tags are created.
+
+    If not Contact with such id, return None.
+
+    :param contact_id: Contact ID to tag.
+    :type contact_id: int
+    :param names: Tag names.
+    :type names: List[str]
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Tag names of contact.
+    :rtype: List[str] | None
+    """
+    contact = db.execute(select(Contact.id).where(and_(
+        Contact.id == contact_id,
+        Contact.user_id == user.id
+        ))).first()
+    if contact is None:
+        return None
+
+    names = sorted(set(names))
+    tags = {tag.name: tag for tag in db.query(Tag).filter(Tag.user_id == user.id, Tag.name.in_(names))}
+    for name in names:
+        if name not in tags:
+            tags[name] = Tag(user_id=user.id, name=name)
+            db.add(tags[name])
+    db.flush()
+    delete_contact_tags([contact_id], user.id, db)
+    db.add_all(ContactTag(contact_id=contact_id, tag_id=tags[name].id, user_id=user.id) for name in names)
+    db.commit()
+    return names
+
+
+async def delete_tag(name: str, user: User, db: Session) -> Tag | None:
+    """
+    Delete tag and untag its contacts.
+
+    If not Tag with such name, return None.
+
+    :param name: Tag name.
+    :type name: str
+    :param user: Current user.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Deleted Tag object or None.
+    :rtype: Tag | None
+    """
+    tag = db.query(Tag).filter(Tag.user_id == user.id, Tag.name == name).first()
+    if tag:
+        db.query(ContactTag).filter(ContactTag.tag_id == tag.id).delete(synchronize_session=False)
+        db.delete(tag)
+        db.commit()
+    return tag
@@ -1,7 +1,15 @@
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import List
 
-from src.database.models import User
-from src.repository.auth import get_user_by_email
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.database.db import Sessionlocal
+from src.database.models import Contact, ContactChange, ContactCounter, ContactTag, Tag, User
+from src.repository.auth import get_user_by_email, normalize_email
+from src.repository.contacts import bump_revisions
+from src.repository.counters import add_to_counters
+from src.services.gravatar import default_avatar
 
 
 async def update_avatar(email: str, url: str, db: Session) -> User:
@@ -21,4 +29,138 @@ async def update_avatar(email: str, url: str, db: Session) -> User:
     user.avatar = url
     db.commit()
     db.refresh(user)
-    return user
\ No newline at end of file
+    return user
+
+def fill_default_avatar(user_id: int, email: str, users_db: sessionmaker | None = None) -> None:
+    """
+    Set default Gravatar url for user without avatar. Runs as background task after signup, in threadpool.
+    
+    Request session may be closed when task runs, so task opens its own one.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param email: User email.
+    :type email: str
+    :param users_db: Database with users, primary database by default.
+    :type users_db: sessionmaker | None
+    :rtype: None
+    """
+    with (users_db or Sessionlocal)() as db:
+        db.query(User).filter(User.id == user_id, User.avatar.is_(None)).update(
+            {User.avatar: default_avatar(email)}, synchronize_session=False
+        )
+        db.commit()
+
+
+def get_duplicate_emails(db: Session, limit: int) -> List[List[User]]:
+    """
+    Get users whos emails differ only in case, grouped by email. Account to keep goes first in group:
+    confirmed one, then oldest one.
+    
+    :param db: Database session.
+    :type db: Session
+    :param limit: Max groups.
+    :type limit: int
+    :return: Groups of users.
+    :rtype: List[List[User]]
+    """
+    emails = select(func.lower(User.email)).group_by(func.lower(User.email)).having(func.count() > 1).limit(limit)
+    groups = defaultdict(list)
+    users = db.query(User).filter(func.lower(User.email).in_(emails)).order_by(User.confirmed.desc(), User.id)
+    for user in users:
+        groups[normalize_email(user.email)].append(user)
+    return list(groups.values())
+
+def move_contacts(keep_id: int, duplicate_ids: List[int], db: Session) -> None:
+    """
+    Give contacts, change log, tags and counters of duplicate users to user to keep, in database of both.
+    Tags with same name are joined. Moved contacts get new revisions, so change feed of user to keep sends them.
+    Not committed.
+    
+    :param keep_id: User id to keep.
+    :type keep_id: int
+    :param duplicate_ids: User ids to take contacts from.
+    :type duplicate_ids: List[int]
+    :param db: Session of contacts database.
+    :type db: Session
+    """
+    moved_ids = db.execute(select(Contact.id).where(Contact.user_id.in_(duplicate_ids)).order_by(Contact.id)) \
+        .scalars().all()
+    db.query(Contact).filter(Contact.user_id.in_(duplicate_ids)).update(
+        {Contact.user_id: keep_id}, synchronize_session=False)
+    db.query(ContactChange).filter(ContactChange.user_id.in_(duplicate_ids)).update(
+        {ContactChange.user_id: keep_id}, synchronize_session=False)
+    
+    keep_tags = dict(db.execute(select(Tag.name, Tag.id).where(Tag.user_id == keep_id)).all())
+    for tag in db.query(Tag).filter(Tag.user_id.in_(duplicate_ids)).order_by(Tag.id):
+        if tag.name not in keep_tags:
+            tag.user_id, keep_tags[tag.name] = keep_id, tag.id
+            continue
+        tagged = select(ContactTag.contact_id).where(ContactTag.tag_id == keep_tags[tag.name])
+        db.query(ContactTag).filter(ContactTag.tag_id == tag.id, ContactTag.contact_id.in_(tagged)).delete(
+            synchronize_session=False)
+        db.query(ContactTag).filter(ContactTag.tag_id == tag.id).update(
+            {ContactTag.tag_id: keep_tags[tag.name]}, synchronize_session=False)
+        db.delete(tag)
+    db.query(ContactTag).filter(ContactTag.user_id.in_(duplicate_ids)).update(
+        {ContactTag.user_id: keep_id}, synchronize_session=False)
+    
+    counters = db.execute(
+        select(ContactCounter.kind, ContactCounter.key, func.sum(ContactCounter.count))
+        .where(ContactCounter.user_id.in_(duplicate_ids)).group_by(ContactCounter.kind, ContactCounter.key)
+    )
+    add_to_counters(keep_id, {(kind, key): count for kind, key, count in counters}, db)
+    db.query(ContactCounter).filter(ContactCounter.user_id.in_(duplicate_ids)).delete(synchronize_session=False)
+    bump_revisions(keep_id, moved_ids, db)
+
+
+def copy_contacts(duplicate_id: int, keep_id: int, source: Session, target: Session) -> None:
+    """
+    Copy contacts, tags and counters of duplicate user to user to keep in another database, e.g. shard of user
+    to keep. Contacts get new ids and revisions there, tags with same name are joined. Not committed.
+    
+    :param duplicate_id: User id to take contacts from.
+    :type duplicate_id: int
+    :param keep_id: User id to keep.
+    :type keep_id: int
+    :param source: Session of database of duplicate user.
+    :type source: Session
+    :param target: Session of database of user to keep.
+    :type target: Session
+    """
+    copied_ids = {}
+    for contact in source.query(Contact).filter(Contact.user_id == duplicate_id).order_by(Contact.id):
+        copy = Contact(**{column.key: getattr(contact, column.key) for column in Contact.__table__.columns
+                          if column.key not in ('id', 'user_id', 'revision', 'updated_at')}, user_id=keep_id)
+        target.add(copy)
+        target.flush()
+        copied_ids[contact.id] = copy.id
+    
+    keep_tags = dict(target.execute(select(Tag.name, Tag.id).where(Tag.user_id == keep_id)).all())
+    for name in source.execute(select(Tag.name).where(Tag.user_id == duplicate_id).order_by(Tag.id)).scalars():
+        if name not in keep_tags:
+            tag = Tag(user_id=keep_id, name=name)
+            target.add(tag)
+            target.flush()
+            keep_tags[name] = tag.id
+    tagged = source.execute(select(Tag.name, ContactTag.contact_id).join(ContactTag, ContactTag.tag_id == Tag.id)
+                            .where(Tag.user_id == duplicate_id))
+    target.add_all(ContactTag(contact_id=copied_ids[contact_id], tag_id=keep_tags[name], user_id=keep_id)
+                   for name, contact_id in tagged)
+    
+    counters = source.execute(select(ContactCounter.kind, ContactCounter.key, ContactCounter.count)
+                              .where(ContactCounter.user_id == duplicate_id))
+    add_to_counters(keep_id, {(kind, key): count for kind, key, count in counters}, target)
+
+
+def delete_contacts_of(user_id: int, db: Session) -> None:
+    """
+    Delete contacts, change log, tags and counters of user. Not committed.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param db: Session of contacts database.
+    :type db: Session
+    """
+    for model in (ContactTag, Tag, ContactCounter, ContactChange, Contact):
+        db.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
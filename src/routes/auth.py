@@ -5,8 +5,10 @@ from sqlalchemy.orm import Session
 from src.database.db import get_db
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import auth as repo_auth
+from src.repository import users as repo_users
 from src.services.auth import auth_service
 from src.services.email import send_email, send_reset_password_email
+from src.services.signup_filter import get_email_filter
 
 
 router = APIRouter(prefix='/auth', tags=['auth'])
@@ -20,7 +22,13 @@ async def signup(body: UserModel,
     """
     Create nwe user. If user with this email exists, raise 409 error
     
+    Bloom filter in Redis only saves work: email it has never seen is inserted at once, without lookup.
+    Email it might have seen is looked up first, so taken email is rejected before password hashing;
+    filter false positive goes on to insert. Insert conflict means email is taken.
+    
     After send request, app send message with verification token to confirm email.
+    
+    Default avatar is stored in background, after response is sent.
 
     :param body: Email and password.
     :type body: UserModel
@@ -33,12 +41,15 @@ async def signup(body: UserModel,
     :return: Message with new user info. Response with 201 status code.
     :rtype: UserResponse
     """
-    exist_user = await repo_auth.get_user_by_email(body.email, db)
-    if exist_user:
+    if await get_email_filter().might_contain(body.email) and await repo_auth.get_user_by_email(body.email, db):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Account with this email already exist')
     body.password = auth_service.get_password_hash(body.password)
     new_user = await repo_auth.create_user(body, db)
+    await get_email_filter().add(body.email)
+    if new_user is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Account with this email already exist')
     background_tasks.add_task(send_email, new_user.email, request.base_url) # starts verification way
+    background_tasks.add_task(repo_users.fill_default_avatar, new_user.id, new_user.email)
     return {"user": new_user, "detail": "User successfully created. Check your email for confirmation"}
 
 
@@ -1,34 +1,58 @@
-from typing import List
+import asyncio
+from datetime import date
+import time
+from typing import AsyncIterator, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi_limiter.depends import RateLimiter
+import orjson
 from sqlalchemy.orm import Session
 
-from src.database.db import get_db
+from src.database.db import TrackWriteRoute, get_db
 from src.database.models import User
-from src.schemas import ContactModel, ContactResponce
+from src.schemas import (ContactModel, ContactResponce, ContactChangesResponse, ContactMergeModel, ContactStatsResponse,
+                         ContactTagsModel)
 from src.repository import contacts as repo_contacts
+from src.repository import counters as repo_counters
+from src.repository import tags as repo_tags
+from src.repository.shards import get_contacts_db, get_contacts_read_db
+from src.services import birthdays, contacts_version, lookup
+from src.services.dedup import normalize_email, normalize_phone
 from src.services.auth import auth_service
+from src.services.events import contact_events
 
 
-router = APIRouter(prefix='/contacts', tags=['contacts'])
+router = APIRouter(prefix='/contacts', tags=['contacts'], route_class=TrackWriteRoute)
+
+KEEPALIVE_SECONDS = 15
 
 @router.get('/', response_model=List[ContactResponce],)
             #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contacts(skip: int,
-                        limit: int,
+async def get_contacts(limit: int,
+                        skip: int = 0,
                         current_user: User = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db),
+                        db: Session = Depends(get_contacts_read_db),
                         first_name: str = Query(None, description='filter by first name'),
                         last_name: str = Query(None, description='filter by last name'),
-                        email: str = Query(None, description='filter by email')):
+                        email: str = Query(None, description='filter by email'),
+                        tags: List[str] = Query(None, description='filter by tags'),
+                        tags_match: Literal['any', 'all'] = Query('any', description='contacts with any or all of tags'),
+                        sort: Literal['first_name', 'last_name', 'birthday', 'created'] = Query('created'),
+                        order: Literal['asc', 'desc'] = Query('asc'),
+                        cursor: str = Query(None, description='X-Next-Cursor header of previous page')):
     """
     Retrieve all contacts created by current user. Login required.
     
-    :param skip: Skip first n rows.
-    :type skip: int
+    Rows are serialized by orjson directly, skipping response model validation.
+    
+    Full page has X-Next-Cursor header: pass it as cursor to get next page by index seek instead of offset.
+    If cursor was made for other sort or order, raise 400 error.
+    
     :param limit: Limit retrieve by n rows
     :type limit: int
+    :param skip: Skip first n rows.
+    :type skip: int
     :param current_user: Logined user.
     :type current_user: User
     :param db: Database session
@@ -39,20 +63,42 @@ async def get_contacts(skip: int,
     :type last_name: str
     :param email: Filter by email.
     :type email: str
+    :param tags: Filter by tags.
+    :type tags: List[str]
+    :param tags_match: any or all of tags.
+    :type tags_match: str
+    :param sort: Sort key.
+    :type sort: str
+    :param order: asc or desc.
+    :type order: str
+    :param cursor: Cursor of previous page.
+    :type cursor: str
     :return: List of contacts.
     :rtype: List[ContactResponce]
     """
-    result = await repo_contacts.get_contacts(skip, limit, current_user, db, first_name, last_name, email)
-    return result
+    tags = [tag.strip().lower() for tag in tags] if tags else None
+    descending = order == 'desc'
+    try:
+        result = await repo_contacts.get_contacts(skip, limit, current_user, db, first_name, last_name, email,
+                                                  tags, tags_match == 'all', sort, descending, cursor)
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    headers = {}
+    if result and len(result) == limit:
+        headers['X-Next-Cursor'] = repo_contacts.encode_cursor(result[-1], sort, descending)
+    return ORJSONResponse(result, headers=headers)
 
 
 @router.get('/bithday_on_next_week', response_model=List[ContactResponce],)
             #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
 async def get_contacts_with_birthday_on_next_week(current_user: User = Depends(auth_service.get_current_user),
-                                                  db: Session = Depends(get_db)):
+                                                  db: Session = Depends(get_contacts_db)):
     """
     Retrieve list of contacts with birthday on next week. Login required.
     
+    List is precomputed by birthday digest job and cached until midnight. On cache miss it is computed from
+    primary database, not from replica, which may lag behind the write that made the cache stale.
+    
     :param current_user: Logined user.
     :type current_user: User
     :param db: Database session.
@@ -60,16 +106,170 @@ async def get_contacts_with_birthday_on_next_week(current_user: User = Depends(a
     :return: List of contacts with birthday on next week.
     :rtype: List[ContactResponce]
     """
+    today = date.today()
+    version = await contacts_version.get_version(current_user.id)
+    payload = await birthdays.get_cached_birthdays(current_user.id, today, version)
+    if payload is None:
+        result = await repo_contacts.get_contacts_with_bithday_on_next_week(current_user, db)
+        payload = await birthdays.cache_birthdays(current_user.id, result, today, version)
+    return Response(content=payload, media_type='application/json')
 
-    result = await repo_contacts.get_contacts_with_bithday_on_next_week(current_user, db)    
-    return result
+
+@router.get('/stats', response_model=ContactStatsResponse)
+async def get_contact_stats(current_user: User = Depends(auth_service.get_current_user),
+                            db: Session = Depends(get_contacts_read_db)):
+    """
+    Retrieve contacts count: total, by birthday month and by email domain. Login required.
+    
+    Served from counters kept by contact writes, so it does not scan contacts.
+    
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Contact stats.
+    :rtype: ContactStatsResponse
+    """
+    return await repo_counters.get_stats(current_user, db)
+
+
+@router.get('/changes', response_model=ContactChangesResponse)
+async def get_contact_changes(since: int = Query(0, ge=0, description='token from previous sync'),
+                              limit: int = Query(500, ge=1, le=1000),
+                              current_user: User = Depends(auth_service.get_current_user),
+                              db: Session = Depends(get_contacts_read_db)):
+    """
+    Retrieve contacts changed and deleted since last sync. Login required.
+    
+    Client stores returned token and sends it as since on next sync. If has_more is true, client requests next page at once.
+    Changes younger than changes_settle_seconds end the page with has_more false, they are sent again on next sync.
+    
+    :param since: Token from previous sync.
+    :type since: int
+    :param limit: Max changes in response.
+    :type limit: int
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Changed contacts, deleted contact ids and new token.
+    :rtype: ContactChangesResponse
+    """
+    result = await repo_contacts.get_changes(since, limit, current_user, db)
+    return ORJSONResponse(result)
+
+
+@router.get('/lookup', response_model=List[ContactResponce])
+async def lookup_contacts(phone: Optional[str] = Query(None, max_length=20),
+                          email: Optional[str] = Query(None, max_length=100),
+                          current_user: User = Depends(auth_service.get_current_user),
+                          db: Session = Depends(get_contacts_db)):
+    """
+    Reverse lookup: find contacts by phone or email in any format. Login required.
+    
+    Results are cached per user in Redis hash until next contact write, not found results too. On cache miss
+    contacts are read from primary database, so lagging replica is never cached.
+    
+    If neither phone nor email is given, raise 400 error.
+    
+    :param phone: Phone, e.g. incoming call number.
+    :type phone: Optional[str]
+    :param email: Email.
+    :type email: Optional[str]
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Matched contacts.
+    :rtype: List[ContactResponce]
+    """
+    phone, email = normalize_phone(phone), normalize_email(email)
+    if not (phone or email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Phone or email is required')
+    field = '|'.join(f'{name}:{value}' for name, value in (('phone', phone), ('email', email)) if value)
+    version = await contacts_version.get_version(current_user.id)
+    payload = await lookup.get_cached_lookup(current_user.id, version, field)
+    if payload is None:
+        result = await repo_contacts.lookup_contacts(current_user, db, phone=phone, email=email)
+        payload = await lookup.cache_lookup(current_user.id, version, field, result)
+    return Response(content=payload, media_type='application/json')
+
+
+@router.get('/duplicates', response_model=List[List[ContactResponce]])
+async def get_duplicates(current_user: User = Depends(auth_service.get_current_user),
+                         db: Session = Depends(get_contacts_read_db)):
+    """
+    Retrieve groups of duplicate contacts: same email, phone or similar sounding name. Login required.
+    
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Groups of duplicate contacts.
+    :rtype: List[List[ContactResponce]]
+    """
+    result = await repo_contacts.get_duplicates(current_user, db)
+    return ORJSONResponse(result)
+
+
+async def event_stream(user_id: int, expires_at: float) -> AsyncIterator[bytes]:
+    """
+    Server-sent events of user until access token expires. Comment line is sent when there are no events,
+    to keep connection open. On expiry expired event is sent and stream ends, client reconnects with new token.
+    """
+    events = contact_events.subscribe(user_id)
+    next_event = None
+    try:
+        while (remaining := expires_at - time.time()) > 0:
+            next_event = next_event or asyncio.ensure_future(anext(events))
+            done, _ = await asyncio.wait({next_event}, timeout=min(KEEPALIVE_SECONDS, remaining))
+            if not done:
+                yield b': keepalive\n\n'
+                continue
+            message = next_event.result()
+            next_event = None
+            yield b'event: ' + orjson.loads(message)['event'].encode() + b'\ndata: ' + message + b'\n\n'
+        yield b'event: expired\ndata: {}\n\n'
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+            await asyncio.gather(next_event, return_exceptions=True)
+        await events.aclose()
+
+
+@router.get('/events')
+async def get_contact_events(token: str = Depends(auth_service.oauth2_scheme),
+                             current_user: User = Depends(auth_service.get_current_user),
+                             db: Session = Depends(get_db)):
+    """
+    Stream of contact changes made by current user from any device, as server-sent events. Login required.
+    
+    Every event has name created, updated or deleted, and data with event name and contact fields (only id for deleted).
+    Stream ends with expired event when access token expires.
+    
+    Session used to authenticate is closed before streaming: dependency teardown runs only after response ends,
+    and open stream must not hold pooled connection.
+    
+    :param token: Access token.
+    :type token: str
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Session of authentication.
+    :type db: Session
+    :return: Event stream.
+    :rtype: StreamingResponse
+    """
+    db.close()
+    expires_at = auth_service.decode_access_token(token)['exp']
+    return StreamingResponse(event_stream(current_user.id, expires_at), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @router.get('/{contact_id}', response_model=ContactResponce,)
             #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
 async def get_contact(contact_id: int,
                       current_user: User = Depends(auth_service.get_current_user),
-                      db: Session = Depends(get_db)):
+                      db: Session = Depends(get_contacts_read_db)):
     """
     Retrieve contact by id. Login required.
     
@@ -95,7 +295,7 @@ async def get_contact(contact_id: int,
              #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
 async def create_contact(body: ContactModel,
                          current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: Session = Depends(get_contacts_db)):
     """
     Create new contact. Login required.
     
@@ -114,12 +314,12 @@ async def create_contact(body: ContactModel,
     return await repo_contacts.create_contact(body, current_user, db)
 
 
-@router.put('/{contact_id}',)
+@router.put('/{contact_id}', response_model=ContactResponce,)
             #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
 async def update_contact(contact_id: int,
                          body: ContactModel,
                          current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: Session = Depends(get_contacts_db)):
     """
     Update contact info. Login required.
     
@@ -143,11 +343,67 @@ async def update_contact(contact_id: int,
     return result
 
 
-@router.delete('/{contact_id}',)
+@router.post('/{contact_id}/merge', response_model=ContactResponce,)
+             #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
+async def merge_contacts(contact_id: int,
+                         body: ContactMergeModel,
+                         current_user: User = Depends(auth_service.get_current_user),
+                         db: Session = Depends(get_contacts_db)):
+    """
+    Merge duplicates into contact and delete them. Login required.
+    
+    If contact or any duplicate is not found, raise 404 error.
+    
+    :param contact_id: Contact id to keep.
+    :type contact_id: int
+    :param body: Ids of duplicates.
+    :type body: ContactMergeModel
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Merged contact.
+    :rtype: ContactResponce
+    """
+    result = await repo_contacts.merge_contacts(contact_id, body.duplicate_ids, current_user, db)
+    if not result:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
+    return result
+
+
+@router.put('/{contact_id}/tags', response_model=List[str],)
+            #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
+async def set_contact_tags(contact_id: int,
+                           body: ContactTagsModel,
+                           current_user: User = Depends(auth_service.get_current_user),
+                           db: Session = Depends(get_contacts_db)):
+    """
+    Replace tags of contact. Login required.
+    
+    If contact is not found, raise 404 error.
+    
+    :param contact_id: Contact id to tag.
+    :type contact_id: int
+    :param body: Tag names.
+    :type body: ContactTagsModel
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Tag names of contact.
+    :rtype: List[str]
+    """
+    result = await repo_tags.set_contact_tags(contact_id, body.tags, current_user, db)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
+    return result
+
+
+@router.delete('/{contact_id}', response_model=ContactResponce,)
                #dependencies=[Depends(RateLimiter(times=2, seconds=5))])
 async def delete_contact(contact_id: int,
                          current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: Session = Depends(get_contacts_db)):
     """
     Delete contact. Login required.
     
@@ -159,8 +415,8 @@ async def delete_contact(contact_id: int,
     :type current_user: User
     :param db: Database session.
     :type db: Session
-    :return: Message.
-    :rtype: dict
+    :return: Deleted contact info.
+    :rtype: ContactResponce
     """
 
     result = await repo_contacts.delete_contact(contact_id, current_user, db)
@@ -0,0 +1,54 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from src.database.db import TrackWriteRoute
+from src.database.models import User
+from src.schemas import TagResponse
+from src.repository import tags as repo_tags
+from src.repository.shards import get_contacts_db, get_contacts_read_db
+from src.services.auth import auth_service
+
+
+router = APIRouter(prefix='/tags', tags=['tags'], route_class=TrackWriteRoute)
+
+
+@router.get('/', response_model=List[TagResponse])
+async def get_tags(current_user: User = Depends(auth_service.get_current_user),
+                   db: Session = Depends(get_contacts_read_db)):
+    """
+    Retrieve tags of current user with number of tagged contacts. Login required.
+    
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Tags with counts.
+    :rtype: List[TagResponse]
+    """
+    return await repo_tags.get_tags(current_user, db)
+
+
+@router.delete('/{name}',)
+async def delete_tag(name: str,
+                     current_user: User = Depends(auth_service.get_current_user),
+                     db: Session = Depends(get_contacts_db)):
+    """
+    Delete tag from all contacts. Login required.
+    
+    If tag is not found, raise 404 error.
+    
+    :param name: Tag name.
+    :type name: str
+    :param current_user: Logined user.
+    :type current_user: User
+    :param db: Database session.
+    :type db: Session
+    :return: Message.
+    :rtype: dict
+    """
+    result = await repo_tags.delete_tag(name.strip().lower(), current_user, db)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Tag not found')
+    return {'message': f'Tag {result.name} deleted'}
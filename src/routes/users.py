@@ -1,16 +1,15 @@
-import cloudinary
-import cloudinary.uploader
 from fastapi import APIRouter, Depends, UploadFile, File
 from sqlalchemy.orm import Session
 
-from src.conf.config import settings
-from src.database.db import get_db
+from src.database.db import TrackWriteRoute, get_db
 from src.database.models import User
 from src.repository import users as repo_users
 from src.services.auth import auth_service
+from src.services.avatar import upload_avatar
+from src.services.storage import StorageBackend, get_storage
 from src.schemas import UserDB
 
-router = APIRouter(prefix='/users', tags=['users'])
+router = APIRouter(prefix='/users', tags=['users'], route_class=TrackWriteRoute)
 
 @router.get('/me', response_model=UserDB)
 async def read_users_me(current_user: User = Depends(auth_service.get_current_user)):
@@ -27,32 +26,25 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
 @router.patch('/avatar', response_model=UserDB)
 async def update_user_avatar(file: UploadFile = File(),
                              current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: Session = Depends(get_db),
+                             storage: StorageBackend = Depends(get_storage)):
     """
     User avatar replace.
     
+    Image is resized to 250x250 and stored off the event loop.
+    
     :param file: File with new avatar.
     :type file: UploadFile
     :param current_user: Logined user.
     :type current_user: User
     :param db: Database session.
     :type db: Session
+    :param storage: Avatar storage backend.
+    :type storage: StorageBackend
     :return: Updated user.
     :rtype: UserDB
     """
-    
-    cloudinary.config(
-        cloud_name=settings.cloud_name,
-        api_key=settings.cloud_api_key,
-        api_secret=settings.cloud_api_secret,
-        secure=True
-    )
-    public_id = f'ContactApp/{current_user.id}'
-    r = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-    src_url = cloudinary.CloudinaryImage(public_id).build_url(width=250,
-                                                              height=250,
-                                                              crop='fill',
-                                                              version=r.get('version'))
-    
+
+    src_url = await upload_avatar(file, storage)
     user = await repo_users.update_avatar(current_user.email, src_url, db)
-    return user
\ No newline at end of file
+    return user
@@ -1,19 +1,23 @@
 from datetime import date
-from pydantic import BaseModel, Field, EmailStr, constr, validator
+from typing import Annotated, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, StringConstraints, ValidationInfo, field_validator
+
+from src.services.gravatar import default_avatar
 
 
 class ContactModel(BaseModel):
     first_name: str = Field(max_length=100)
     last_name: str = Field(max_length=100)
     email: EmailStr
-    phone: constr(
-        regex="^\+380\d{9}$",
+    phone: Annotated[str, StringConstraints(
+        pattern=r"^\+380\d{9}$",
         strict=True,
-        strip_whitespace=True)
+        strip_whitespace=True)]
     birthday: date
     
-    @validator('birthday')
-    def validate_birthday(cls, value):
+    @field_validator('birthday')
+    @classmethod
+    def validate_birthday(cls, value: date) -> date:
         today = date.today()
         if value > today:
             raise ValueError('Birthday must be in past')
@@ -21,25 +25,64 @@ class ContactModel(BaseModel):
 
 
 class ContactResponce(ContactModel):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
     
-    class Config:
-        orm_mode = True
+    id: int
+
+
+class ContactMergeModel(BaseModel):
+    duplicate_ids: List[int] = Field(min_length=1)
+
+
+TagName = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True, min_length=1, max_length=50)]
+
+
+class ContactTagsModel(BaseModel):
+    tags: List[TagName] = Field(max_length=50)
+
+
+class TagResponse(BaseModel):
+    name: str
+    count: int
+
+
+class ContactStatsResponse(BaseModel):
+    total: int
+    birthday_months: Dict[int, int]
+    email_domains: Dict[str, int]
+
+
+class ContactChangesResponse(BaseModel):
+    changed: List[ContactResponce]
+    deleted: List[int]
+    token: int
+    has_more: bool
 
 
 class UserModel(BaseModel):
     email: EmailStr
     password: str = Field(min_length=2, max_length=20)
+    
+    @field_validator('email')
+    @classmethod
+    def normalize_email(cls, value: str) -> str:
+        return value.lower()
 
 
 class UserDB(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     email: EmailStr
     password: str
-    avatar: str
+    avatar: Optional[str] = Field(default=None, validate_default=True)
     
-    class Config:
-        orm_mode = True
+    @field_validator('avatar')
+    @classmethod
+    def resolve_avatar(cls, value: Optional[str], info: ValidationInfo) -> Optional[str]:
+        if not value and 'email' in info.data:
+            return default_avatar(info.data['email'])
+        return value
 
 
 class UserResponse(BaseModel):
@@ -56,5 +99,10 @@ class TokenModel(BaseModel):
 
 class RequestEmail(BaseModel):
     email: EmailStr
+    
+    @field_validator('email')
+    @classmethod
+    def normalize_email(cls, value: str) -> str:
+        return value.lower()
 
 
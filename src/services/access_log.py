@@ -0,0 +1,92 @@
+import logging
+import random
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import get_settings
+from src.conf.logs import request_id
+
+
+logger = logging.getLogger('access')
+
+REQUEST_ID_HEADER = b'x-request-id'
+
+
+def sample_rate(route: str) -> float:
+    """
+    Share of requests to route, which are logged.
+
+    :param route: Route path, e.g. "/api/contacts/{contact_id}".
+    :type route: str
+    :return: Rate from access_log_sample_rates setting, access_log_sample_rate for other routes.
+    :rtype: float
+    """
+    settings = get_settings()
+    return settings.access_log_sample_rates.get(route, settings.access_log_sample_rate)
+
+
+def is_sampled(route: str, status: int, duration_ms: float) -> bool:
+    """
+    Decide if request is logged. Server errors and slow requests are always logged.
+
+    :param route: Route path.
+    :type route: str
+    :param status: Response status code.
+    :type status: int
+    :param duration_ms: Request time.
+    :type duration_ms: float
+    :rtype: bool
+    """
+    if status >= 500 or duration_ms >= get_settings().access_log_slow_ms:
+        return True
+    rate = sample_rate(route)
+    return rate >= 1 or random.random() < rate
+
+
+class AccessLogMiddleware:
+    """
+    Log method, route, status and time of every sampled request with its request id.
+
+    Request id comes from X-Request-ID header or is generated. It is returned in response header and
+    set to every log record of the request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope['headers']).get(REQUEST_ID_HEADER)
+        current_id = header.decode('latin-1')[:64] if header else uuid.uuid4().hex
+        token = request_id.set(current_id)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = [*message.get('headers', []), (REQUEST_ID_HEADER, current_id.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            # route is set to scope by router, unmatched requests are logged by path
+            route = getattr(scope.get('route'), 'path', scope['path'])
+            if is_sampled(route, status, duration_ms):
+                logger.info('%s %s %s', scope['method'], scope['path'], status, extra={
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'route': route,
+                    'status': status,
+                    'duration_ms': round(duration_ms, 3),
+                    'client': scope['client'][0] if scope.get('client') else None,
+                })
+            request_id.reset(token)
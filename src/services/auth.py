@@ -1,16 +1,22 @@
 from datetime import datetime, timedelta
+from functools import cached_property
+import logging
 from typing import Optional
 import pickle
 
 from jose import jwt, JWTError
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from src.database.db import get_db, redis_session
+from src.database.cache import redis_cache
+from src.database.db import get_read_db
 from src.repository import auth as repo_users
-from src.conf.config import settings
+from src.conf.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
 
 class Auth:
     """
@@ -20,11 +26,23 @@ class Auth:
     
     Have method for get current user for dependency injection.
     """
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-    SECRET_KEY = settings.secret_key
-    ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl='api/auth/login')
-    r = redis_session
+    r = redis_cache
+
+    @cached_property
+    def pwd_context(self):
+        # passlib and bcrypt are loaded on first password check, not on app import
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+    @property
+    def SECRET_KEY(self) -> str:
+        return get_settings().secret_key
+
+    @property
+    def ALGORITHM(self) -> str:
+        return get_settings().algorithm
     
     def verify_password(self, plain_password: str, hashed_password: str):
         """
@@ -64,7 +82,7 @@ class Auth:
             email = payload['sub']
             return email
         except JWTError as err:
-            print(err)
+            logger.warning('Invalid verification token: %s', err)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Invalid verification token')
     
     async def get_password_from_token(self, token: str):
@@ -81,7 +99,7 @@ class Auth:
             password = payload['pas']
             return password
         except JWTError as err:
-            print(err)
+            logger.warning('Invalid reset password token: %s', err)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Invalid verification token')
 
     async def create_access_token(self, data: dict, expires: Optional[float] = None):
@@ -175,7 +193,29 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Couldn't validate credentials")
     
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)): # aka decode_access_token
+    def decode_access_token(self, token: str) -> dict:
+        """
+        Decode access token.
+        
+        If token is invalid, expired or not an access token, raise 401 error.
+        
+        :param token: Access token.
+        :type token: str
+        :return: Token payload with email in sub and expiry timestamp in exp.
+        :rtype: dict
+        """
+        credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                              detail="Couldn't validate credentials",
+                                              headers={'WWW-Authenticate': 'Bearer'})
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        if payload.get('scope') != 'access_token' or not payload.get('sub'):
+            raise credentials_exception
+        return payload
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)): # aka decode_access_token
         """
         Decode access token and get email form it.
         
@@ -183,7 +223,10 @@ class Auth:
         
         After that get from hash User object
         
-        If User object not in hash, get User object from database and then hash it on 9000 seconds.
+        If User object not in hash, get User object from database and then hash it on 9000 seconds. Database is
+        read replica, unless client wrote within read_your_writes_seconds, so profile updates are read back.
+        
+        If Redis is unavailable, User object is taken from database.
         
         :param token: Access token.
         :type token: str
@@ -193,29 +236,16 @@ class Auth:
         :rtype: User
         
         """
-
-        credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                              detail="Couldn't validate credentials",
-                                              headers={'WWW-Authenticate': 'Bearer'})
-
-        try: # trying to decode jwt token to get user
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload['sub']
-                if not email:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError:
-            raise credentials_exception
+        email = self.decode_access_token(token)['sub']
         
         user = await self.r.get(email) # get user from cache
         if not user:
             user = await repo_users.get_user_by_email(email, db)
             if not user:
-                raise credentials_exception
-            await self.r.set(email, pickle.dumps(user)) # set user to cache on 9000 seconds
-            await self.r.expire(email, 9000)
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                    detail="Couldn't validate credentials",
+                                    headers={'WWW-Authenticate': 'Bearer'})
+            await self.r.set(email, pickle.dumps(user), ex=9000) # set user to cache on 9000 seconds
         else:
             user = pickle.loads(user)
         return user
@@ -0,0 +1,100 @@
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+
+from src.conf.config import get_settings
+from src.services.storage import StorageBackend
+
+
+AVATAR_SIZE = (250, 250)
+CHUNK_SIZE = 64 * 1024
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> tuple[Path, str]:
+    """
+    Write uploaded file to temporary file chunk by chunk and hash its content.
+
+    If file is bigger than max_size, raise 413 error.
+
+    :param file: Uploaded file.
+    :type file: UploadFile
+    :param max_size: Max file size in bytes.
+    :type max_size: int
+    :return: Path to temporary file and sha256 hex digest of content.
+    :rtype: tuple[Path, str]
+    """
+    fd, name = tempfile.mkstemp(suffix='.upload')
+    path = Path(name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail='Avatar file is too large')
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
+
+
+def resize_avatar(source: Path) -> Path:
+    """
+    Validate image and crop it to AVATAR_SIZE. Blocking, run it in thread.
+
+    If file is not an image, raise 400 error.
+
+    :param source: Path to uploaded file.
+    :type source: Path
+    :return: Path to resized JPEG image.
+    :rtype: Path
+    """
+    # Pillow is imported on first upload, not on app startup
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            image.verify()
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            avatar = ImageOps.fit(image.convert('RGB'), AVATAR_SIZE, Image.LANCZOS)
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid image file')
+    target = source.with_suffix('.jpg')
+    avatar.save(target, format='JPEG', quality=85, optimize=True)
+    return target
+
+
+async def upload_avatar(file: UploadFile, storage: StorageBackend) -> str:
+    """
+    Avatar pipeline. Spool upload to disk, resize it and store it without blocking event loop.
+    
+    Avatar key is sha256 of uploaded content, so re-uploading identical file skips resize and upload.
+
+    :param file: Uploaded file.
+    :type file: UploadFile
+    :param storage: Storage backend.
+    :type storage: StorageBackend
+    :return: Url of stored avatar.
+    :rtype: str
+    """
+    source, digest = await spool_upload(file, get_settings().avatar_max_size)
+    key = f'{digest}.jpg'
+    resized = None
+    try:
+        if not await run_in_threadpool(storage.exists, key):
+            resized = await run_in_threadpool(resize_avatar, source)
+            await run_in_threadpool(storage.put, key, resized, 'image/jpeg')
+        return storage.url(key)
+    finally:
+        source.unlink(missing_ok=True)
+        if resized:
+            resized.unlink(missing_ok=True)
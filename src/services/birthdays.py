@@ -0,0 +1,61 @@
+from datetime import date, datetime, time, timedelta
+
+import orjson
+
+from src.database.cache import redis_cache
+
+
+def birthdays_key(user_id: int, today: date, version: int) -> str:
+    return f'birthdays:{today.isoformat()}:{user_id}:{version}'
+
+
+def seconds_until_midnight(now: datetime) -> int:
+    """
+    Seconds left in the day of now, at least 1.
+    
+    :param now: Current time.
+    :type now: datetime
+    :return: Seconds until next midnight.
+    :rtype: int
+    """
+    midnight = datetime.combine(now.date() + timedelta(days=1), time())
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+async def get_cached_birthdays(user_id: int, today: date, version: int) -> bytes | None:
+    """
+    Birthdays on next week of user as JSON, computed today by digest job or endpoint.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param today: Current date.
+    :type today: date
+    :param version: Contacts version of user, see src.services.contacts_version.
+    :type version: int
+    :return: JSON list of contacts or None if not cached.
+    :rtype: bytes | None
+    """
+    return await redis_cache.get(birthdays_key(user_id, today, version))
+
+
+async def cache_birthdays(user_id: int, contacts: list, today: date, version: int) -> bytes:
+    """
+    Cache birthdays on next week of user until midnight.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param contacts: Contacts with birthday on next week.
+    :type contacts: list
+    :param today: Date contacts were computed for.
+    :type today: date
+    :param version: Contacts version of user, read before contacts were read.
+    :type version: int
+    :return: Cached JSON.
+    :rtype: bytes
+    """
+    payload = orjson.dumps(contacts)
+    now = datetime.now()
+    if now.date() == today:
+        await redis_cache.set(birthdays_key(user_id, today, version), payload, ex=seconds_until_midnight(now))
+    return payload
+
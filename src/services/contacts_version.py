@@ -0,0 +1,52 @@
+"""
+Version of cached reads derived from contacts of user.
+
+Cache keys include version, which is read before contacts are read from database. Contact write bumps version
+after commit, so fill which read contacts before the write stores its result under old key, never read again.
+"""
+from src.database.cache import CacheUnavailable, redis_cache
+
+
+def version_key(user_id: int) -> str:
+    return f'contacts_version:{user_id}'
+
+
+async def get_versions(user_ids: list[int]) -> list[int]:
+    """
+    Current versions of users, in one round trip.
+
+    :param user_ids: User ids.
+    :type user_ids: list[int]
+    :return: Versions, 0 for users without writes or if Redis is unavailable.
+    :rtype: list[int]
+    """
+    try:
+        versions = await redis_cache.call('mget', [version_key(user_id) for user_id in user_ids])
+    except CacheUnavailable:
+        return [0] * len(user_ids)
+    return [int(version or 0) for version in versions]
+
+
+async def get_version(user_id: int) -> int:
+    """
+    Current version of user.
+
+    :param user_id: User id.
+    :type user_id: int
+    :rtype: int
+    """
+    [version] = await get_versions([user_id])
+    return version
+
+
+async def bump_version(user_id: int) -> None:
+    """
+    Make cached reads of user stale after contact write.
+
+    :param user_id: User id.
+    :type user_id: int
+    """
+    try:
+        await redis_cache.call('incr', version_key(user_id))
+    except CacheUnavailable:
+        pass
@@ -0,0 +1,178 @@
+from collections import defaultdict
+import re
+from typing import Iterable, Protocol
+
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ('aeiouy', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+# blocks bigger than this are too common to mean anything, e.g. name key of "John Smith"
+MAX_BLOCK_SIZE = 50
+# scores are integer points, so sums are exact
+DUPLICATE_SCORE = 6
+SAME_NAME_BONUS = 3
+CONFLICT_PENALTY = 3
+WEIGHTS = {'email_normalized': 6, 'phone_e164': 6, 'name_key': 3}
+BLOCKING_KEYS = tuple(WEIGHTS)
+
+
+class DedupRow(Protocol):
+    id: int
+    first_name: str
+    last_name: str
+    email_normalized: str | None
+    phone_e164: str | None
+    name_key: str | None
+
+
+def normalize_email(email: str | None) -> str | None:
+    """
+    Lowercase email without surrounding spaces.
+
+    :param email: Email as entered.
+    :type email: str | None
+    :return: Normalized email or None.
+    :rtype: str | None
+    """
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    """
+    Phone in E.164 format. Numbers without country code are taken as Ukrainian.
+
+    :param phone: Phone as entered, e.g. "+380 99 296 87 89", "099-296-87-89" or "00380992968789".
+    :type phone: str | None
+    :return: Phone like "+380992968789" or None.
+    :rtype: str | None
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return None
+    if phone.strip().startswith('+'):
+        return f'+{digits}'
+    if digits.startswith('00'):
+        return f'+{digits[2:]}'
+    if len(digits) == 10 and digits.startswith('0'):
+        return f'+38{digits}'
+    return f'+{digits}'
+
+
+def soundex(word: str) -> str:
+    """
+    American Soundex code of latin word, e.g. "Robert" -> "R163". Other words are returned lowercased.
+
+    :param word: Name.
+    :type word: str
+    :return: Phonetic key.
+    :rtype: str
+    """
+    letters = [letter for letter in word.lower() if letter.isalpha()]
+    if not letters or letters[0] not in SOUNDEX_CODES and letters[0] not in 'hw':
+        return ''.join(letters)
+    code, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit is None:  # h and w do not separate equal codes
+            continue
+        if digit != previous and digit != '0':
+            code += digit
+        previous = digit
+    return (code + '000')[:4]
+
+
+def name_key(first_name: str | None, last_name: str | None) -> str | None:
+    """
+    Phonetic key of full name: soundex of last and first name.
+
+    :param first_name: First name.
+    :type first_name: str | None
+    :param last_name: Last name.
+    :type last_name: str | None
+    :return: Key like "R200:B100" or None.
+    :rtype: str | None
+    """
+    if not (first_name or last_name):
+        return None
+    return f'{soundex(last_name or "")}:{soundex(first_name or "")}'[:20]
+
+
+def derived_keys(first_name: str | None, last_name: str | None, email: str | None, phone: str | None) -> dict:
+    """
+    Values of derived indexed columns of contact.
+
+    :return: email_normalized, phone_e164 and name_key.
+    :rtype: dict
+    """
+    return {
+        'email_normalized': normalize_email(email),
+        'phone_e164': normalize_phone(phone),
+        'name_key': name_key(first_name, last_name),
+    }
+
+
+def score(first: DedupRow, second: DedupRow) -> int:
+    """
+    Likeness of two contacts: sum of weights of equal keys, plus bonus for equal full names,
+    minus penalty for each of email and phone, which both contacts have but different.
+
+    :return: Score, DUPLICATE_SCORE and more means duplicates.
+    :rtype: int
+    """
+    result = 0
+    for key, weight in WEIGHTS.items():
+        first_value, second_value = getattr(first, key), getattr(second, key)
+        if first_value is None or second_value is None:
+            continue
+        if first_value == second_value:
+            result += weight
+        elif key != 'name_key':
+            result -= CONFLICT_PENALTY
+    if (first.first_name.lower(), first.last_name.lower()) == (second.first_name.lower(), second.last_name.lower()):
+        result += SAME_NAME_BONUS
+    return result
+
+
+def find_duplicates(rows: Iterable[DedupRow]) -> list[list[DedupRow]]:
+    """
+    Group duplicate contacts.
+
+    Rows are blocked by each derived key and only pairs inside one block are scored, so work grows with block
+    sizes, not with square of contacts count. Duplicate pairs are joined transitively with union-find.
+
+    :param rows: Contacts with derived keys.
+    :type rows: Iterable[DedupRow]
+    :return: Groups of two and more duplicates, ordered by id.
+    :rtype: list[list[DedupRow]]
+    """
+    rows = {row.id: row for row in rows}
+    parent = {row_id: row_id for row_id in rows}
+
+    def find(row_id: int) -> int:
+        while parent[row_id] != row_id:
+            parent[row_id] = parent[parent[row_id]]
+            row_id = parent[row_id]
+        return row_id
+
+    scored = set()
+    for key in BLOCKING_KEYS:
+        blocks = defaultdict(list)
+        for row in rows.values():
+            if getattr(row, key) is not None:
+                blocks[getattr(row, key)].append(row)
+        for block in blocks.values():
+            if len(block) > MAX_BLOCK_SIZE:
+                continue
+            for i, first in enumerate(block):
+                for second in block[i + 1:]:
+                    pair = (first.id, second.id)
+                    if pair in scored or find(first.id) == find(second.id):
+                        continue
+                    scored.add(pair)
+                    if score(first, second) >= DUPLICATE_SCORE:
+                        parent[find(second.id)] = find(first.id)
+
+    groups = defaultdict(list)
+    for row_id in sorted(rows):
+        groups[find(row_id)].append(rows[row_id])
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda group: group[0].id)
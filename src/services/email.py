@@ -1,26 +1,56 @@
+import logging
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from src.services.auth import auth_service
-from src.conf.config import settings
-
-
-config = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME='Constantine Zagorodnyi',
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates'
-)
+from src.conf.config import get_settings
+
+# fastapi-mail is the slowest import of the app, it is imported on first letter
+if TYPE_CHECKING:
+    from fastapi_mail import FastMail
+
+
+logger = logging.getLogger(__name__)
+
+_mail: 'FastMail | None' = None
+
+
+def get_mail() -> 'FastMail':
+    """
+    Get mail client of worker. Created on first use.
+    
+    :return: Mail client.
+    :rtype: FastMail
+    """
+    global _mail
+    if _mail is None:
+        from fastapi_mail import FastMail, ConnectionConfig
+
+        settings = get_settings()
+        _mail = FastMail(ConnectionConfig(
+            MAIL_USERNAME=settings.mail_username,
+            MAIL_PASSWORD=settings.mail_password,
+            MAIL_FROM=settings.mail_from,
+            MAIL_PORT=settings.mail_port,
+            MAIL_SERVER=settings.mail_server,
+            MAIL_FROM_NAME='Constantine Zagorodnyi',
+            MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=True,
+            USE_CREDENTIALS=True,
+            VALIDATE_CERTS=True,
+            TEMPLATE_FOLDER=Path(__file__).parent / 'templates'
+        ))
+    return _mail
+
+
+def close_mail() -> None:
+    """
+    Drop mail client of worker. fastapi-mail opens SMTP connection per message, so nothing else to close.
+    """
+    global _mail
+    _mail = None
 
 async def send_email(email: EmailStr, host: str):
     """
@@ -32,6 +62,9 @@ async def send_email(email: EmailStr, host: str):
     :type host: str
     :rtype: None
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         verification_token = await auth_service.create_verification_token({'sub': email})
         message = MessageSchema(
@@ -40,10 +73,9 @@ async def send_email(email: EmailStr, host: str):
             template_body={'host': host, 'token': verification_token},
             subtype=MessageType.html
         )
-        fm = FastMail(config)
-        await fm.send_message(message, template_name='verification_email.html')
-    except ConnectionErrors as err:
-        print(err)
+        await get_mail().send_message(message, template_name='verification_email.html')
+    except ConnectionErrors:
+        logger.exception('Verification letter was not sent')
 
 
 async def send_reset_password_email(email: EmailStr, password: str, host: str):
@@ -60,6 +92,8 @@ async def send_reset_password_email(email: EmailStr, password: str, host: str):
     :type host: str
     
     """
+    from fastapi_mail import MessageSchema, MessageType
+
     hashed_password = auth_service.get_password_hash(password)
     reset_password_token = await auth_service.create_reset_password_token({'sub': email, 'pas': hashed_password})
     message = MessageSchema(
@@ -68,5 +102,29 @@ async def send_reset_password_email(email: EmailStr, password: str, host: str):
         template_body={'host': host, 'token': reset_password_token},
         subtype=MessageType.html
     )
-    fm = FastMail(config)
-    await fm.send_message(message, template_name='reset_password_email.html')
+    await get_mail().send_message(message, template_name='reset_password_email.html')
+
+
+async def send_birthday_digest(email: EmailStr, contacts: list):
+    """
+    Send letter with contacts, whos birthday is on next week.
+    
+    :param email: User email, which letter will be sent.
+    :type email: EmailStr
+    :param contacts: Contacts ordered by upcoming birthday.
+    :type contacts: list
+    :rtype: None
+    """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
+    try:
+        message = MessageSchema(
+            subject='MyHW13: Birthdays on next week',
+            recipients=[email],
+            template_body={'contacts': contacts},
+            subtype=MessageType.html
+        )
+        await get_mail().send_message(message, template_name='birthday_digest.html')
+    except ConnectionErrors:
+        logger.exception('Birthday digest was not sent')
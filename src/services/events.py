@@ -0,0 +1,110 @@
+import asyncio
+from collections import defaultdict
+from typing import AsyncIterator
+
+import orjson
+from redis.exceptions import RedisError
+
+from src.database.cache import CacheUnavailable, RedisCache, redis_cache
+
+
+CHANNEL_PREFIX = 'contacts:'
+
+
+class ContactEvents:
+    """
+    Fan-out of contact events to streaming clients.
+
+    Events are published to Redis channel of user, so every worker gets them. Each worker has one pattern
+    subscription, started with first local subscriber, which dispatches events to local client queues.
+    If Redis is down, events are dispatched to clients of current worker only.
+    """
+
+    def __init__(self, cache: RedisCache = redis_cache, queue_size: int = 100):
+        self.cache = cache
+        self.queue_size = queue_size
+        self.subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: asyncio.Task | None = None
+
+    def _dispatch(self, user_id: int, message: bytes) -> None:
+        for queue in self.subscribers.get(user_id, ()):
+            if queue.full():  # slow client loses oldest event instead of blocking everybody
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def publish(self, user_id: int, event: str, data: dict) -> None:
+        """
+        Publish event of user.
+
+        :param user_id: Contact owner id.
+        :type user_id: int
+        :param event: Event name: created, updated or deleted.
+        :type event: str
+        :param data: Event data.
+        :type data: dict
+        :rtype: None
+        """
+        message = orjson.dumps({'event': event, 'data': data})
+        try:
+            await self.cache.call('publish', f'{CHANNEL_PREFIX}{user_id}', message)
+        except CacheUnavailable:
+            self._dispatch(user_id, message)
+
+    async def _listen(self) -> None:
+        while self.subscribers:
+            pubsub = None
+            try:
+                pubsub = self.cache.client.pubsub()
+                await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                while self.subscribers:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    channel = message['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    self._dispatch(int(channel[len(CHANNEL_PREFIX):]), message['data'])
+            except (RedisError, OSError, asyncio.TimeoutError):
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except (RedisError, OSError):
+                        pass
+
+    async def subscribe(self, user_id: int) -> AsyncIterator[bytes]:
+        """
+        Iterate over events of user as JSON messages. Stops when caller closes iterator.
+
+        :param user_id: User id.
+        :type user_id: int
+        :return: Async iterator of messages.
+        :rtype: AsyncIterator[bytes]
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[user_id].add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers[user_id].discard(queue)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    async def close(self) -> None:
+        """
+        Stop Redis listener of worker.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+contact_events = ContactEvents()
@@ -0,0 +1,34 @@
+from functools import lru_cache
+import hashlib
+
+
+GRAVATAR_URL = 'https://www.gravatar.com/avatar'
+
+
+def email_hash(email: str) -> str:
+    """
+    Gravatar hash of email: md5 of trimmed lowercased address.
+    
+    :param email: User email.
+    :type email: str
+    :return: Hex digest.
+    :rtype: str
+    """
+    return hashlib.md5(email.strip().lower().encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _avatar_url(hashed_email: str) -> str:
+    return f'{GRAVATAR_URL}/{hashed_email}'
+
+
+def default_avatar(email: str) -> str:
+    """
+    Default Gravatar url for email. Pure computation, memoized per email hash, no network calls.
+    
+    :param email: User email.
+    :type email: str
+    :return: Gravatar url.
+    :rtype: str
+    """
+    return _avatar_url(email_hash(email))
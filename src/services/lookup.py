@@ -0,0 +1,58 @@
+import orjson
+
+from src.conf.config import get_settings
+from src.database.cache import CacheUnavailable, redis_cache
+
+
+def lookup_key(user_id: int, version: int) -> str:
+    return f'lookup:{user_id}:{version}'
+
+
+async def get_cached_lookup(user_id: int, version: int, field: str) -> bytes | None:
+    """
+    Cached reverse lookup result of user.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param version: Contacts version of user, see src.services.contacts_version.
+    :type version: int
+    :param field: Lookup field like "phone:+380992968789".
+    :type field: str
+    :return: JSON list of contacts or None if not cached.
+    :rtype: bytes | None
+    """
+    try:
+        return await redis_cache.call('hget', lookup_key(user_id, version), field)
+    except CacheUnavailable:
+        return None
+
+
+async def cache_lookup(user_id: int, version: int, field: str, contacts: list) -> bytes:
+    """
+    Cache reverse lookup result in hash of user. Hash expires lookup_cache_seconds after last miss, and is
+    dropped when it holds lookup_cache_max_entries, so it keeps recently looked up numbers only.
+    Hashes of stale versions are never read and expire.
+    
+    :param user_id: User id.
+    :type user_id: int
+    :param version: Contacts version of user, read before contacts were read.
+    :type version: int
+    :param field: Lookup field like "phone:+380992968789".
+    :type field: str
+    :param contacts: Found contacts, may be empty.
+    :type contacts: list
+    :return: Cached JSON.
+    :rtype: bytes
+    """
+    payload = orjson.dumps(contacts)
+    key = lookup_key(user_id, version)
+    settings = get_settings()
+    try:
+        if await redis_cache.call('hlen', key) >= settings.lookup_cache_max_entries:
+            await redis_cache.call('delete', key)
+        await redis_cache.call('hset', key, field, payload)
+        await redis_cache.call('expire', key, settings.lookup_cache_seconds)
+    except CacheUnavailable:
+        pass
+    return payload
+
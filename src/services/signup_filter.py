@@ -0,0 +1,120 @@
+import hashlib
+import math
+from typing import Iterable
+
+from src.conf.config import get_settings
+from src.database.cache import CacheUnavailable, RedisCache, redis_cache
+
+
+FILTER_KEY = 'signup:emails'
+
+
+class EmailFilter:
+    """
+    Bloom filter of registered emails in Redis bitmap.
+
+    "Not registered" answer is always right. "Registered" answer is wrong with probability error_rate, while
+    filter holds up to capacity emails. Rebuild filter from database, if it grows bigger or gets lost.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, cache: RedisCache = redis_cache, key: str = FILTER_KEY):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.cache = cache
+        self.key = key
+
+    def offsets(self, email: str) -> list[int]:
+        """
+        Bit offsets of email, by double hashing of one digest.
+
+        :param email: Email.
+        :type email: str
+        :return: Bit offsets.
+        :rtype: list[int]
+        """
+        digest = hashlib.blake2b(email.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    async def _bitfield(self, key: str, operation: list[str | int]) -> list[int]:
+        return await self.cache.call('execute_command', 'BITFIELD', key, *operation)
+
+    async def might_contain(self, email: str) -> bool:
+        """
+        Check email with one Redis command. If Redis is unavailable, email is not known.
+
+        :param email: Email.
+        :type email: str
+        :return: False if email is surely not registered.
+        :rtype: bool
+        """
+        operation = [arg for offset in self.offsets(email) for arg in ('GET', 'u1', offset)]
+        try:
+            return all(await self._bitfield(self.key, operation))
+        except CacheUnavailable:
+            return False
+
+    async def add(self, *emails: str, key: str | None = None) -> None:
+        """
+        Add registered emails. Ignored if Redis is unavailable.
+
+        :param emails: Emails.
+        :type emails: str
+        :param key: Redis key to add to, filter key by default.
+        :type key: str | None
+        """
+        if not emails:
+            return
+        try:
+            await self._bitfield(key or self.key, self._set_operation(emails))
+        except CacheUnavailable:
+            pass
+
+    def _set_operation(self, emails: Iterable[str]) -> list[str | int]:
+        return [arg for email in emails for offset in self.offsets(email) for arg in ('SET', 'u1', offset, 1)]
+
+    async def rebuild(self, emails: Iterable[str], batch_size: int = 500) -> int:
+        """
+        Build filter from all registered emails in new key and replace old filter with it at once.
+
+        :param emails: All registered emails.
+        :type emails: Iterable[str]
+        :param batch_size: Emails per Redis command.
+        :type batch_size: int
+        :return: Number of emails.
+        :rtype: int
+        :raises CacheUnavailable: If Redis is unavailable.
+        """
+        building = f'{self.key}:building'
+        await self.cache.call('delete', building)
+        count, batch = 0, []
+        for email in emails:
+            batch.append(email)
+            if len(batch) == batch_size:
+                await self._bitfield(building, self._set_operation(batch))
+                count, batch = count + len(batch), []
+        if batch:
+            await self._bitfield(building, self._set_operation(batch))
+            count += len(batch)
+        if count:
+            await self.cache.call('rename', building, self.key)
+        else:
+            await self.cache.call('delete', self.key)
+        return count
+
+
+_email_filter: EmailFilter | None = None
+
+
+def get_email_filter() -> EmailFilter:
+    """
+    Get signup email filter sized by signup_filter_capacity and signup_filter_error_rate settings.
+
+    :return: Email filter.
+    :rtype: EmailFilter
+    """
+    global _email_filter
+    if _email_filter is None:
+        settings = get_settings()
+        _email_filter = EmailFilter(settings.signup_filter_capacity, settings.signup_filter_error_rate)
+    return _email_filter
@@ -0,0 +1,195 @@
+from pathlib import Path
+import shutil
+
+from fastapi.staticfiles import StaticFiles
+
+from src.conf.config import get_settings
+
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class StorageBackend:
+    """
+    Base class for avatar storage backends.
+
+    Objects are content-addressed: key is derived from file content, so object under a key never changes
+    and can be cached forever.
+
+    Backends are synchronous and are called from a worker thread, never from the event loop.
+    """
+
+    def exists(self, key: str) -> bool:
+        """
+        Check if object with key is already stored.
+
+        :param key: Object key.
+        :type key: str
+        :return: True if object exists.
+        :rtype: bool
+        """
+        raise NotImplementedError
+
+    def put(self, key: str, path: Path, content_type: str) -> None:
+        """
+        Store file under key.
+
+        :param key: Object key.
+        :type key: str
+        :param path: Path to the file to store.
+        :type path: Path
+        :param content_type: MIME type of file.
+        :type content_type: str
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        """
+        Build public url of object.
+
+        :param key: Object key.
+        :type key: str
+        :return: Public url.
+        :rtype: str
+        """
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Store avatars on Cloudinary. Cloudinary CDN serves them with long-lived cache headers.
+
+    Existence is never looked up, since Admin API is rate limited. Public id is derived from content key and
+    upload does not overwrite, so upload of already stored avatar is a no-op which Cloudinary answers with
+    the existing resource.
+    """
+
+    def __init__(self, folder: str = 'ContactApp'):
+        import cloudinary
+        import cloudinary.uploader
+        from cloudinary.exceptions import Error
+
+        settings = get_settings()
+        cloudinary.config(
+            cloud_name=settings.cloud_name,
+            api_key=settings.cloud_api_key,
+            api_secret=settings.cloud_api_secret,
+            secure=True
+        )
+        self.folder = folder
+        self.cloudinary = cloudinary
+        self.error = Error
+
+    def _public_id(self, key: str) -> str:
+        return f'{self.folder}/{Path(key).stem}'
+
+    def exists(self, key: str) -> bool:
+        return False
+
+    def put(self, key: str, path: Path, content_type: str) -> None:
+        try:
+            self.cloudinary.uploader.upload(str(path), public_id=self._public_id(key), overwrite=False)
+        except self.error as err:
+            if 'already exists' not in str(err):
+                raise
+
+    def url(self, key: str) -> str:
+        return self.cloudinary.CloudinaryImage(self._public_id(key)).build_url(format=Path(key).suffix.lstrip('.'))
+
+
+class LocalStorage(StorageBackend):
+    """
+    Store avatars in local directory. Used for development and tests.
+
+    Files are served by ImmutableStaticFiles.
+    """
+
+    def __init__(self, directory: str | Path, base_url: str):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip('/')
+
+    def exists(self, key: str) -> bool:
+        return (self.directory / key).is_file()
+
+    def put(self, key: str, path: Path, content_type: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f'{key}.part'
+        shutil.copyfile(path, tmp)
+        tmp.replace(self.directory / key)
+
+    def url(self, key: str) -> str:
+        return f'{self.base_url}/{key}'
+
+
+class S3Storage(StorageBackend):
+    """
+    Store avatars in S3-compatible bucket (AWS S3, MinIO).
+
+    Objects are uploaded with immutable Cache-Control header.
+    """
+
+    def __init__(self):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        settings = get_settings()
+        self.client = boto3.client(
+            's3',
+            endpoint_url=settings.s3_endpoint_url,
+            aws_access_key_id=settings.s3_access_key,
+            aws_secret_access_key=settings.s3_secret_key,
+            region_name=settings.s3_region
+        )
+        self.bucket = settings.s3_bucket
+        self.public_url = (settings.s3_public_url or f'{settings.s3_endpoint_url}/{self.bucket}').rstrip('/')
+        self.client_error = ClientError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client_error as err:
+            if err.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def put(self, key: str, path: Path, content_type: str) -> None:
+        self.client.upload_file(str(path), self.bucket, key,
+                                ExtraArgs={'ContentType': content_type, 'CacheControl': CACHE_CONTROL})
+
+    def url(self, key: str) -> str:
+        return f'{self.public_url}/{key}'
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Static files with long-lived immutable cache headers. For content-addressed avatars of LocalStorage.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Get storage backend chosen by avatar_storage setting ('cloudinary', 'local' or 's3'). Backend is created once.
+
+    :return: Storage backend.
+    :rtype: StorageBackend
+    """
+    global _storage
+    if _storage is None:
+        settings = get_settings()
+        if settings.avatar_storage == 'local':
+            _storage = LocalStorage(settings.avatar_local_dir, settings.avatar_base_url)
+        elif settings.avatar_storage == 's3':
+            _storage = S3Storage()
+        else:
+            _storage = CloudinaryStorage()
+    return _storage
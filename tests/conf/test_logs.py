@@ -0,0 +1,63 @@
+import io
+import logging
+from pathlib import Path
+import sys
+import unittest
+
+import orjson
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.conf.logs import request_id, start_logging, stop_logging
+
+
+class TestLogs(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.root_level = logging.getLogger().level
+        start_logging(self.stream, 'INFO')
+        self.logger = logging.getLogger('tests.logs')
+
+    def tearDown(self):
+        stop_logging()
+        logging.getLogger().setLevel(self.root_level)
+
+    def records(self) -> list[dict]:
+        stop_logging()
+        return [orjson.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_record_with_request_id_and_fields(self):
+        token = request_id.set('abc123')
+        try:
+            self.logger.info('GET %s', '/api/contacts/', extra={'status': 200, 'duration_ms': 1.5})
+        finally:
+            request_id.reset(token)
+        self.logger.debug('not logged')
+
+        [record] = self.records()
+        self.assertEqual(record['level'], 'INFO')
+        self.assertEqual(record['logger'], 'tests.logs')
+        self.assertEqual(record['message'], 'GET /api/contacts/')
+        self.assertEqual(record['request_id'], 'abc123')
+        self.assertEqual((record['status'], record['duration_ms']), (200, 1.5))
+
+    def test_exception_traceback(self):
+        try:
+            raise ConnectionError('smtp is down')
+        except ConnectionError:
+            self.logger.exception('Letter was not sent')
+
+        [record] = self.records()
+        self.assertNotIn('request_id', record)
+        self.assertIn('ConnectionError: smtp is down', record['exc_info'])
+
+    def test_stop_removes_queue_handler(self):
+        handlers = len(logging.getLogger().handlers)
+        stop_logging()
+
+        self.assertEqual(len(logging.getLogger().handlers), handlers - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from datetime import datetime
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import select
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import sqlite_engine
+from src.database.backfill import BACKFILLS, Backfill, checkpoints, fill_contact_dedup_keys
+from src.database.models import Contact, User
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = sqlite_engine(str(Path(self.tmp_dir.name) / 'backfill.db'))
+        with self.engine.begin() as connection:
+            user_id = connection.execute(User.__table__.insert().values(email='example@gmail.com', password='admin')) \
+                .inserted_primary_key[0]
+            connection.execute(Contact.__table__.insert(), [
+                {'first_name': 'Robert', 'last_name': 'Ross', 'email': f' Bob{i}@Gmail.com', 'phone': '099-296-87-89',
+                 'user_id': user_id, 'revision': i + 1, 'updated_at': datetime(2026, 1, 1)} for i in range(5)])
+        self.chunks = []
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def backfill(self, fail_on_chunk: int | None = None) -> Backfill:
+        def apply(connection, rows):
+            self.chunks.append([row.id for row in rows])
+            if len(self.chunks) == fail_on_chunk:
+                raise RuntimeError('connection lost')
+            fill_contact_dedup_keys(connection, rows)
+
+        return Backfill('test', Contact.__table__, BACKFILLS['contact_dedup_keys'].columns, apply)
+
+    def filled(self) -> list:
+        with self.engine.connect() as connection:
+            return connection.execute(select(Contact.email_normalized).order_by(Contact.id)).scalars().all()
+
+    def test_run_in_key_ordered_chunks(self):
+        with self.assertLogs('src.database.backfill') as logs:
+            processed = self.backfill().run(self.engine, batch_size=2)
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(self.chunks, [[1, 2], [3, 4], [5]])
+        self.assertEqual(self.filled(), [f'bob{i}@gmail.com' for i in range(5)])
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn('test: 5 rows, key 5 of 5 (100.0%)', logs.records[-1].getMessage())
+
+    def test_resume_from_checkpoint(self):
+        with self.assertRaises(RuntimeError):
+            self.backfill(fail_on_chunk=2).run(self.engine, batch_size=2)
+        self.assertEqual(self.filled(), ['bob0@gmail.com', 'bob1@gmail.com', None, None, None])
+
+        processed = self.backfill().run(self.engine, batch_size=2)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(self.chunks, [[1, 2], [3, 4], [3, 4], [5]])
+        self.assertEqual(self.filled(), [f'bob{i}@gmail.com' for i in range(5)])
+        with self.engine.connect() as connection:
+            saved = connection.execute(select(checkpoints)).one()
+        self.assertEqual((saved.name, saved.last_key, saved.rows_done), ('test', 5, 5))
+        self.assertIsNotNone(saved.finished_at)
+
+    def test_reset_checkpoint(self):
+        self.backfill().run(self.engine, batch_size=10)
+        with self.engine.begin() as connection:
+            self.backfill().reset(connection)
+
+        self.assertEqual(self.backfill().run(self.engine), 5)
+
+    def test_finished_backfill_runs_again_only_on_restart(self):
+        self.backfill().run(self.engine, batch_size=10)
+
+        self.assertEqual(self.backfill().run(self.engine), 0)
+        self.assertEqual(self.backfill().run(self.engine, restart=True), 5)
+        self.assertEqual(self.chunks, [[1, 2, 3, 4, 5], [1, 2, 3, 4, 5]])
+
+    def test_run_on_connection_in_caller_transaction(self):
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            self.backfill().run(connection, batch_size=2)
+            transaction.rollback()
+
+        self.assertEqual(self.filled(), [None] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
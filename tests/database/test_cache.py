@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import ConnectionError
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.database.cache import CircuitBreaker, RedisCache
+
+
+class TestRedisCache(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.cache = RedisCache()
+        self.cache.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.cache._client = MagicMock()
+        self.cache._client.get = AsyncMock(side_effect=ConnectionError('redis is down'))
+    
+    async def test_get_degrades_to_none(self):
+        result = await self.cache.get('key')
+        self.assertIsNone(result)
+    
+    async def test_breaker_opens_after_failures(self):
+        await self.cache.get('key')
+        await self.cache.get('key')
+        await self.cache.get('key')
+        
+        self.assertTrue(self.cache.breaker.is_open)
+        self.assertEqual(self.cache._client.get.await_count, 2)
+    
+    async def test_breaker_closes_after_success(self):
+        await self.cache.get('key')
+        self.cache._client.get = AsyncMock(return_value=b'value')
+        
+        result = await self.cache.get('key')
+        
+        self.assertEqual(result, b'value')
+        self.assertEqual(self.cache.breaker.failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
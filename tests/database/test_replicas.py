@@ -0,0 +1,101 @@
+from hashlib import sha1
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import InMemoryRedis, sqlite_engine
+from src.database.cache import RedisCache
+from src.database.db import ReplicaRouter, TrackWriteRoute
+from src.database.models import User
+
+
+class TestReplicaRouter(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engines = [sqlite_engine(str(Path(self.tmp_dir.name) / name)) for name in ('primary.db', 'replica.db')]
+        primary, replica = [sessionmaker(bind=engine) for engine in self.engines]
+        with primary() as db:
+            db.add(User(email='example@gmail.com', password='admin'))
+            db.commit()
+        self.cache = RedisCache()
+        self.cache.start(InMemoryRedis())
+        self.router = ReplicaRouter(primary, [replica], sticky_seconds=5, cache=self.cache)
+    
+    def tearDown(self):
+        for engine in self.engines:
+            engine.dispose()
+        self.tmp_dir.cleanup()
+    
+    async def count_users(self, key):
+        with await self.router.session(key) as db:
+            return db.query(User).count()
+    
+    async def test_reads_go_to_replica(self):
+        self.assertEqual(await self.count_users('client'), 0)
+    
+    async def test_reads_after_write_go_to_primary(self):
+        await self.router.mark_write('client')
+        
+        self.assertEqual(await self.count_users('client'), 1)
+        self.assertEqual(await self.count_users('other-client'), 0)
+    
+    async def test_sticky_across_workers(self):
+        await self.router.mark_write('client')
+        self.router._recent_writes.clear()  # other worker knows only what is in Redis
+        
+        self.assertEqual(await self.count_users('client'), 1)
+
+
+
+class TestTrackWriteRoute(unittest.TestCase):
+    
+    def setUp(self):
+        router = APIRouter(route_class=TrackWriteRoute)
+        
+        @router.get('/items')
+        def read_items():
+            return []
+        
+        @router.post('/items', status_code=201)
+        def create_item():
+            return {'id': 1}
+        
+        @router.put('/items/{item_id}')
+        def update_item(item_id: int):
+            raise HTTPException(status_code=404, detail='Not found')
+        
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+        self.headers = {'Authorization': 'Bearer token'}
+        self.read_router = AsyncMock()
+        self.patch = patch('src.database.db.get_read_router', return_value=self.read_router)
+        self.patch.start()
+    
+    def tearDown(self):
+        self.patch.stop()
+    
+    def test_successful_write_marked(self):
+        self.assertEqual(self.client.post('/items', headers=self.headers).status_code, 201)
+        
+        [call] = self.read_router.mark_write.await_args_list
+        self.assertEqual(call.args, (sha1(b'Bearer token').hexdigest(),))
+    
+    def test_reads_and_failed_writes_not_marked(self):
+        self.assertEqual(self.client.get('/items', headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.put('/items/1', headers=self.headers).status_code, 404)
+        
+        self.read_router.mark_write.assert_not_awaited()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from contextlib import nullcontext
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import orjson
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import InMemoryRedis
+from src.database.cache import redis_cache
+from src.database.models import Contact, User
+from src.jobs import birthday_digest
+from src.services import birthdays, contacts_version
+from tests.conftest import transactional_session
+
+
+class TestBirthdayDigest(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        redis_cache.start(InMemoryRedis())
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.users = [User(email='confirmed@gmail.com', password='admin', confirmed=True),
+                      User(email='example@gmail.com', password='admin')]
+        self.session.add_all(self.users)
+        self.session.commit()
+        self.session.add_all([Contact(first_name='Bob', last_name='Ross', birthday=date(1990, 1, 3), user=user)
+                              for user in self.users])
+        self.session.commit()
+        self.today = date.today().replace(month=1, day=1)
+        self.databases = [lambda: nullcontext(self.session)]
+        self.database_of = lambda user_id: self.databases[0]
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def test_birthdays_cached_until_midnight(self):
+        self.today = date.today()
+        self.session.query(Contact).update({'birthday': self.today + timedelta(days=1)})
+        
+        users, letters = await birthday_digest.run(self.today, database_of=self.database_of, users_db=self.databases[0])
+        
+        self.assertEqual((users, letters), (2, 0))
+        cached = await birthdays.get_cached_birthdays(self.users[0].id, self.today, 0)
+        self.assertEqual([contact['first_name'] for contact in orjson.loads(cached)], ['Bob'])
+    
+    async def test_empty_birthdays_cached_and_stale_after_write(self):
+        self.today = date.today()
+        other = User(email='other@gmail.com', password='admin')
+        self.session.add(other)
+        self.session.commit()
+        
+        await birthday_digest.run(self.today, database_of=self.database_of, users_db=self.databases[0])
+        
+        self.assertEqual(await birthdays.get_cached_birthdays(other.id, self.today, 0), b'[]')
+        await contacts_version.bump_version(other.id)
+        version = await contacts_version.get_version(other.id)
+        self.assertEqual(version, 1)
+        self.assertIsNone(await birthdays.get_cached_birthdays(other.id, self.today, version))
+    
+    async def test_digest_sent_to_confirmed_users(self):
+        with patch.object(birthday_digest, 'send_birthday_digest', AsyncMock()) as send:
+            users, letters = await birthday_digest.run(self.today, email=True,
+                                                       database_of=self.database_of, users_db=self.databases[0])
+        
+        self.assertEqual((users, letters), (2, 1))
+        email, contacts = send.await_args.args
+        self.assertEqual(email, 'confirmed@gmail.com')
+        self.assertEqual([contact.first_name for contact in contacts], ['Bob'])
+
+
+if __name__ == '__main__':
+    unittest.main()
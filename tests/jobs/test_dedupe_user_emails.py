@@ -0,0 +1,105 @@
+from contextlib import nullcontext
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import InMemoryRedis, sqlite_engine
+from src.database.cache import redis_cache
+from src.database.models import Contact, ContactChange, ContactCounter, ContactTag, Tag, User
+from src.jobs import dedupe_user_emails
+from src.repository import counters as repo_counters
+from tests.conftest import transactional_session
+
+
+class TestDedupeUserEmails(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        redis_cache.start(InMemoryRedis())
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        # rows from before case-insensitive index, DROP INDEX is rolled back with test transaction
+        self.session.execute(text('DROP INDEX ix_users_email_lower'))
+        self.users = [User(email='Bob@Gmail.com', password='admin'),
+                      User(email='bob@gmail.com', password='admin', confirmed=True),
+                      User(email='BOB@gmail.com', password='admin'),
+                      User(email='Anna@Gmail.com', password='admin')]
+        self.session.add_all(self.users)
+        self.session.commit()
+        for user, tags in zip(self.users, (['work'], ['work', 'family'], ['friends'], [])):
+            contact = Contact(first_name='John', last_name='Ross', user_id=user.id)
+            self.session.add(contact)
+            self.session.flush()
+            for name in tags:
+                tag = Tag(user_id=user.id, name=name)
+                self.session.add(tag)
+                self.session.flush()
+                self.session.add(ContactTag(contact_id=contact.id, tag_id=tag.id, user_id=user.id))
+        repo_counters.add_to_counters(self.users[0].id, {('total', ''): 1}, self.session)
+        repo_counters.add_to_counters(self.users[1].id, {('total', ''): 1}, self.session)
+        self.session.commit()
+        self.databases = [lambda: nullcontext(self.session)]
+        self.user_ids = [user.id for user in self.users]
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def test_duplicates_merged_into_confirmed_user(self):
+        with patch('src.jobs.dedupe_user_emails.invalidate_caches') as invalidate_caches:
+            merged = await dedupe_user_emails.run(batch_size=1, database_of=lambda user_id: self.databases[0],
+                                                  users_db=self.databases[0])
+        
+        self.assertEqual(merged, 2)
+        users = self.session.query(User).order_by(User.id).all()
+        self.assertEqual([(user.id, user.email) for user in users],
+                         [(self.users[1].id, 'bob@gmail.com'), (self.users[3].id, 'anna@gmail.com')])
+        keep = self.users[1]
+        self.assertEqual(self.session.query(Contact).filter_by(user_id=keep.id).count(), 3)
+        tags = {tag.name: tag.id for tag in self.session.query(Tag).filter_by(user_id=keep.id)}
+        self.assertEqual(sorted(tags), ['family', 'friends', 'work'])
+        self.assertEqual(self.session.query(ContactTag).filter_by(tag_id=tags['work']).count(), 2)
+        self.assertEqual((await repo_counters.get_stats(keep, self.session)).total, 2)
+        # moved contacts get revisions after kept user's own contact, so change feed sends them
+        contacts = self.session.query(Contact).filter_by(user_id=keep.id).order_by(Contact.revision).all()
+        self.assertEqual([contact.id for contact in contacts][1:], sorted(contact.id for contact in contacts[1:]))
+        self.assertTrue(all(change.user_id == keep.id for change in self.session.query(ContactChange)
+                            .filter(ContactChange.id.in_([contact.revision for contact in contacts]))))
+        self.assertEqual(sorted(call.args[0] for call in invalidate_caches.call_args_list),
+                         self.user_ids[:3])
+    
+    async def test_contacts_from_other_shard_copied_and_deleted(self):
+        shard = sessionmaker(bind=sqlite_engine())
+        other_id = self.user_ids[0]
+        with shard() as db:
+            contact = Contact(first_name='Anna', last_name='Black', user_id=other_id)
+            tag = Tag(user_id=other_id, name='work')
+            db.add_all([contact, tag, Tag(user_id=other_id, name='school')])
+            db.flush()
+            db.add(ContactTag(contact_id=contact.id, tag_id=tag.id, user_id=other_id))
+            repo_counters.add_to_counters(other_id, {('total', ''): 1}, db)
+            db.commit()
+        
+        merged = await dedupe_user_emails.run(
+            batch_size=1, database_of=lambda user_id: shard if user_id == other_id else self.databases[0],
+            users_db=self.databases[0])
+        
+        self.assertEqual(merged, 2)
+        keep = self.users[1]
+        names = [contact.first_name for contact in self.session.query(Contact).filter_by(user_id=keep.id)]
+        self.assertEqual(sorted(names), ['Anna', 'John', 'John'])
+        tags = {tag.name: tag.id for tag in self.session.query(Tag).filter_by(user_id=keep.id)}
+        self.assertEqual(sorted(tags), ['family', 'friends', 'school', 'work'])
+        self.assertEqual(self.session.query(ContactTag).filter_by(tag_id=tags['work']).count(), 2)
+        self.assertEqual((await repo_counters.get_stats(keep, self.session)).total, 2)
+        with shard() as db:
+            self.assertEqual([db.query(model).count() for model in (Contact, Tag, ContactTag, ContactCounter)],
+                             [0, 0, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
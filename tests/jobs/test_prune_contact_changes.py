@@ -0,0 +1,40 @@
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+import unittest
+
+from sqlalchemy import select
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.database.models import ContactChange
+from src.jobs import prune_contact_changes
+from tests.conftest import transactional_session
+
+
+class TestPruneContactChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        old, recent = datetime.utcnow() - timedelta(days=2), datetime.utcnow()
+        self.session.add_all([ContactChange(user_id=1, contact_id=contact_id, deleted=deleted, changed_at=changed_at)
+                              for contact_id, deleted, changed_at in ((1, False, old), (2, True, old), (3, False, old),
+                                                                      (4, False, recent), (5, False, old))])
+        self.session.commit()
+        self.databases = [lambda: nullcontext(self.session)]
+
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+
+    def test_old_changes_pruned_tombstones_and_newest_kept(self):
+        pruned = prune_contact_changes.run(older_than_hours=24, batch_size=1, databases=self.databases)
+
+        self.assertEqual(pruned, 2)
+        kept = self.session.scalars(select(ContactChange.contact_id).order_by(ContactChange.id)).all()
+        self.assertEqual(kept, [2, 4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ sys.path.insert(0, str(root_dir))
 from src.database.models import User
 from src.schemas import UserModel
 from src.repository import auth as repo_auth
+from tests.conftest import transactional_session
 
 
 class TestAuth(unittest.IsolatedAsyncioTestCase):
@@ -17,17 +18,6 @@ class TestAuth(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.session = MagicMock(spec=Session)
     
-    async def test_create_user(self):
-        body = UserModel(
-            email='example@gmail.com',
-            password='admin'
-            )
-        result = await repo_auth.create_user(body=body, db=self.session)
-        
-        self.assertEqual(result.email, body.email)
-        self.assertEqual(result.password, body.password)
-        self.assertIsNotNone(result.avatar)
-    
     async def test_get_user_by_email_found(self):
         user = UserModel(email='example@gmail.com', password='admin')
         self.session.query().filter().first.return_value = user
@@ -48,5 +38,45 @@ class TestAuth(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(user.confirmed, True)
 
 
+
+class TestCreateUser(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def test_create_user(self):
+        body = UserModel(
+            email='example@gmail.com',
+            password='admin'
+            )
+        result = await repo_auth.create_user(body=body, db=self.session)
+        
+        self.assertEqual(result.email, body.email)
+        self.assertEqual(result.password, body.password)
+        self.assertIsNone(result.avatar)
+    
+    async def test_create_user_with_taken_email(self):
+        body = UserModel(email='example@gmail.com', password='admin')
+        await repo_auth.create_user(body=body, db=self.session)
+        
+        result = await repo_auth.create_user(body=UserModel(email='example@gmail.com', password='other'), db=self.session)
+        
+        self.assertIsNone(result)
+        self.assertEqual(list(repo_auth.iter_emails(self.session)), ['example@gmail.com'])
+    
+    async def test_email_case_ignored(self):
+        await repo_auth.create_user(body=UserModel(email='Example@Gmail.com', password='admin'), db=self.session)
+        
+        result = await repo_auth.create_user(body=UserModel(email='example@gmail.com', password='other'), db=self.session)
+        user = await repo_auth.get_user_by_email(' EXAMPLE@gmail.com', self.session)
+        
+        self.assertIsNone(result)
+        self.assertEqual(user.email, 'example@gmail.com')
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,21 +1,27 @@
+import base64
+from datetime import date
 from pathlib import Path
 import sys
 import unittest
+from unittest.mock import patch
 
 from benedict import benedict
+import orjson
 from sqlalchemy import inspect
 root_dir = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(root_dir))
 
-from src.database.models import Contact, User
+from src.conf.config import settings
+from src.database.models import Contact, ContactChange, User
 from src.repository import contacts as repo_contacts
-from tests.conftest import TestSession
+from tests.conftest import transactional_session
 
 
 class TestContactsGet(unittest.IsolatedAsyncioTestCase):
     
     def setUp(self):
-        self.session = TestSession()
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
         self.user = User(email='example@gmail.com', password='admin')
         
         self.contacts = [Contact(first_name='Bob', last_name='Ross', user=self.user),
@@ -27,37 +33,38 @@ class TestContactsGet(unittest.IsolatedAsyncioTestCase):
         self.session.commit()
     
     def tearDown(self):
-        self.session.query(User).delete()
-        self.session.query(Contact).delete()
-        self.session.commit()
+        self.transaction.__exit__(None, None, None)
+    
+    def assertContacts(self, rows, contacts):
+        self.assertEqual([row.id for row in rows], [contact.id for contact in contacts])
 # -----------------------------------------------------get_contacts-----------------------------------------------------------------
     async def test_get_contacts_without_filters(self):
         query = await repo_contacts.get_contacts(skip=0, limit=10, user=self.user, db=self.session)
-        self.assertEqual(query, self.contacts)
+        self.assertContacts(query, self.contacts)
     
     async def test_get_contacts_with_one_filter(self):
         query_1 = await repo_contacts.get_contacts(skip=0, limit=10, user=self.user, db=self.session, first_name='Bob')
-        self.assertEqual(query_1, self.contacts[:1])
+        self.assertContacts(query_1, self.contacts[:1])
         
         query_2 = await repo_contacts.get_contacts(skip=0, limit=10, user=self.user, db=self.session, last_name='Ross')
-        self.assertEqual(query_2, self.contacts)
+        self.assertContacts(query_2, self.contacts)
     
     async def test_get_contacts_with_many_filters(self):
         query = await repo_contacts.get_contacts(skip=0, limit=10, user=self.user, db=self.session, first_name='Bob', last_name='Ross')
-        self.assertEqual(query, self.contacts[:1])
+        self.assertContacts(query, self.contacts[:1])
         
     async def test_get_contacts_with_offset(self):
         query = await repo_contacts.get_contacts(skip=1, limit=10, user=self.user, db=self.session)
-        self.assertEqual(query, self.contacts[1:])        
+        self.assertContacts(query, self.contacts[1:])        
 
     async def test_get_contacts_with_limit(self):
         query = await repo_contacts.get_contacts(skip=0, limit=1, user=self.user, db=self.session)
-        self.assertEqual(query, self.contacts[:1])
+        self.assertContacts(query, self.contacts[:1])
 # ------------------------------------------------------get_contact-----------------------------------------------------------------   
     async def test_get_contact_by_id(self):
         contact_id = self.contacts[0].id
         query = await repo_contacts.get_contact(contact_id=contact_id, user=self.user, db=self.session)
-        self.assertEqual(query, self.contacts[0])
+        self.assertContacts([query], self.contacts[:1])
     
     async def test_get_contact_by_id_not_found(self):
         contact_id = self.contacts[1].id + 1
@@ -68,15 +75,14 @@ class TestContactsGet(unittest.IsolatedAsyncioTestCase):
 class TestContactsPost(unittest.IsolatedAsyncioTestCase):
     
     def setUp(self):
-        self.session = TestSession()
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
         self.user = User(email='example@gmail.com', password='admin')   
         self.session.add(self.user)
         self.session.commit()
     
     def tearDown(self):
-        self.session.query(User).delete()
-        self.session.query(Contact).delete()
-        self.session.commit()
+        self.transaction.__exit__(None, None, None)
 
     async def test_create_contact(self):
         body = benedict({
@@ -84,19 +90,81 @@ class TestContactsPost(unittest.IsolatedAsyncioTestCase):
             "last_name": "Ross",
             "email": "user@example.com",
             "phone": "+380227100937",
-            "birthday": "2023-07-09"
+            "birthday": date(2023, 7, 9)
             })
         
         result = await repo_contacts.create_contact(body, self.user, self.session)
         query = self.session.query(Contact).first()
         self.assertEqual(result, query)
         self.assertEqual(result.id, query.id)
+        change = self.session.get(ContactChange, result.revision)
+        self.assertEqual((change.user_id, change.contact_id, change.deleted), (self.user.id, result.id, False))
+        self.assertEqual(result.updated_at, change.changed_at)
+
+
+class TestContactsSorted(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.user = User(email='example@gmail.com', password='admin')
+        self.session.add(self.user)
+        self.session.commit()
+        self.contacts = [
+            Contact(first_name='John', last_name='Ross', birthday=date(1990, 5, 1), user=self.user),
+            Contact(first_name='Anna', last_name='Smith', user=self.user),
+            Contact(first_name='Bob', last_name='Ross', birthday=date(1985, 1, 2), user=self.user),
+            Contact(first_name='Anna', last_name='Black', birthday=date(1990, 5, 1), user=self.user),
+            Contact(first_name='Carl', last_name='White', user=self.user),
+        ]
+        self.session.add_all(self.contacts)
+        self.session.commit()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def walk(self, sort, descending):
+        ids, cursor = [], None
+        while True:
+            page = await repo_contacts.get_contacts(0, 2, self.user, self.session, sort=sort, descending=descending,
+                                                    cursor=cursor)
+            ids += [row.id for row in page]
+            if len(page) < 2:
+                return ids
+            cursor = repo_contacts.encode_cursor(page[-1], sort, descending)
+    
+    async def test_pages_follow_sort_order(self):
+        def key(contact, sort):
+            value = contact.id if sort == 'created' else getattr(contact, sort)
+            return (value is None, value or 0, contact.id)
+        
+        for sort in repo_contacts.SORT_COLUMNS:
+            expected = [contact.id for contact in sorted(self.contacts, key=lambda contact: key(contact, sort))]
+            with self.subTest(sort=sort):
+                self.assertEqual(await self.walk(sort, False), expected)
+                self.assertEqual(await self.walk(sort, True), expected[::-1])
+    
+    async def test_cursor_of_other_sort(self):
+        cursor = repo_contacts.encode_cursor(repo_contacts.ContactRow(1, 'Bob', 'Ross', None, None, None), 'first_name')
+        
+        with self.assertRaises(ValueError):
+            await repo_contacts.get_contacts(0, 2, self.user, self.session, sort='last_name', cursor=cursor)
+        with self.assertRaises(ValueError):
+            await repo_contacts.get_contacts(0, 2, self.user, self.session, cursor='garbage')
+    
+    async def test_cursor_with_invalid_value(self):
+        for sort, value in (('first_name', None), ('last_name', 5), ('birthday', 19900101), ('birthday', '1990-13-01'),
+                            ('created', '1')):
+            cursor = base64.urlsafe_b64encode(orjson.dumps([sort, False, value, 1])).decode('ascii')
+            with self.subTest(sort=sort, value=value), self.assertRaises(ValueError):
+                repo_contacts.decode_cursor(cursor, sort)
 
 
 class TestContactsOther(unittest.IsolatedAsyncioTestCase):
     
     def setUp(self):
-        self.session = TestSession()
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
         self.user = User(email='example@gmail.com', password='admin')   
         self.session.add(self.user)
         self.session.commit()
@@ -105,9 +173,7 @@ class TestContactsOther(unittest.IsolatedAsyncioTestCase):
         self.session.commit()
     
     def tearDown(self):
-        self.session.query(User).delete()
-        self.session.query(Contact).delete()
-        self.session.commit()    
+        self.transaction.__exit__(None, None, None)
     
     async def test_update_contact(self):
         target_contact = self.contact
@@ -118,7 +184,7 @@ class TestContactsOther(unittest.IsolatedAsyncioTestCase):
             "last_name": "Ross",
             "email": "user@example.com",
             "phone": "+380227100937",
-            "birthday": "2023-07-09"
+            "birthday": date(2023, 7, 9)
             })
         
         result = await repo_contacts.update_contact(target_contact.id, body_to_update, self.user, self.session)
@@ -138,5 +204,171 @@ class TestContactsOther(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(query)
     
 
+class TestContactsChanges(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.user = User(email='example@gmail.com', password='admin')
+        self.session.add(self.user)
+        self.session.commit()
+        self.body = benedict({
+            "first_name": "Bob",
+            "last_name": "Ross",
+            "email": "user@example.com",
+            "phone": "+380227100937",
+            "birthday": date(2023, 7, 9)
+            })
+        self.settle = patch.object(settings, 'changes_settle_seconds', -1)
+        self.settle.start()
+    
+    def tearDown(self):
+        self.settle.stop()
+        self.transaction.__exit__(None, None, None)
+    
+    async def test_changes_since_first_sync(self):
+        first = await repo_contacts.create_contact(self.body, self.user, self.session)
+        second = await repo_contacts.create_contact(self.body, self.user, self.session)
+        
+        result = await repo_contacts.get_changes(since=0, limit=10, user=self.user, db=self.session)
+        
+        self.assertEqual([row.id for row in result.changed], [first.id, second.id])
+        self.assertEqual(result.deleted, [])
+        self.assertEqual(result.token, second.revision)
+        self.assertFalse(result.has_more)
+    
+    async def test_changes_only_after_token(self):
+        first = await repo_contacts.create_contact(self.body, self.user, self.session)
+        second = await repo_contacts.create_contact(self.body, self.user, self.session)
+        token = (await repo_contacts.get_changes(since=0, limit=10, user=self.user, db=self.session)).token
+        first_id = first.id
+        
+        await repo_contacts.update_contact(second.id, self.body, self.user, self.session)
+        await repo_contacts.delete_contact(first_id, self.user, self.session)
+        result = await repo_contacts.get_changes(since=token, limit=10, user=self.user, db=self.session)
+        
+        self.assertEqual([row.id for row in result.changed], [second.id])
+        self.assertEqual(result.deleted, [first_id])
+    
+    async def test_changes_paging(self):
+        await repo_contacts.create_contact(self.body, self.user, self.session)
+        await repo_contacts.create_contact(self.body, self.user, self.session)
+        
+        page = await repo_contacts.get_changes(since=0, limit=1, user=self.user, db=self.session)
+        self.assertTrue(page.has_more)
+        page = await repo_contacts.get_changes(since=page.token, limit=1, user=self.user, db=self.session)
+        self.assertEqual(len(page.changed), 1)
+        self.assertFalse(page.has_more)
+    
+    async def test_unsettled_changes_keep_token(self):
+        await repo_contacts.create_contact(self.body, self.user, self.session)
+        
+        with patch.object(settings, 'changes_settle_seconds', 60):
+            result = await repo_contacts.get_changes(since=0, limit=10, user=self.user, db=self.session)
+        
+        self.assertEqual(len(result.changed), 1)
+        self.assertEqual(result.token, 0)
+    
+    async def test_unsettled_page_has_no_more(self):
+        await repo_contacts.create_contact(self.body, self.user, self.session)
+        await repo_contacts.create_contact(self.body, self.user, self.session)
+        
+        with patch.object(settings, 'changes_settle_seconds', 60):
+            result = await repo_contacts.get_changes(since=0, limit=1, user=self.user, db=self.session)
+        
+        self.assertEqual(result.token, 0)
+        self.assertFalse(result.has_more)
+
+
+
+class TestContactsDuplicates(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.user = User(email='example@gmail.com', password='admin')
+        self.session.add(self.user)
+        self.session.commit()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def create(self, first_name, email, phone='+380992968789', birthday=None):
+        body = benedict({'first_name': first_name, 'last_name': 'Ross', 'email': email, 'phone': phone,
+                         'birthday': birthday})
+        return await repo_contacts.create_contact(body, self.user, self.session)
+    
+    async def test_get_duplicates(self):
+        first = await self.create('Bob', 'Bob@gmail.com')
+        second = await self.create('Robert', 'bob@gmail.com')
+        await self.create('Anna', 'anna@gmail.com', phone='+380670000000')
+        
+        result = await repo_contacts.get_duplicates(self.user, self.session)
+        
+        self.assertEqual([[row.id for row in group] for group in result], [[first.id, second.id]])
+    
+    async def test_merge_contacts(self):
+        first = await self.create('Bob', None)
+        second = await self.create('Bob', 'bob@gmail.com', birthday=date(2023, 7, 9))
+        second_id = second.id
+        
+        result = await repo_contacts.merge_contacts(first.id, [second_id], self.user, self.session)
+        
+        self.assertEqual((result.email, result.email_normalized), ('bob@gmail.com', 'bob@gmail.com'))
+        self.assertEqual(result.birthday, date(2023, 7, 9))
+        self.assertEqual(self.session.query(Contact).count(), 1)
+        changes = await repo_contacts.get_changes(since=0, limit=10, user=self.user, db=self.session)
+        self.assertEqual(changes.deleted, [second_id])
+    
+    async def test_merge_missing_duplicate(self):
+        first = await self.create('Bob', 'bob@gmail.com')
+        
+        result = await repo_contacts.merge_contacts(first.id, [first.id + 1], self.user, self.session)
+        
+        self.assertIsNone(result)
+
+
+class TestUpcomingBirthdays(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.users = [User(email='example@gmail.com', password='admin'), User(email='other@gmail.com', password='admin')]
+        self.session.add_all(self.users)
+        self.session.commit()
+        self.session.add_all([
+            Contact(first_name='Late', last_name='Ross', birthday=date(1990, 3, 5), user=self.users[0]),
+            Contact(first_name='Leap', last_name='Ross', birthday=date(1992, 2, 29), user=self.users[0]),
+            Contact(first_name='Today', last_name='Ross', birthday=date(1990, 2, 27), user=self.users[0]),
+            Contact(first_name='Far', last_name='Ross', birthday=date(1990, 3, 10), user=self.users[1]),
+            Contact(first_name='Other', last_name='Ross', birthday=date(1985, 3, 2), user=self.users[1]),
+            Contact(first_name='Unknown', last_name='Ross', user=self.users[1]),
+        ])
+        self.session.commit()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    def test_leap_day_birthday_on_first_of_march(self):
+        window = repo_contacts.birthday_window(date(2023, 2, 27))
+        
+        self.assertEqual(window[(2, 29)], date(2023, 3, 1))
+        self.assertEqual(max(window.values()), date(2023, 3, 6))
+        self.assertNotIn((2, 27), window)
+    
+    def test_upcoming_birthdays_of_all_users(self):
+        result = dict(repo_contacts.upcoming_birthdays(self.session, date(2023, 2, 27)))
+        
+        self.assertEqual([row.first_name for row in result[self.users[0].id]], ['Leap', 'Late'])
+        self.assertEqual([row.first_name for row in result[self.users[1].id]], ['Other'])
+    
+    async def test_get_contacts_with_bithday_on_next_week(self):
+        with patch.object(repo_contacts, 'date', wraps=date) as today:
+            today.today.return_value = date(2023, 2, 27)
+            result = await repo_contacts.get_contacts_with_bithday_on_next_week(self.users[1], self.session)
+        
+        self.assertEqual([row.first_name for row in result], ['Other'])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+from datetime import date
+from pathlib import Path
+import sys
+import unittest
+
+from benedict import benedict
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.database.models import User
+from src.repository import contacts as repo_contacts
+from src.repository import counters as repo_counters
+from tests.conftest import transactional_session
+
+
+class TestContactCounters(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.user = User(email='example@gmail.com', password='admin')
+        self.session.add(self.user)
+        self.session.commit()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    def body(self, email, birthday=None):
+        return benedict({'first_name': 'Bob', 'last_name': 'Ross', 'email': email, 'phone': '+380992968789',
+                         'birthday': birthday})
+    
+    async def stats(self):
+        stats = await repo_counters.get_stats(self.user, self.session)
+        return stats.total, stats.birthday_months, stats.email_domains
+    
+    async def test_counters_follow_writes(self):
+        first = await repo_contacts.create_contact(self.body('bob@gmail.com', date(1990, 5, 1)), self.user, self.session)
+        second = await repo_contacts.create_contact(self.body('Bob@Ukr.net'), self.user, self.session)
+        self.assertEqual(await self.stats(), (2, {5: 1}, {'gmail.com': 1, 'ukr.net': 1}))
+        
+        await repo_contacts.update_contact(second.id, self.body('bob@gmail.com', date(1990, 7, 9)), self.user,
+                                           self.session)
+        self.assertEqual(await self.stats(), (2, {5: 1, 7: 1}, {'gmail.com': 2}))
+        
+        await repo_contacts.delete_contact(first.id, self.user, self.session)
+        self.assertEqual(await self.stats(), (1, {7: 1}, {'gmail.com': 1}))
+    
+    async def test_counters_after_merge(self):
+        first = await repo_contacts.create_contact(self.body(None), self.user, self.session)
+        second = await repo_contacts.create_contact(self.body('bob@gmail.com', date(1990, 5, 1)), self.user,
+                                                    self.session)
+        
+        await repo_contacts.merge_contacts(first.id, [second.id], self.user, self.session)
+        
+        self.assertEqual(await self.stats(), (1, {5: 1}, {'gmail.com': 1}))
+    
+    async def test_stats_without_contacts(self):
+        self.assertEqual(await self.stats(), (0, {}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+from pathlib import Path
+import sys
+import unittest
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.database.models import Contact, ContactTag, User
+from src.repository import contacts as repo_contacts
+from src.repository import tags as repo_tags
+from tests.conftest import transactional_session
+
+
+class TestTags(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.transaction = transactional_session()
+        self.session = self.transaction.__enter__()
+        self.user = User(email='example@gmail.com', password='admin')
+        self.session.add(self.user)
+        self.session.commit()
+        self.contacts = [Contact(first_name=name, last_name='Ross', user=self.user) for name in ('Bob', 'John', 'Anna')]
+        self.session.add_all(self.contacts)
+        self.session.commit()
+    
+    def tearDown(self):
+        self.transaction.__exit__(None, None, None)
+    
+    async def tag(self):
+        await repo_tags.set_contact_tags(self.contacts[0].id, ['family', 'work'], self.user, self.session)
+        await repo_tags.set_contact_tags(self.contacts[1].id, ['work'], self.user, self.session)
+    
+    async def test_set_contact_tags(self):
+        await self.tag()
+        
+        result = await repo_tags.set_contact_tags(self.contacts[0].id, ['friends', 'work', 'work'], self.user, self.session)
+        
+        self.assertEqual(result, ['friends', 'work'])
+        self.assertEqual(self.session.query(ContactTag).filter_by(contact_id=self.contacts[0].id).count(), 2)
+    
+    async def test_set_tags_of_missing_contact(self):
+        result = await repo_tags.set_contact_tags(self.contacts[-1].id + 1, ['work'], self.user, self.session)
+        
+        self.assertIsNone(result)
+    
+    async def test_get_tags_with_counts(self):
+        await self.tag()
+        await repo_tags.set_contact_tags(self.contacts[0].id, ['work'], self.user, self.session)
+        
+        result = await repo_tags.get_tags(self.user, self.session)
+        
+        self.assertEqual([(tag.name, tag.count) for tag in result], [('family', 0), ('work', 2)])
+    
+    async def test_filter_contacts_by_tags(self):
+        await self.tag()
+        
+        any_tag = await repo_contacts.get_contacts(0, 10, self.user, self.session, tags=['family', 'work'])
+        all_tags = await repo_contacts.get_contacts(0, 10, self.user, self.session, tags=['family', 'work'],
+                                                    match_all_tags=True)
+        
+        self.assertEqual({row.first_name for row in any_tag}, {'Bob', 'John'})
+        self.assertEqual([row.first_name for row in all_tags], ['Bob'])
+    
+    async def test_delete_tag(self):
+        await self.tag()
+        
+        result = await repo_tags.delete_tag('work', self.user, self.session)
+        
+        self.assertEqual(result.name, 'work')
+        self.assertEqual(self.session.query(ContactTag).count(), 1)
+    
+    async def test_deleted_contact_is_untagged(self):
+        await self.tag()
+        
+        await repo_contacts.delete_contact(self.contacts[0].id, self.user, self.session)
+        
+        self.assertEqual(self.session.query(ContactTag).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+from contextlib import nullcontext
 from pathlib import Path
 import sys
 import unittest
@@ -9,6 +10,8 @@ sys.path.insert(0, str(root_dir))
 
 from src.database.models import User
 from src.repository import users as repo_users
+from src.schemas import UserDB
+from src.services.gravatar import GRAVATAR_URL, default_avatar, email_hash
 
 
 class TestUsers(unittest.IsolatedAsyncioTestCase):
@@ -22,6 +25,17 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         test_url = 'http://testurl.com'
         result = await repo_users.update_avatar(user.email, test_url, self.session)
         self.assertEqual(result.avatar, test_url)
+    
+    def test_fill_default_avatar(self):
+        repo_users.fill_default_avatar(1, 'Example@gmail.com ', lambda: nullcontext(self.session))
+        self.session.query().filter().update.assert_called_once_with(
+            {User.avatar: default_avatar('example@gmail.com')}, synchronize_session=False
+        )
+        self.session.commit.assert_called_once()
+    
+    def test_user_db_resolves_default_avatar(self):
+        user = UserDB(id=1, email='example@gmail.com', password='admin', avatar=None)
+        self.assertEqual(user.avatar, f'{GRAVATAR_URL}/{email_hash("example@gmail.com")}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,53 @@
+from datetime import date
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+from benedict import benedict
+from sqlalchemy.orm import sessionmaker
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import sqlite_engine
+from src.database.models import Contact, User
+from src.repository import contacts as repo_contacts
+from src.repository.shards import ShardRouter
+
+
+class TestShardRouter(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engines = [sqlite_engine(str(Path(self.tmp_dir.name) / f'shard{i}.db')) for i in range(2)]
+        self.router = ShardRouter([sessionmaker(bind=engine) for engine in self.engines])
+        self.users = [User(id=user_id, email=f'user{user_id}@gmail.com', password='admin') for user_id in range(1, 9)]
+    
+    def tearDown(self):
+        for engine in self.engines:
+            engine.dispose()
+        self.tmp_dir.cleanup()
+    
+    def test_shard_id_is_stable(self):
+        shard_ids = [self.router.shard_id(user.id) for user in self.users]
+        self.assertEqual(shard_ids, [self.router.shard_id(user.id) for user in self.users])
+        self.assertEqual(set(shard_ids), {0, 1})
+    
+    async def test_contacts_stored_in_user_shard(self):
+        body = benedict({'first_name': 'Bob', 'last_name': 'Ross', 'email': 'user@example.com',
+                         'phone': '+380227100937', 'birthday': date(2023, 7, 9)})
+        for user in self.users:
+            with self.router.session(user.id) as db:
+                await repo_contacts.create_contact(body, user, db)
+        
+        for user in self.users:
+            with self.router.session(user.id) as db:
+                contacts = await repo_contacts.get_contacts(skip=0, limit=10, user=user, db=db)
+                self.assertEqual(len(contacts), 1)
+            other_shard = self.router.shards[1 - self.router.shard_id(user.id)]
+            with other_shard() as db:
+                self.assertEqual(db.query(Contact).filter(Contact.user_id == user.id).count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
+from src.database.db import get_db
 from src.database.models import User
+from src.services.gravatar import default_avatar
 
 
-def test_create_user(client, user, monkeypatch):
+def test_create_user(client, session, user, monkeypatch):
     mock_send_email = MagicMock()
     monkeypatch.setattr('src.routes.auth.send_email', mock_send_email)
     
@@ -13,6 +15,7 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data['user']['email'] == user.get('email')
     assert 'id' in data['user']
+    assert session.get(User, data['user']['id']).avatar == default_avatar(user['email'])
 
 
 def test_repeat_create_user(client, user):
@@ -22,6 +25,15 @@ def test_repeat_create_user(client, user):
     data = response.json()
     assert data['detail'] == 'Account with this email already exist'
 
+
+def test_create_user_on_filter_false_positive(client, monkeypatch):
+    monkeypatch.setattr('src.routes.auth.send_email', MagicMock())
+    monkeypatch.setattr('src.services.signup_filter.EmailFilter.might_contain', AsyncMock(return_value=True))
+    
+    response = client.post('/api/auth/signup/', json={'email': 'anna@example.com', 'password': '123456789'})
+    
+    assert response.status_code == 201, response.text
+
 def test_login_user_not_confirmed(client, user):
     response = client.post('/api/auth/login/', data={'username': user['email'], 'password': user['password']})
     
@@ -51,4 +63,21 @@ def test_login_wrong_email(client, user):
     
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data['detail'] == 'Invalid email'
\ No newline at end of file
+    assert data['detail'] == 'Invalid email'
+
+def test_read_users_me_from_read_db(client, user):
+    response = client.post('api/auth/login', data={'username': user['email'], 'password': user['password']})
+    token = response.json()['access_token']
+    
+    def primary_not_used():
+        raise AssertionError('/me must not open primary session')
+        yield
+    
+    client.app.dependency_overrides[get_db], override = primary_not_used, client.app.dependency_overrides[get_db]
+    try:
+        response = client.get('/api/users/me', headers={'Authorization': f'Bearer {token}'})
+    finally:
+        client.app.dependency_overrides[get_db] = override
+    
+    assert response.status_code == 200, response.text
+    assert response.json()['email'] == user['email']
\ No newline at end of file
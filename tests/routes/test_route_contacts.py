@@ -1,9 +1,11 @@
+import asyncio
+from datetime import date, timedelta
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
 from src.database.models import User
-from src.services.auth import auth_service
 from src.schemas import ContactModel
+from src.services.auth import auth_service
 
 
 @pytest.fixture()
@@ -20,115 +22,186 @@ def token(client, user, session, monkeypatch):
     return data['access_token']
 
 def test_create_contact(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.post(
-            'api/contacts', 
-            json={
-                'first_name': 'Bob',
-                'last_name': 'Ross',
-                'email': 'example@gmail.com',
-                'phone': '+380992968789',
-                'birthday': '2020-03-29'
-                },
-            headers={'Authorization': f'Bearer {token}'}
-            )
-        assert response.status_code == 201, response.text
-        data = response.json()
-        assert data['first_name'] == 'Bob'
-        assert 'id' in data
+    response = client.post(
+        'api/contacts', 
+        json={
+            'first_name': 'Bob',
+            'last_name': 'Ross',
+            'email': 'example@gmail.com',
+            'phone': '+380992968789',
+            'birthday': '2020-03-29'
+            },
+        headers={'Authorization': f'Bearer {token}'}
+        )
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data['first_name'] == 'Bob'
+    assert 'id' in data
 
 def test_get_contact_found(client ,token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.get(
-            'api/contacts/1',
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data['first_name'] == 'Bob'
+    response = client.get(
+        'api/contacts/1',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['first_name'] == 'Bob'
 
 def test_get_contact_not_found(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.get(
-            'api/contacts/2',
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data['detail'] == 'Contact not found'
+    response = client.get(
+        'api/contacts/2',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 404, response.text
+    data = response.json()
+    assert data['detail'] == 'Contact not found'
 
 def test_get_contacts(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.get(
-            'api/contacts/?skip=0&limit=10',
-            headers={'Authorization': f'Bearer {token}'},
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert isinstance(data, list)
-        assert data[0]['first_name'] == 'Bob'
-        assert 'id' in data[0]
+    response = client.get(
+        'api/contacts/?skip=0&limit=10',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert isinstance(data, list)
+    assert data[0]['first_name'] == 'Bob'
+    assert 'id' in data[0]
 
 def test_update_contact(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.put(
-            'api/contacts/1',
-            json={
-                'first_name': 'Bobby',
-                'last_name': 'Ross',
-                'email': 'example@gmail.com',
-                'phone': '+380992968789',
-                'birthday': '2020-03-29'
-                },
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data['first_name'] == 'Bobby'
-        assert 'id' in data
+    response = client.put(
+        'api/contacts/1',
+        json={
+            'first_name': 'Bobby',
+            'last_name': 'Ross',
+            'email': 'example@gmail.com',
+            'phone': '+380992968789',
+            'birthday': '2020-03-29'
+            },
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['first_name'] == 'Bobby'
+    assert 'id' in data
+    assert not {'user_id', 'revision', 'name_key'} & set(data)
 
 def test_update_contact_not_found(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.put(
-            'api/contacts/2',
-            json={
-                'first_name': 'Bobbert',
-                'last_name': 'Ross',
-                'email': 'example@gmail.com',
-                'phone': '+380992968789',
-                'birthday': '2020-03-29'
-                },
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data['detail'] == 'Contact not found'
+    response = client.put(
+        'api/contacts/2',
+        json={
+            'first_name': 'Bobbert',
+            'last_name': 'Ross',
+            'email': 'example@gmail.com',
+            'phone': '+380992968789',
+            'birthday': '2020-03-29'
+            },
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 404, response.text
+    data = response.json()
+    assert data['detail'] == 'Contact not found'
 
 def test_delete_contact(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.delete(
-            'api/contacts/1',
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data['first_name'] == 'Bobby'
-        assert 'id' in data
+    response = client.delete(
+        'api/contacts/1',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['first_name'] == 'Bobby'
+    assert 'id' in data
+    assert not {'user_id', 'revision', 'name_key'} & set(data)
 
 def test_delete_contact_not_found(client, token):
-    with patch.object(auth_service, 'r') as mock:
-        mock.get.return_value = None
-        response = client.delete(
-            'api/contacts/2',
-            headers={'Authorization': f'Bearer {token}'}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data['detail'] == 'Contact not found'
\ No newline at end of file
+    response = client.delete(
+        'api/contacts/2',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 404, response.text
+    data = response.json()
+    assert data['detail'] == 'Contact not found'
+
+def test_get_contact_changes(client, token):
+    response = client.get(
+        'api/contacts/changes?since=0',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['changed'] == []
+    assert data['deleted'] == [1]
+
+def test_get_birthdays_cached_until_contact_write(client, token, redis):
+    tomorrow = date.today() + timedelta(days=1)
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.get('api/contacts/bithday_on_next_week', headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+    
+    response = client.post(
+        'api/contacts',
+        json={'first_name': 'Bob', 'last_name': 'Ross', 'email': 'example@gmail.com', 'phone': '+380992968789',
+              'birthday': tomorrow.replace(year=tomorrow.year - 4).isoformat()},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    response = client.get('api/contacts/bithday_on_next_week', headers=headers)
+    assert [contact['first_name'] for contact in response.json()] == ['Bob']
+    assert any(key.startswith('birthdays:') for key in redis.data)
+
+def test_lookup_contact_by_phone(client, token, redis):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.get('api/contacts/lookup?phone=099 296 87 89', headers=headers)
+    assert response.status_code == 200, response.text
+    assert [contact['first_name'] for contact in response.json()] == ['Bob']
+    assert 'phone:+380992968789' in str(redis.data)
+    
+    response = client.post(
+        'api/contacts',
+        json={'first_name': 'Robert', 'last_name': 'Ross', 'email': 'bob@gmail.com', 'phone': '+380992968789',
+              'birthday': '2020-03-29'},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    response = client.get('api/contacts/lookup?phone=%2B380992968789', headers=headers)
+    assert [contact['first_name'] for contact in response.json()] == ['Bob', 'Robert']
+
+def test_lookup_contact_without_query(client, token):
+    response = client.get('api/contacts/lookup', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 400, response.text
+
+def test_tag_contact(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.put('api/contacts/2/tags', json={'tags': [' Work ', 'family']}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == ['family', 'work']
+    
+    response = client.get('api/contacts/?skip=0&limit=10&tags=work&tags=friends', headers=headers)
+    assert [contact['id'] for contact in response.json()] == [2]
+    response = client.get('api/tags', headers=headers)
+    assert response.json() == [{'name': 'family', 'count': 1}, {'name': 'work', 'count': 1}]
+
+def test_get_contacts_sorted_by_cursor(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.get('api/contacts/?limit=1&sort=first_name&order=desc', headers=headers)
+    assert response.status_code == 200, response.text
+    assert [contact['first_name'] for contact in response.json()] == ['Robert']
+    
+    cursor = response.headers['X-Next-Cursor']
+    response = client.get(f'api/contacts/?limit=1&sort=first_name&order=desc&cursor={cursor}', headers=headers)
+    assert [contact['first_name'] for contact in response.json()] == ['Bob']
+    response = client.get(f'api/contacts/?limit=1&sort=last_name&cursor={cursor}', headers=headers)
+    assert response.status_code == 400, response.text
+
+def test_get_contact_stats(client, token):
+    response = client.get('api/contacts/stats', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['total'] == 2
+    assert data['email_domains'] == {'gmail.com': 2}
+
+def test_contact_events_end_when_token_expires(client, user, token):
+    short_token = asyncio.run(auth_service.create_access_token({'sub': user['email']}, expires=1))
+    response = client.get('api/contacts/events', headers={'Authorization': f'Bearer {short_token}'})
+    assert response.status_code == 200, response.text
+    assert response.text.endswith('event: expired\ndata: {}\n\n')
@@ -0,0 +1,77 @@
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.conf.config import get_settings
+from src.services.access_log import AccessLogMiddleware
+
+
+class TestAccessLog(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(AccessLogMiddleware)
+
+        @app.get('/items/{item_id}')
+        def item(item_id: int):
+            return {'id': item_id}
+
+        @app.get('/health')
+        def health():
+            return {'status': 'ok'}
+
+        @app.get('/fail')
+        def fail():
+            raise RuntimeError('boom')
+
+        self.client = TestClient(app, raise_server_exceptions=False)
+        settings = get_settings()
+        self.patches = [patch.object(settings, 'access_log_sample_rate', 1.0),
+                        patch.object(settings, 'access_log_sample_rates', {'/items/{item_id}': 0.0, '/fail': 0.0}),
+                        patch.object(settings, 'access_log_slow_ms', 1000)]
+        for settings_patch in self.patches:
+            settings_patch.start()
+
+    def tearDown(self):
+        for settings_patch in self.patches:
+            settings_patch.stop()
+
+    def test_request_logged_with_route_timing_and_id(self):
+        with self.assertLogs('access', 'INFO') as logs:
+            response = self.client.get('/health', headers={'X-Request-ID': 'req-1'})
+
+        self.assertEqual(response.headers['x-request-id'], 'req-1')
+        [record] = logs.records
+        self.assertEqual((record.method, record.route, record.status), ('GET', '/health', 200))
+        self.assertGreaterEqual(record.duration_ms, 0)
+
+    def test_server_error_logged_on_sampled_out_route(self):
+        with self.assertLogs('access', 'INFO') as logs:
+            response = self.client.get('/fail')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual((logs.records[0].route, logs.records[0].status), ('/fail', 500))
+
+    def test_sampled_out_route_not_logged(self):
+        with patch('src.services.access_log.logger') as logger:
+            response = self.client.get('/items/1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.headers['x-request-id']), 32)
+        logger.info.assert_not_called()
+
+    def test_unmatched_path_logged_by_path(self):
+        with self.assertLogs('access', 'INFO') as logs:
+            self.client.get('/missing')
+
+        self.assertEqual((logs.records[0].route, logs.records[0].status), ('/missing', 404))
+
+
+if __name__ == '__main__':
+    unittest.main()
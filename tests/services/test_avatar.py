@@ -0,0 +1,94 @@
+from io import BytesIO
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.services.avatar import upload_avatar
+from src.services.storage import CACHE_CONTROL, CloudinaryStorage, ImmutableStaticFiles, LocalStorage
+
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=BytesIO(content), filename='avatar.png')
+
+
+def make_image() -> bytes:
+    buffer = BytesIO()
+    Image.new('RGBA', (800, 600), 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestAvatar(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.tmp_dir.name, '/static/avatars')
+    
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+    
+    async def test_upload_avatar_resized(self):
+        url = await upload_avatar(make_upload(make_image()), self.storage)
+        
+        name = url.rsplit('/', 1)[-1]
+        self.assertTrue(url.startswith('/static/avatars/'))
+        with Image.open(Path(self.tmp_dir.name) / name) as image:
+            self.assertEqual(image.size, (250, 250))
+    
+    async def test_upload_same_avatar_twice(self):
+        first_url = await upload_avatar(make_upload(make_image()), self.storage)
+        with patch.object(self.storage, 'put') as mock_put:
+            second_url = await upload_avatar(make_upload(make_image()), self.storage)
+        
+        self.assertEqual(first_url, second_url)
+        mock_put.assert_not_called()
+    
+    async def test_avatar_served_with_immutable_cache(self):
+        url = await upload_avatar(make_upload(make_image()), self.storage)
+        app = FastAPI()
+        app.mount('/static/avatars', ImmutableStaticFiles(directory=self.tmp_dir.name))
+        
+        response = TestClient(app).get(url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['cache-control'], CACHE_CONTROL)
+    
+    async def test_upload_avatar_not_image(self):
+        with self.assertRaises(HTTPException) as err:
+            await upload_avatar(make_upload(b'not an image'), self.storage)
+        self.assertEqual(err.exception.status_code, 400)
+
+
+class TestCloudinaryStorage(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.storage = CloudinaryStorage()
+
+    async def test_upload_avatar_without_admin_api(self):
+        with patch('cloudinary.api.resource') as resource, patch('cloudinary.uploader.upload') as upload:
+            url = await upload_avatar(make_upload(make_image()), self.storage)
+        resource.assert_not_called()
+        upload.assert_called_once()
+        self.assertFalse(upload.call_args.kwargs['overwrite'])
+        self.assertIn(upload.call_args.kwargs['public_id'], url)
+
+    def test_put_existing_avatar(self):
+        error = self.storage.error('Resource already exists')
+        with patch('cloudinary.uploader.upload', side_effect=error):
+            self.storage.put('abc.jpg', Path('abc.jpg'), 'image/jpeg')
+
+    def test_put_error(self):
+        with patch('cloudinary.uploader.upload', side_effect=self.storage.error('Invalid image file')):
+            with self.assertRaises(self.storage.error):
+                self.storage.put('abc.jpg', Path('abc.jpg'), 'image/jpeg')
+
+
+if __name__ == '__main__':
+    unittest.main()
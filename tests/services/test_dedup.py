@@ -0,0 +1,59 @@
+from pathlib import Path
+import sys
+import unittest
+from types import SimpleNamespace
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.services.dedup import derived_keys, find_duplicates, normalize_phone, soundex
+
+
+def row(id, first_name, last_name, email=None, phone=None):
+    return SimpleNamespace(id=id, first_name=first_name, last_name=last_name,
+                           **derived_keys(first_name, last_name, email, phone))
+
+
+class TestNormalize(unittest.TestCase):
+    
+    def test_phone_e164(self):
+        for phone in ('+380 99 296 87 89', '099-296-87-89', '00380992968789', '380992968789'):
+            self.assertEqual(normalize_phone(phone), '+380992968789')
+        self.assertIsNone(normalize_phone(' - '))
+    
+    def test_soundex(self):
+        self.assertEqual(soundex('Robert'), 'R163')
+        self.assertEqual(soundex('Rupert'), 'R163')
+        self.assertEqual(soundex('Ashcraft'), 'A261')
+        self.assertEqual(soundex('Tymczak'), 'T522')
+        self.assertEqual(soundex('Петро'), 'петро')
+
+
+class TestFindDuplicates(unittest.TestCase):
+    
+    def test_groups_are_transitive(self):
+        rows = [
+            row(1, 'Bob', 'Ross', email='Bob@Example.com'),
+            row(2, 'Robert', 'Ross', email='bob@example.com ', phone='0992968789'),
+            row(3, 'Bobby', 'Ross', phone='+380992968789'),
+            row(4, 'Bob', 'Ross'),
+            row(5, 'Anna', 'Smith', email='anna@example.com'),
+        ]
+        
+        groups = find_duplicates(rows)
+        
+        self.assertEqual([[item.id for item in group] for group in groups], [[1, 2, 3, 4]])
+    
+    def test_conflicting_emails(self):
+        groups = find_duplicates([row(1, 'Bob', 'Ross', email='bob@example.com'),
+                                  row(2, 'Bob', 'Ross', email='bobby@example.com')])
+        
+        self.assertEqual(groups, [])
+    
+    def test_same_name_and_phonetic_key(self):
+        groups = find_duplicates([row(1, 'Bob', 'Ross'), row(2, 'bob', 'ross'), row(3, 'Rob', 'Ross')])
+        
+        self.assertEqual([[item.id for item in group] for group in groups], [[1, 2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+from redis.exceptions import ConnectionError
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import InMemoryRedis
+from src.database.cache import CircuitBreaker, RedisCache
+from src.services.events import ContactEvents
+
+
+class TestContactEvents(unittest.IsolatedAsyncioTestCase):
+    
+    async def asyncSetUp(self):
+        self.cache = RedisCache()
+        self.cache.start(InMemoryRedis())
+        self.events = ContactEvents(cache=self.cache)
+    
+    async def asyncTearDown(self):
+        await self.events.close()
+    
+    async def next_message(self, stream):
+        return orjson.loads(await asyncio.wait_for(anext(stream), timeout=2))
+    
+    async def test_events_of_user_are_delivered(self):
+        stream = self.events.subscribe(1)
+        first = asyncio.ensure_future(self.next_message(stream))
+        await asyncio.sleep(0.05)  # listener subscribes
+        await self.events.publish(2, 'created', {'id': 7})
+        await self.events.publish(1, 'deleted', {'id': 5})
+        
+        self.assertEqual(await first, {'event': 'deleted', 'data': {'id': 5}})
+        await stream.aclose()
+        self.assertEqual(self.events.subscribers, {})
+    
+    async def test_local_dispatch_without_redis(self):
+        client = MagicMock()
+        client.publish = AsyncMock(side_effect=ConnectionError('redis is down'))
+        client.pubsub = MagicMock(side_effect=ConnectionError('redis is down'))
+        self.cache.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        self.cache._client = client
+        stream = self.events.subscribe(1)
+        first = asyncio.ensure_future(self.next_message(stream))
+        await asyncio.sleep(0)
+        await self.events.publish(1, 'updated', {'id': 5})
+        
+        self.assertEqual(await first, {'event': 'updated', 'data': {'id': 5}})
+        await stream.aclose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+from pathlib import Path
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import ConnectionError
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.stand_ins import InMemoryRedis
+from src.database.cache import RedisCache
+from src.services.signup_filter import EmailFilter
+
+
+class TestEmailFilter(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.cache = RedisCache()
+        self.cache.start(InMemoryRedis())
+        self.filter = EmailFilter(capacity=1000, error_rate=1e-6, cache=self.cache)
+    
+    def test_size(self):
+        self.assertEqual(self.filter.hashes, 20)
+        self.assertEqual(len(set(self.filter.offsets('example@gmail.com'))), 20)
+    
+    async def test_added_emails(self):
+        await self.filter.add('example@gmail.com')
+        
+        self.assertTrue(await self.filter.might_contain('example@gmail.com'))
+        self.assertFalse(await self.filter.might_contain('other@gmail.com'))
+    
+    async def test_rebuild_replaces_filter(self):
+        await self.filter.add('deleted@gmail.com')
+        
+        count = await self.filter.rebuild((f'user{i}@gmail.com' for i in range(600)), batch_size=250)
+        
+        self.assertEqual(count, 600)
+        self.assertTrue(await self.filter.might_contain('user599@gmail.com'))
+        self.assertFalse(await self.filter.might_contain('deleted@gmail.com'))
+    
+    async def test_unknown_without_redis(self):
+        client = MagicMock()
+        client.execute_command = AsyncMock(side_effect=ConnectionError('redis is down'))
+        self.cache._client = client
+        
+        await self.filter.add('example@gmail.com')
+        
+        self.assertFalse(await self.filter.might_contain('example@gmail.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+import unittest
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks import startup
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_clients_not_imported(self):
+        self.assertEqual(startup.lazy_imported(startup.import_times()), [])
+
+    def test_import_time(self):
+        total_ms, _ = startup.measure(repeat=3)
+
+        self.assertLess(total_ms, 3 * startup.BASELINE_MS)
+
+    def test_import_does_not_read_settings(self):
+        # no settings in environment: import fails if any module resolves settings on import
+        result = subprocess.run([sys.executable, '-c', 'import main'], cwd=root_dir, capture_output=True, text=True,
+                                env={'PATH': os.environ.get('PATH', '')})
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()